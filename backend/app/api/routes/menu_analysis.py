@@ -1,82 +1,207 @@
+import json
 import os
 import uuid
-from typing import List
-from fastapi import APIRouter, UploadFile, File, HTTPException, status
-from fastapi.responses import JSONResponse
+from typing import AsyncIterator, List, Optional
+from anyio import to_thread
+from fastapi import APIRouter, Header, HTTPException, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from app.services.menu_analysis import (
-    analyze_menu_image,
+    analyze_menu_bytes,
+    analyze_menu_pages,
     get_ingredient_recommendations,
+    stream_menu_bytes,
 )
+from app.api.uploads import Upload, read_uploads, upload_request_body
+from app.services.analysis_cache import analysis_cache
+from app.services.analysis_jobs import analysis_job_queue, COMPLETED
+from app.services.image_hash import near_duplicate_index
+from app.services.menu_state import menu_state_store
+from app.services.rate_limiter import rate_limiter
+from app.services.token_usage import token_usage
 from app.core.config import settings
-from app.schemas.menu import MenuAnalysisResponse, ErrorResponse, MenuItem
+from app.core.metrics import ANALYSIS_STAGE_SECONDS
+from app.schemas.menu import (
+    MenuAnalysisResponse,
+    AnalysisJobResponse,
+    ErrorResponse,
+    CacheStats,
+    RateLimitStatus,
+    TokenUsageStats,
+)
 from app.schemas.product import ProductList, Product
 from .recommendations import update_menu_items
 
 router = APIRouter()
 
 
+def _write_file(file_path: str, content: bytes) -> None:
+    with ANALYSIS_STAGE_SECONDS.labels("disk_write").time():
+        # Ensure upload directory exists
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as buffer:
+            buffer.write(content)
+
+
+async def _receive_uploads(
+    request: Request, field: str = "file", max_files: int = 1
+) -> List[bytearray]:
+    # Read the files from the body as it arrives, enforcing type and size
+    uploads: List[Upload] = await read_uploads(request, field, max_files)
+
+    # Keep a copy of each upload only when configured to
+    if settings.PERSIST_UPLOADS:
+        for upload in uploads:
+            file_path = os.path.join(
+                settings.UPLOAD_DIR, f"{uuid.uuid4()}.{upload.extension}"
+            )
+            await to_thread.run_sync(_write_file, file_path, upload.content)
+
+    return [upload.content for upload in uploads]
+
+
+async def _build_response(analysis_result: dict, session_id: Optional[str]) -> dict:
+    if analysis_result.get("unavailable"):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=analysis_result["error"],
+        )
+    if not analysis_result["success"]:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error analyzing menu: {analysis_result.get('error', 'Unknown error')}",
+        )
+
+    # Store menu items for recommendations
+    analysis_id = str(uuid.uuid4())
+    await update_menu_items(analysis_result["menu_items"], analysis_id, session_id)
+
+    # Items were validated when the model response was parsed; FastAPI checks
+    # them against the response model once, without MenuItem copies here
+    return {
+        "menu_items": analysis_result["menu_items"],
+        "analysis_id": analysis_id,
+        # Results cached before completeness was recorded were complete
+        "complete": analysis_result.get("complete", True),
+    }
+
+
 @router.post(
     "/analyze-menu",
     response_model=MenuAnalysisResponse,
-    responses={400: {"model": ErrorResponse}, 500: {"model": ErrorResponse}},
+    responses={
+        400: {"model": ErrorResponse},
+        500: {"model": ErrorResponse},
+        503: {"model": ErrorResponse},
+    },
     summary="Analyze menu image",
     description="Upload and analyze a menu image to extract items and ingredients",
+    openapi_extra=upload_request_body("file"),
 )
-async def analyze_menu(file: UploadFile = File(...)) -> MenuAnalysisResponse:
+async def analyze_menu(
+    request: Request,
+    x_session_id: Optional[str] = Header(
+        None, description="Also make this the session's latest analysis"
+    ),
+) -> MenuAnalysisResponse:
     """
     Upload and analyze a menu image.
     Returns structured data about menu items and recommendations.
     """
-    # Validate file extension
-    file_ext = file.filename.split(".")[-1].lower()
-    if file_ext not in settings.ALLOWED_EXTENSIONS:
+    try:
+        (content,) = await _receive_uploads(request)
+
+        # Analyze the menu image straight from memory
+        analysis_result = await analyze_menu_bytes(content)
+        return await _build_response(analysis_result, x_session_id)
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File type not allowed. Allowed types: {settings.ALLOWED_EXTENSIONS}",
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error processing menu: {str(e)}",
         )
 
-    # Generate a unique filename
-    unique_filename = f"{uuid.uuid4()}.{file_ext}"
-    file_path = os.path.join(settings.UPLOAD_DIR, unique_filename)
 
-    try:
-        # Ensure upload directory exists
-        os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-
-        # Read file content
-        content = await file.read()
-        if len(content) > settings.MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"File size exceeds maximum limit of {settings.MAX_FILE_SIZE // (1024 * 1024)}MB",
-            )
+async def _stream_events(
+    content: bytes, session_id: Optional[str]
+) -> AsyncIterator[bytes]:
+    """
+    NDJSON lines: one {"type": "item"} per menu item as the model produces
+    it, then {"type": "done"} with the analysis id and whether the menu was
+    read completely, or the error and whether the model is unavailable.
+    """
+    async for event in stream_menu_bytes(content):
+        if event["type"] == "item":
+            yield json.dumps(event).encode("utf-8") + b"\n"
+            continue
 
-        # Save the file
-        with open(file_path, "wb") as buffer:
-            buffer.write(content)
+        done = {"type": "done", "success": event["success"]}
+        if event["success"]:
+            # Store menu items for recommendations, as analyze-menu does
+            done["analysis_id"] = str(uuid.uuid4())
+            done["complete"] = event.get("complete", True)
+            await update_menu_items(
+                event["menu_items"], done["analysis_id"], session_id
+            )
+        else:
+            done["error"] = (
+                f"Error analyzing menu: {event.get('error', 'Unknown error')}"
+            )
+            if event.get("unavailable"):
+                done["unavailable"] = True
+        yield json.dumps(done).encode("utf-8") + b"\n"
 
-        # Analyze the menu image
-        analysis_result = analyze_menu_image(file_path)
 
-        if not analysis_result["success"]:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error analyzing menu: {analysis_result.get('error', 'Unknown error')}",
-            )
+@router.post(
+    "/analyze-menu/stream",
+    responses={400: {"model": ErrorResponse}},
+    summary="Analyze menu image with streamed results",
+    description="Upload a menu image and receive menu items as NDJSON while they are extracted",
+    openapi_extra=upload_request_body("file"),
+)
+async def analyze_menu_stream(
+    request: Request,
+    x_session_id: Optional[str] = Header(
+        None, description="Also make this the session's latest analysis"
+    ),
+) -> StreamingResponse:
+    """
+    Upload and analyze a menu image, streaming each menu item as soon as it
+    has been extracted instead of waiting for the whole menu.
+    """
+    (content,) = await _receive_uploads(request)
 
-        # Store menu items for recommendations
-        update_menu_items(analysis_result["menu_items"])
+    return StreamingResponse(
+        _stream_events(content, x_session_id), media_type="application/x-ndjson"
+    )
 
-        # Convert the response to proper schema
-        try:
-            menu_items = [MenuItem(**item) for item in analysis_result["menu_items"]]
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error formatting response: {str(e)}",
-            )
 
-        return MenuAnalysisResponse(menu_items=menu_items)
+@router.post(
+    "/analyze-menu/batch",
+    response_model=MenuAnalysisResponse,
+    responses={400: {"model": ErrorResponse}, 500: {"model": ErrorResponse}},
+    summary="Analyze multi-page menu",
+    description="Upload several menu pages, analyze them concurrently and merge the results",
+    openapi_extra=upload_request_body("files", multiple=True),
+)
+async def analyze_menu_batch(
+    request: Request,
+    x_session_id: Optional[str] = Header(
+        None, description="Also make this the session's latest analysis"
+    ),
+) -> MenuAnalysisResponse:
+    """
+    Upload and analyze all pages of a menu (food, drinks, desserts...).
+    Pages are analyzed concurrently, up to BATCH_MAX_CONCURRENCY at a time,
+    and items appearing on more than one page are collapsed.
+    """
+    try:
+        # Every page is received and checked before anything is analyzed
+        pages = await _receive_uploads(request, "files", settings.BATCH_MAX_FILES)
+        analysis_result = await analyze_menu_pages(pages)
+        return await _build_response(analysis_result, x_session_id)
 
     except HTTPException:
         raise
@@ -86,26 +211,111 @@ async def analyze_menu(file: UploadFile = File(...)) -> MenuAnalysisResponse:
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error processing menu: {str(e)}",
         )
-    finally:
-        # Clean up uploaded file
-        if os.path.exists(file_path):
-            os.remove(file_path)
+
+
+@router.post(
+    "/analysis",
+    response_model=AnalysisJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={400: {"model": ErrorResponse}, 500: {"model": ErrorResponse}},
+    summary="Submit menu image for analysis",
+    description="Upload a menu image and return immediately with an analysis id to poll",
+    openapi_extra=upload_request_body("file"),
+)
+async def submit_analysis(request: Request) -> AnalysisJobResponse:
+    """
+    Queue a menu image for background analysis.
+    Poll GET /analysis/{analysis_id} for the results.
+    """
+    try:
+        (content,) = await _receive_uploads(request)
+        analysis_id = await analysis_job_queue.submit(content)
+        return AnalysisJobResponse(analysis_id=analysis_id, status="pending")
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error queuing menu: {str(e)}",
+        )
 
 
 @router.get(
     "/analysis/{analysis_id}",
-    response_model=MenuAnalysisResponse,
+    response_model=AnalysisJobResponse,
     responses={404: {"model": ErrorResponse}},
     summary="Get analysis results",
-    description="Retrieve the results of a previous menu analysis",
+    description="Retrieve the status and results of a submitted menu analysis",
 )
-async def get_analysis(analysis_id: str) -> MenuAnalysisResponse:
+async def get_analysis(analysis_id: str) -> AnalysisJobResponse:
     """
-    Get product recommendations for a specific menu.
-    This is a placeholder endpoint for future implementation with database storage.
+    Get the status of a submitted analysis, with menu items once completed.
     """
-    # TODO: Implement database storage and retrieval
-    raise HTTPException(
-        status_code=status.HTTP_501_NOT_IMPLEMENTED,
-        detail="This endpoint is not implemented yet",
+    job = await to_thread.run_sync(analysis_job_queue.get, analysis_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Analysis not found"
+        )
+
+    # Store menu items for recommendations the first time a result is seen
+    if job["status"] == COMPLETED:
+        if await to_thread.run_sync(menu_state_store.get, analysis_id) is None:
+            await update_menu_items(job["menu_items"], analysis_id)
+
+    # Where the job's model call is queued, if it is waiting in this process
+    queued = rate_limiter.position(analysis_id)
+    if queued is not None:
+        job["queue_position"], job["eta_seconds"] = queued
+
+    return AnalysisJobResponse(**job)
+
+
+@router.get(
+    "/rate-limit",
+    response_model=RateLimitStatus,
+    summary="Get model rate limit status",
+    description="Queued model calls and the expected wait for a new analysis",
+)
+async def get_rate_limit_status() -> RateLimitStatus:
+    estimate = rate_limiter.estimate(
+        settings.RATE_LIMIT_IMAGE_TOKENS + settings.MAX_TOKENS
+    )
+    return RateLimitStatus(
+        enabled=settings.RATE_LIMIT_ENABLED,
+        queued=estimate.position,
+        eta_seconds=round(estimate.eta_seconds, 1),
     )
+
+
+@router.get(
+    "/usage",
+    response_model=TokenUsageStats,
+    summary="Get token usage",
+    description="Token and latency totals for recorded model calls",
+)
+async def get_token_usage() -> TokenUsageStats:
+    return TokenUsageStats(**await to_thread.run_sync(token_usage.stats))
+
+
+@router.get(
+    "/cache/stats",
+    response_model=CacheStats,
+    summary="Get analysis cache statistics",
+    description="Hit/miss counters and entry counts for the menu analysis cache",
+)
+async def get_cache_stats() -> CacheStats:
+    stats = await to_thread.run_sync(analysis_cache.stats)
+    return CacheStats(**stats, near_duplicate_hits=near_duplicate_index.hits)
+
+
+@router.delete(
+    "/cache",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Purge analysis cache",
+    description="Remove all cached menu analyses from memory and disk",
+)
+async def purge_cache() -> None:
+    await to_thread.run_sync(analysis_cache.purge)
+    await to_thread.run_sync(near_duplicate_index.clear)
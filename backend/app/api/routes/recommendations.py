@@ -1,27 +1,265 @@
-from fastapi import APIRouter, HTTPException, Query, status, Depends
-from typing import List, Optional
+import base64
+import binascii
+import json
+from fastapi import APIRouter, HTTPException, Query, Header, status, Depends
+from fastapi.responses import Response, StreamingResponse
+from typing import Iterator, List, NamedTuple, Optional
+from anyio import to_thread
 from app.schemas.product import (
-    Product,
     ProductList,
     ProductResponse,
     ProductFilterParams,
 )
 from app.schemas.menu import ErrorResponse, MenuItem
+from app.core.config import settings
+from app.core.metrics import RECOMMENDATION_STAGE_SECONDS
+from app.services.facet_index import FacetIndex, parse_price_range
 from app.services.menu_analysis import get_ingredient_recommendations
+from app.services.menu_state import menu_state_store
+from app.services.recommendation_cache import RecommendationCache, menu_fingerprint
 
 router = APIRouter()
 
-# Store analyzed menu items in memory (in a real app, this would be in a database)
-current_menu_items = []
+CURSOR_PREFIX = b"row:"
+# Products per chunk when streaming NDJSON
+STREAM_BATCH_SIZE = 256
 
+# Built product lists per menu fingerprint, shared by all product endpoints
+product_cache = RecommendationCache(
+    max_entries=settings.RECOMMENDATION_CACHE_MAX_ENTRIES
+)
+
+
+def _session_key(session_id: str) -> str:
+    return f"session:{session_id}"
+
+
+async def get_menu_state(
+    analysis_id: Optional[str] = Query(
+        None, description="Analysis to base recommendations on"
+    ),
+    x_session_id: Optional[str] = Header(
+        None, description="Session whose latest analysis to use"
+    ),
+) -> dict:
+    """
+    Resolve the menu items and precomputed recommendations for a request,
+    by analysis id or else by the session's latest analysis.
+    """
+    key = None
+    if analysis_id:
+        key = analysis_id
+    elif x_session_id:
+        key = _session_key(x_session_id)
+
+    state = await to_thread.run_sync(menu_state_store.get, key) if key else None
+    if state is None:
+        if analysis_id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Analysis not found"
+            )
+        # No analysis yet: fall back to default recommendations
+        state = {"menu_items": [], "recommendations": None}
+    return state
+
+
+def _build_state(items: List[dict]) -> dict:
+    return {
+        "menu_items": items,
+        "fingerprint": menu_fingerprint(items),
+        "recommendations": get_ingredient_recommendations(items),
+    }
+
+
+def _get_recommendations(state: dict) -> dict:
+    recommendations = state["recommendations"]
+    if recommendations is None:
+        recommendations = get_ingredient_recommendations(state["menu_items"])
+    return recommendations
+
+
+class ProductView(NamedTuple):
+    """
+    A recommended product serialized once.
+    """
+
+    id: str
+    json: bytes
+
+
+class ProductSet(NamedTuple):
+    """
+    The products recommended for a menu and their facet index.
+    """
+
+    products: List[ProductView]
+    facets: FacetIndex
+
+
+def _build_products(recommendations: List[dict]) -> ProductSet:
+    products = []
+    facet_rows = []
+    for i, rec in enumerate(recommendations):
+        product = {
+            "id": str(i + 1),
+            "name": rec["name"],
+            "description": rec["description"],
+            "price": rec["price_range"],
+            "image": "https://images.unsplash.com/photo-1618164436241-4473940d1f5c",
+            "tags": [*rec["tags"], rec["category"]],
+            "score": rec.get("score"),
+        }
+        products.append(
+            ProductView(
+                id=product["id"],
+                json=json.dumps(product, separators=(",", ":")).encode("utf-8"),
+            )
+        )
+        facet_rows.append((product["tags"], parse_price_range(rec["price_range"])))
+    return ProductSet(products, FacetIndex(facet_rows))
+
+
+def _json_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
+
+def _encode_cursor(row: int) -> str:
+    return base64.urlsafe_b64encode(b"%s%d" % (CURSOR_PREFIX, row)).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> int:
+    """
+    Row of the last product on the previous page.
+    """
+    try:
+        token = base64.urlsafe_b64decode(cursor.encode("ascii"))
+        if not token.startswith(CURSOR_PREFIX):
+            raise ValueError(cursor)
+        row = int(token[len(CURSOR_PREFIX) :])
+        if row < 0:
+            raise ValueError(cursor)
+        return row
+    except (ValueError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
 
-def get_current_menu_items():
-    return current_menu_items
 
+class ProductFilters(NamedTuple):
+    category: Optional[str] = None
+    tag: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
 
-def update_menu_items(items: List[dict]):
-    global current_menu_items
-    current_menu_items = items
+
+def _product_list_response(
+    product_set: ProductSet,
+    filters: ProductFilters,
+    page: int,
+    page_size: int,
+    cursor: Optional[str] = None,
+) -> Response:
+    """
+    Select one page of matching products and join their pre-serialized JSON
+    into a ProductList body, skipping model validation and re-serialization.
+
+    With a cursor, the page starts after the cursor's row (keyset
+    pagination), so deep pages don't cost the offset; otherwise page is
+    used as an offset.
+    """
+    facets = product_set.facets
+    bits = facets.select(*filters)
+    if cursor:
+        # One extra row tells whether there is a next page
+        rows = facets.rows(bits, start=_decode_cursor(cursor) + 1, limit=page_size + 1)
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+    else:
+        start_idx = (page - 1) * page_size
+        matching = facets.rows(bits)
+        rows = matching[start_idx : start_idx + page_size]
+        has_more = start_idx + page_size < len(matching)
+
+    next_cursor = b'"%s"' % _encode_cursor(rows[-1]).encode() if has_more else b"null"
+    body = b'{"products":[%s],"total":%d,"page":%d,"page_size":%d,"next_cursor":%s}' % (
+        b",".join(product_set.products[row].json for row in rows),
+        facets.count(bits),
+        page,
+        page_size,
+        next_cursor,
+    )
+    return _json_response(body)
+
+
+def _stream_products(
+    product_set: ProductSet, filters: ProductFilters
+) -> Iterator[bytes]:
+    """
+    Yield every matching product as NDJSON, a batch of lines at a time.
+    """
+    facets = product_set.facets
+    bits = facets.select(*filters)
+    start = 0
+    while True:
+        rows = facets.rows(bits, start=start, limit=STREAM_BATCH_SIZE)
+        if not rows:
+            break
+        yield b"".join(product_set.products[row].json + b"\n" for row in rows)
+        start = rows[-1] + 1
+
+
+def _list_products(
+    state: dict,
+    filters: ProductFilters,
+    page: int,
+    page_size: int,
+    cursor: Optional[str],
+    format: str,
+) -> Response:
+    product_set = _get_products(state)
+    if format == "ndjson":
+        return StreamingResponse(
+            _stream_products(product_set, filters), media_type="application/x-ndjson"
+        )
+    return _product_list_response(product_set, filters, page, page_size, cursor)
+
+
+def _get_products(state: dict) -> ProductSet:
+    """
+    Get the recommended products for a menu, building them only the first
+    time a given menu is seen.
+    """
+    fingerprint = state.get("fingerprint") or menu_fingerprint(state["menu_items"])
+    products = product_cache.get(fingerprint)
+    if products is None:
+        recommendations = _get_recommendations(state)
+        if not recommendations["success"]:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=recommendations.get("error", "Failed to get recommendations"),
+            )
+        with RECOMMENDATION_STAGE_SECONDS.labels("product_build").time():
+            products = _build_products(recommendations["recommendations"])
+        product_cache.set(fingerprint, products)
+    return products
+
+
+async def update_menu_items(
+    items: List[dict], analysis_id: str, session_id: Optional[str] = None
+) -> None:
+    """
+    Store menu items and their recommendations for an analysis, and as the
+    session's latest analysis when a session id is given.
+    """
+    state = _build_state(items)
+
+    # Replace any stale product list for this menu with a freshly built one
+    product_cache.invalidate(state["fingerprint"])
+    _get_products(state)
+
+    await to_thread.run_sync(menu_state_store.set, analysis_id, state)
+    if session_id:
+        await to_thread.run_sync(menu_state_store.set, _session_key(session_id), state)
 
 
 @router.get(
@@ -35,53 +273,14 @@ async def get_products(
     tag: Optional[str] = Query(None, description="Filter by tag"),
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(10, ge=1, le=100, description="Items per page"),
-    menu_items: List[dict] = Depends(get_current_menu_items),
-) -> ProductList:
-    # Get recommendations based on menu items
-    recommendations = get_ingredient_recommendations(menu_items)
-
-    if not recommendations["success"]:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=recommendations.get("error", "Failed to get recommendations"),
-        )
-
-    # Convert recommendations to Product models
-    products = []
-    for rec in recommendations["recommendations"]:
-        product = Product(
-            id=str(len(products) + 1),
-            name=rec["name"],
-            description=rec["description"],
-            price=rec["price_range"],
-            image="https://images.unsplash.com/photo-1618164436241-4473940d1f5c",
-            tags=[*rec["tags"], rec["category"]],
-        )
-        products.append(product)
-
-    # Apply filters
-    filtered_products = products
-    if category:
-        filtered_products = [
-            p
-            for p in filtered_products
-            if category.lower() in [t.lower() for t in p.tags]
-        ]
-
-    if tag:
-        filtered_products = [
-            p for p in filtered_products if tag.lower() in [t.lower() for t in p.tags]
-        ]
-
-    # Calculate pagination
-    total = len(filtered_products)
-    start_idx = (page - 1) * page_size
-    end_idx = start_idx + page_size
-    paginated_products = filtered_products[start_idx:end_idx]
-
-    return ProductList(
-        products=paginated_products, total=total, page=page, page_size=page_size
-    )
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    format: str = Query(
+        "json", pattern="^(json|ndjson)$", description="ndjson streams all matches"
+    ),
+    state: dict = Depends(get_menu_state),
+) -> Response:
+    filters = ProductFilters(category=category, tag=tag)
+    return _list_products(state, filters, page, page_size, cursor, format)
 
 
 @router.get(
@@ -92,28 +291,16 @@ async def get_products(
     description="Get detailed information about a specific product",
 )
 async def get_product(
-    product_id: str, menu_items: List[dict] = Depends(get_current_menu_items)
-) -> ProductResponse:
-    # Get recommendations based on menu items
-    recommendations = get_ingredient_recommendations(menu_items)
-    if not recommendations["success"]:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=recommendations.get("error", "Failed to get recommendations"),
-        )
+    product_id: str, state: dict = Depends(get_menu_state)
+) -> Response:
+    products = _get_products(state).products
 
     # Find the product with the matching ID
     try:
-        rec = recommendations["recommendations"][int(product_id) - 1]
-        product = Product(
-            id=product_id,
-            name=rec["name"],
-            description=rec["description"],
-            price=rec["price_range"],
-            image="https://images.unsplash.com/photo-1618164436241-4473940d1f5c",
-            tags=[*rec["tags"], rec["category"]],
-        )
-        return ProductResponse(product=product)
+        index = int(product_id) - 1
+        if index < 0:
+            raise IndexError(product_id)
+        return _json_response(b'{"product":%s}' % products[index].json)
     except (IndexError, ValueError):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
@@ -130,51 +317,13 @@ async def filter_products(
     filters: ProductFilterParams,
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(10, ge=1, le=100, description="Items per page"),
-    menu_items: List[dict] = Depends(get_current_menu_items),
-) -> ProductList:
-    # Get recommendations based on menu items
-    recommendations = get_ingredient_recommendations(menu_items)
-    if not recommendations["success"]:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=recommendations.get("error", "Failed to get recommendations"),
-        )
-
-    # Convert recommendations to products
-    products = [
-        Product(
-            id=str(i + 1),
-            name=rec["name"],
-            description=rec["description"],
-            price=rec["price_range"],
-            image="https://images.unsplash.com/photo-1618164436241-4473940d1f5c",
-            tags=[*rec["tags"], rec["category"]],
-        )
-        for i, rec in enumerate(recommendations["recommendations"])
-    ]
-
-    # Apply filters
-    filtered_products = products
-    if filters.category:
-        filtered_products = [
-            p
-            for p in filtered_products
-            if filters.category.lower() in [t.lower() for t in p.tags]
-        ]
-
-    if filters.tag:
-        filtered_products = [
-            p
-            for p in filtered_products
-            if filters.tag.lower() in [t.lower() for t in p.tags]
-        ]
-
-    # Calculate pagination
-    total = len(filtered_products)
-    start_idx = (page - 1) * page_size
-    end_idx = start_idx + page_size
-    paginated_products = filtered_products[start_idx:end_idx]
-
-    return ProductList(
-        products=paginated_products, total=total, page=page, page_size=page_size
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    format: str = Query(
+        "json", pattern="^(json|ndjson)$", description="ndjson streams all matches"
+    ),
+    state: dict = Depends(get_menu_state),
+) -> Response:
+    product_filters = ProductFilters(
+        filters.category, filters.tag, filters.min_price, filters.max_price
     )
+    return _list_products(state, product_filters, page, page_size, cursor, format)
@@ -0,0 +1,171 @@
+"""
+Reading menu image uploads straight from the request body.
+
+An UploadFile parameter makes Starlette receive the whole multipart body
+before the handler runs, spooling every file over 1MB to a temporary file
+on disk. Upload endpoints instead parse the body here as it arrives: file
+parts are collected in memory, a request whose Content-Length is already
+over the limit is rejected before any of the body is read, and an upload
+is rejected as soon as it grows past MAX_FILE_SIZE or turns out to have a
+disallowed extension.
+"""
+
+from typing import Dict, List, NamedTuple, Optional
+from fastapi import HTTPException, Request, status
+from multipart.multipart import MultipartParser, parse_options_header
+from app.core.config import settings
+from app.core.metrics import ANALYSIS_STAGE_SECONDS
+
+# Allowance per file for the multipart boundary and part headers
+PART_OVERHEAD = 16 * 1024
+
+
+class Upload(NamedTuple):
+    filename: str
+    extension: str
+    content: bytearray
+
+
+def _bad_request(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+def _too_large() -> HTTPException:
+    return _bad_request(
+        f"File size exceeds maximum limit of {settings.MAX_FILE_SIZE // (1024 * 1024)}MB"
+    )
+
+
+def validate_extension(filename: str) -> str:
+    file_ext = filename.split(".")[-1].lower()
+    if file_ext not in settings.ALLOWED_EXTENSIONS:
+        raise _bad_request(
+            f"File type not allowed. Allowed types: {settings.ALLOWED_EXTENSIONS}"
+        )
+    return file_ext
+
+
+class _UploadCollector:
+    """
+    MultipartParser callbacks keeping the file parts of one form field.
+    Parts of other fields are skipped without being buffered.
+    """
+
+    def __init__(self, field: str, max_files: int):
+        self.field = field
+        self.max_files = max_files
+        self.uploads: List[Upload] = []
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._current: Optional[bytearray] = None
+
+    def on_part_begin(self) -> None:
+        self._disposition = b""
+        self._current = None
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        if options.get(b"name", b"").decode("utf-8", "replace") != self.field:
+            return
+        if b"filename" not in options:
+            return
+        if len(self.uploads) >= self.max_files:
+            raise _bad_request(
+                f"Too many files. Maximum is {self.max_files} per request"
+            )
+        filename = options[b"filename"].decode("utf-8", "replace")
+        self._current = bytearray()
+        self.uploads.append(
+            Upload(filename, validate_extension(filename), self._current)
+        )
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._current is None:
+            return
+        if len(self._current) + end - start > settings.MAX_FILE_SIZE:
+            raise _too_large()
+        self._current += data[start:end]
+
+    def on_part_end(self) -> None:
+        self._current = None
+
+    def callbacks(self) -> Dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+
+async def read_uploads(
+    request: Request, field: str, max_files: int = 1
+) -> List[Upload]:
+    """
+    The files uploaded under a multipart form field, read into memory as
+    the body arrives.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit():
+        if int(content_length) > max_files * (settings.MAX_FILE_SIZE + PART_OVERHEAD):
+            raise _too_large()
+
+    content_type, options = parse_options_header(
+        request.headers.get("content-type", "")
+    )
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise _bad_request("Expected a multipart/form-data upload")
+
+    collector = _UploadCollector(field, max_files)
+    parser = MultipartParser(options[b"boundary"], collector.callbacks())
+    with ANALYSIS_STAGE_SECONDS.labels("upload_read").time():
+        async for chunk in request.stream():
+            parser.write(chunk)
+        parser.finalize()
+
+    if not collector.uploads:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Missing file upload in form field '{field}'",
+        )
+    return collector.uploads
+
+
+def upload_request_body(field: str, multiple: bool = False) -> Dict:
+    """
+    OpenAPI request body for an endpoint reading its files with
+    read_uploads, which FastAPI cannot infer from the signature.
+    """
+    schema = {"type": "string", "format": "binary"}
+    if multiple:
+        schema = {"type": "array", "items": schema}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {field: schema},
+                        "required": [field],
+                    }
+                }
+            },
+        }
+    }
@@ -19,10 +19,47 @@ class Settings(BaseSettings):
         "http://127.0.0.1:8000",
     ]
 
+    # Server Configuration (serve.py)
+    HOST: str = "0.0.0.0"
+    PORT: int = 8000
+    WEB_CONCURRENCY: int = 0  # Worker processes; one per CPU if 0
+    GRACEFUL_SHUTDOWN_SECONDS: int = 30  # Worker wait for requests and jobs on stop
+
     # OpenAI Configuration
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL: str = "gpt-4o-mini"
     MAX_TOKENS: int = 10000
+    OPENAI_BASE_URL: str = ""  # OpenAI-compatible endpoint; default API if empty
+
+    # Model Transport Configuration
+    MODEL_MAX_CONNECTIONS: int = 20
+    MODEL_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    MODEL_KEEPALIVE_EXPIRY: float = 30.0  # Seconds an idle connection is kept
+    MODEL_CONNECT_TIMEOUT: float = 5.0
+    MODEL_READ_TIMEOUT: float = 60.0
+    MODEL_WRITE_TIMEOUT: float = 30.0
+    MODEL_POOL_TIMEOUT: float = 10.0  # Wait for a free pooled connection
+    MODEL_MAX_RETRIES: int = 3  # Retries after the first attempt
+    MODEL_RETRY_BASE_DELAY: float = 0.5  # Seconds, doubled per retry, jittered
+    MODEL_RETRY_MAX_DELAY: float = 8.0
+    MODEL_CIRCUIT_FAILURE_THRESHOLD: int = 5  # Consecutive failures to open
+    MODEL_CIRCUIT_RESET_SECONDS: float = 30.0  # Open time before a trial call
+
+    # Model Rate Limit Configuration
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "sqlite"  # sqlite (shared by workers) or memory
+    RATE_LIMIT_REQUESTS_PER_MINUTE: int = 500
+    RATE_LIMIT_TOKENS_PER_MINUTE: int = 200_000  # Prompt plus max_tokens
+    RATE_LIMIT_IMAGE_TOKENS: int = 1105  # Estimated prompt tokens per image
+
+    # Token Usage Configuration
+    TOKEN_USAGE_ENABLED: bool = True  # Record tokens and latency per model call
+    TOKEN_USAGE_RETENTION_SECONDS: int = 30 * 24 * 60 * 60  # 30 days
+    ADAPTIVE_MAX_TOKENS_ENABLED: bool = True  # Size max_tokens from usage history
+    ADAPTIVE_MAX_TOKENS_MIN: int = 512
+    ADAPTIVE_MAX_TOKENS_MARGIN: float = 1.5  # Headroom over the p95 estimate
+    ADAPTIVE_MAX_TOKENS_MIN_SAMPLES: int = 20  # History needed before adapting
+    ADAPTIVE_MAX_TOKENS_HISTORY: int = 200  # Recent calls the estimate uses
 
     # File Upload Configuration
     UPLOAD_DIR: str = os.path.join(
@@ -30,6 +67,66 @@ class Settings(BaseSettings):
     )
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
     ALLOWED_EXTENSIONS: List[str] = ["jpg", "jpeg", "png"]
+    PERSIST_UPLOADS: bool = False  # Keep a copy of each upload in UPLOAD_DIR
+
+    # Batch Analysis Configuration
+    BATCH_MAX_FILES: int = 10
+    BATCH_MAX_CONCURRENCY: int = 4  # Pages analyzed at once per batch
+
+    # Background Analysis Job Configuration
+    ANALYSIS_WORKERS: int = 8  # Concurrent background analyses per process
+    ANALYSIS_JOB_POLL_INTERVAL: float = 1.0  # Seconds between idle queue checks
+    ANALYSIS_JOB_STALE_SECONDS: int = 300  # Requeue running jobs older than this
+    ANALYSIS_JOB_DRAIN_SECONDS: float = 20.0  # Shutdown wait for running jobs
+    ANALYSIS_JOB_RETENTION_SECONDS: int = 24 * 60 * 60  # 1 day
+    ANALYSIS_JOB_RETRY_SECONDS: float = 30.0  # Requeue delay when the model is down
+
+    # Menu State Configuration
+    MENU_STATE_BACKEND: str = "sqlite"  # sqlite (shared by workers) or memory
+    MENU_STATE_TTL_SECONDS: int = 12 * 60 * 60  # 12 hours
+    MENU_STATE_MAX_ENTRIES: int = 1024  # In-process LRU size
+    MENU_STATE_LOCAL_TTL_SECONDS: float = 5.0  # How long workers trust their LRU
+    RECOMMENDATION_CACHE_MAX_ENTRIES: int = 1024  # Built product lists per process
+    RECOMMENDATION_TOP_K: int = 5  # Recommendations returned per menu
+
+    # Product Catalog Configuration
+    CATALOG_SOURCE: str = ""  # .json, .csv or .sqlite file; built-in data if empty
+
+    # Image Preprocessing Configuration
+    IMAGE_PREPROCESSING_ENABLED: bool = True
+    IMAGE_MAX_DIMENSION: int = 2048  # Longest side the model keeps
+    IMAGE_MAX_SHORT_SIDE: int = 768  # Shortest side the model keeps
+    IMAGE_GRAYSCALE: bool = False
+    IMAGE_AUTOCONTRAST: bool = False
+    IMAGE_OUTPUT_FORMAT: str = "JPEG"  # JPEG or WEBP
+    IMAGE_QUALITY: int = 85
+
+    # Truncated Response Recovery Configuration
+    MENU_SALVAGE_ENABLED: bool = True  # Request only the rest of a cut-off menu
+    MENU_SALVAGE_MAX_CONTINUATIONS: int = 2  # Follow-up calls per analysis
+
+    # Tiled Analysis Configuration
+    MENU_TILING_ENABLED: bool = False  # Analyze large menus in column/section tiles
+    MENU_TILING_MIN_PIXELS: int = 4_000_000  # Smaller images are analyzed whole
+    MENU_TILING_MAX_TILES: int = 8  # More tiles than this analyzes the whole image
+    MENU_TILING_MAX_CONCURRENCY: int = 4  # Tiles analyzed at once per image
+    MENU_TILE_MAX_ASPECT: float = 1.5  # Column bands at most this tall per width
+    MENU_TILE_OVERLAP: float = 0.05  # Band overlap where no blank row to cut at
+
+    # Local OCR Configuration
+    MENU_OCR_MODE: str = "off"  # off, text (OCR text to a text-only call) or local
+    MENU_OCR_LANGUAGE: str = "eng"  # Tesseract language(s), e.g. eng+fra
+    MENU_OCR_MIN_CONFIDENCE: float = 80.0  # Mean word confidence, 0-100
+    MENU_OCR_MIN_ITEMS: int = 3  # Priced lines needed to trust the layout
+    MENU_OCR_CURRENCY_SYMBOL: str = "$"  # Added to prices read without one
+
+    # Analysis Cache Configuration
+    ANALYSIS_CACHE_ENABLED: bool = True
+    ANALYSIS_CACHE_MAX_ENTRIES: int = 256
+    ANALYSIS_CACHE_TTL_SECONDS: int = 7 * 24 * 60 * 60  # 7 days
+    NEAR_DUPLICATE_ENABLED: bool = False  # Reuse analyses of re-photographed menus
+    NEAR_DUPLICATE_MAX_DISTANCE: int = 6  # Hamming distance out of 64 bits
+    NEAR_DUPLICATE_MIN_SIMILARITY: float = 0.95  # Signature correlation to reuse
 
     class Config:
         case_sensitive = True
@@ -0,0 +1,156 @@
+"""
+Prometheus metrics for the API.
+
+MetricsMiddleware records per-route request latency and in-flight requests;
+the analysis and recommendation hot paths time their stages into
+ANALYSIS_STAGE_SECONDS and RECOMMENDATION_STAGE_SECONDS. Everything is
+served in the Prometheus text format at ``/metrics``.
+
+Under several worker processes (serve.py), PROMETHEUS_MULTIPROC_DIR is set
+and every worker writes its samples there, so ``/metrics`` reports the sum
+over all workers whichever one answers.
+"""
+
+import os
+import time
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Model calls take seconds, local stages milliseconds
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests being served by route",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+ANALYSIS_STAGE_SECONDS = Histogram(
+    "menu_analysis_stage_seconds",
+    "Time spent in each stage of menu analysis",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+RECOMMENDATION_STAGE_SECONDS = Histogram(
+    "recommendation_stage_seconds",
+    "Time spent in each stage of building recommendations",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+ANALYSIS_ERRORS = Counter(
+    "menu_analysis_errors_total",
+    "Menu analysis failures by kind",
+    ["kind"],
+)
+ANALYSIS_PATH_SECONDS = Histogram(
+    "menu_analysis_path_seconds",
+    "Menu analysis latency by path (local OCR, OCR text or vision)",
+    ["path"],
+    buckets=LATENCY_BUCKETS,
+)
+ANALYSIS_PATH_TOKENS = Counter(
+    "menu_analysis_path_tokens_total",
+    "Model tokens spent by analysis path",
+    ["path", "kind"],
+)
+ANALYSIS_SALVAGED_ITEMS = Counter(
+    "menu_analysis_salvaged_items_total",
+    "Menu items kept from completions cut off at max_tokens",
+)
+OCR_FALLBACKS = Counter(
+    "menu_ocr_fallbacks_total",
+    "Menus sent to the vision model after local OCR, by reason",
+    ["reason"],
+)
+MODEL_RETRIES = Counter(
+    "model_call_retries_total",
+    "Model calls retried after a transient failure",
+)
+
+# Requests that match no route share one label instead of one per path
+UNMATCHED_ROUTE = "unmatched"
+
+
+def render_metrics() -> bytes:
+    """
+    Current metrics in the Prometheus text format, summed over worker
+    processes when running under serve.py.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing each HTTP request, including streamed bodies,
+    labelled by route template rather than raw path to keep cardinality low.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    def _route(self, scope: Scope) -> str:
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return UNMATCHED_ROUTE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route(scope)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            REQUEST_SECONDS.labels(method, route, str(status_code)).observe(
+                time.perf_counter() - start
+            )
@@ -13,6 +13,64 @@ class MenuItem(BaseModel):
 
 class MenuAnalysisResponse(BaseModel):
     menu_items: List[MenuItem] = Field(..., description="List of analyzed menu items")
+    analysis_id: Optional[str] = Field(
+        None, description="Identifier to request recommendations for this menu"
+    )
+    complete: bool = Field(
+        True,
+        description="False when the model response was cut off and items may be missing",
+    )
+
+
+class AnalysisJobResponse(BaseModel):
+    analysis_id: str = Field(..., description="Identifier to poll for results")
+    status: str = Field(..., description="One of: pending, running, completed, failed")
+    menu_items: Optional[List[MenuItem]] = Field(
+        None, description="Analyzed menu items, once completed"
+    )
+    error: Optional[str] = Field(None, description="Error message, if failed")
+    complete: Optional[bool] = Field(
+        None, description="Whether every menu item was read, once completed"
+    )
+    queue_position: Optional[int] = Field(
+        None, description="Model calls ahead of this one while it is rate limited"
+    )
+    eta_seconds: Optional[float] = Field(
+        None, description="Estimated wait for the model call while rate limited"
+    )
+
+
+class RateLimitStatus(BaseModel):
+    enabled: bool = Field(..., description="Whether model calls are rate limited")
+    queued: int = Field(..., description="Model calls waiting in this process")
+    eta_seconds: float = Field(
+        ..., description="Estimated wait for a new interactive analysis"
+    )
+
+
+class CacheStats(BaseModel):
+    enabled: bool = Field(..., description="Whether the analysis cache is in use")
+    memory_hits: int = Field(..., description="Lookups served from memory")
+    disk_hits: int = Field(..., description="Lookups served from the on-disk store")
+    misses: int = Field(..., description="Lookups that required a model call")
+    near_duplicate_hits: int = Field(
+        0, description="Lookups served from a near-duplicate image"
+    )
+    memory_entries: int = Field(..., description="Entries held in memory")
+    disk_entries: int = Field(..., description="Entries held on disk")
+
+
+class TokenUsageStats(BaseModel):
+    calls: int = Field(..., description="Model calls recorded")
+    prompt_tokens: int = Field(..., description="Prompt tokens used")
+    completion_tokens: int = Field(..., description="Completion tokens used")
+    total_tokens: int = Field(..., description="Prompt plus completion tokens")
+    reserved_completion_tokens: int = Field(
+        ..., description="Sum of max_tokens reserved against the quota"
+    )
+    avg_latency_ms: float = Field(..., description="Average model call latency")
+    avg_item_count: float = Field(..., description="Average menu items per call")
+    truncated: int = Field(..., description="Calls cut off by max_tokens")
 
 
 class ErrorResponse(BaseModel):
@@ -9,6 +9,9 @@ class Product(BaseModel):
     price: str = Field(..., description="Price of the product")
     image: str = Field(..., description="URL of the product image")
     tags: List[str] = Field(default_factory=list, description="Product tags/categories")
+    score: Optional[float] = Field(
+        None, description="Similarity to the analyzed menu (0-1)"
+    )
 
 
 class ProductList(BaseModel):
@@ -16,6 +19,9 @@ class ProductList(BaseModel):
     total: int = Field(..., description="Total number of products")
     page: Optional[int] = Field(1, description="Current page number")
     page_size: Optional[int] = Field(10, description="Number of items per page")
+    next_cursor: Optional[str] = Field(
+        None, description="Cursor for the next page, or null on the last page"
+    )
 
 
 class ProductResponse(BaseModel):
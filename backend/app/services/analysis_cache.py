@@ -0,0 +1,138 @@
+"""
+Content-addressed cache for menu analysis results.
+
+Results are keyed by the SHA-256 of the image bytes together with the model
+name and prompt version, so a change to either invalidates old entries. A
+small in-memory LRU sits in front of a SQLite store under ``UPLOAD_DIR`` that
+survives restarts and is shared by every worker on the host.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+
+
+class AnalysisCache:
+    def __init__(self, db_path: str, max_entries: int, ttl_seconds: int):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._initialized = False
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(image_bytes: bytes, model: str, prompt_version: str) -> str:
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        return f"{digest}:{model}:{prompt_version}"
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, timeout=10)
+        if not self._initialized:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_cache ("
+                "key TEXT PRIMARY KEY, created_at REAL NOT NULL, value TEXT NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_analysis_cache_created "
+                "ON analysis_cache (created_at)"
+            )
+            self._initialized = True
+        return connection
+
+    def _remember(self, key: str, created_at: float, value: Dict) -> None:
+        with self._lock:
+            self._memory[key] = (created_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str, record: bool = True) -> Optional[Dict]:
+        """
+        Look up a cached analysis, checking memory first and then disk.
+        Expired entries are treated as misses and dropped. Pass record=False
+        to leave the hit/miss counters untouched.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += record
+                    return value
+                del self._memory[key]
+
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT created_at, value FROM analysis_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[0] > self.ttl_seconds:
+                connection.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                row = None
+
+        if row is None:
+            with self._lock:
+                self.misses += record
+            return None
+
+        value = json.loads(row[1])
+        self._remember(key, row[0], value)
+        with self._lock:
+            self.disk_hits += record
+        return value
+
+    def set(self, key: str, value: Dict) -> None:
+        created_at = time.time()
+        self._remember(key, created_at, value)
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO analysis_cache (key, created_at, value) "
+                "VALUES (?, ?, ?)",
+                (key, created_at, json.dumps(value)),
+            )
+            connection.execute(
+                "DELETE FROM analysis_cache WHERE created_at < ?",
+                (created_at - self.ttl_seconds,),
+            )
+
+    def purge(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self.memory_hits = 0
+            self.disk_hits = 0
+            self.misses = 0
+        with self._connect() as connection:
+            connection.execute("DELETE FROM analysis_cache")
+
+    def stats(self) -> Dict:
+        with self._connect() as connection:
+            disk_entries = connection.execute(
+                "SELECT COUNT(*) FROM analysis_cache"
+            ).fetchone()[0]
+        with self._lock:
+            return {
+                "enabled": settings.ANALYSIS_CACHE_ENABLED,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
+
+
+analysis_cache = AnalysisCache(
+    db_path=os.path.join(settings.UPLOAD_DIR, "analysis_cache.sqlite3"),
+    max_entries=settings.ANALYSIS_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.ANALYSIS_CACHE_TTL_SECONDS,
+)
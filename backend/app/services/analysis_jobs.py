@@ -0,0 +1,272 @@
+"""
+Submit-then-poll menu analysis.
+
+Jobs live in a SQLite table under ``UPLOAD_DIR``, which doubles as the queue:
+workers claim pending rows with a conditional update, so jobs survive
+restarts and several processes can share one table without running a job
+twice. Each process runs a pool of asyncio workers that are woken on local
+submissions and otherwise poll for work. Stopping lets analyses in flight
+finish for a while and hands the rest back to the queue for another process.
+Database errors, such as a lock held too long by another process, are logged
+and retried rather than ending the worker. A job that finds the model
+service unavailable (its circuit breaker open) goes back in the queue and is
+retried after ANALYSIS_JOB_RETRY_SECONDS instead of failing.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from typing import Dict, List, Optional, Set
+from anyio import to_thread
+from app.core.config import settings
+from app.services.menu_analysis import analyze_menu_bytes
+from app.services.rate_limiter import BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class AnalysisJobQueue:
+    def __init__(self, db_path: str, worker_count: int):
+        self.db_path = db_path
+        self.worker_count = worker_count
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._running: Set[str] = set()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, timeout=10)
+        if not self._initialized:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, image BLOB, "
+                "result TEXT, error TEXT, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL, "
+                "available_at REAL NOT NULL DEFAULT 0, complete INTEGER)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_analysis_jobs_status "
+                "ON analysis_jobs (status, created_at)"
+            )
+            self._initialized = True
+        return connection
+
+    def _insert(self, job_id: str, image_bytes: bytes) -> None:
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO analysis_jobs (id, status, image, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (job_id, PENDING, bytes(image_bytes), now, now),
+            )
+            # Drop finished jobs past their retention period
+            connection.execute(
+                "DELETE FROM analysis_jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (COMPLETED, FAILED, now - settings.ANALYSIS_JOB_RETENTION_SECONDS),
+            )
+
+    def _claim(self) -> Optional[tuple]:
+        """
+        Claim the oldest pending job that is not waiting out a retry delay.
+        The conditional update makes the claim atomic across workers and
+        processes sharing the table.
+        """
+        with self._connect() as connection:
+            while True:
+                row = connection.execute(
+                    "SELECT id FROM analysis_jobs WHERE status = ? "
+                    "AND available_at <= ? ORDER BY created_at LIMIT 1",
+                    (PENDING, time.time()),
+                ).fetchone()
+                if row is None:
+                    return None
+                claimed = connection.execute(
+                    "UPDATE analysis_jobs SET status = ?, updated_at = ? "
+                    "WHERE id = ? AND status = ?",
+                    (RUNNING, time.time(), row[0], PENDING),
+                ).rowcount
+                if claimed:
+                    image = connection.execute(
+                        "SELECT image FROM analysis_jobs WHERE id = ?", (row[0],)
+                    ).fetchone()[0]
+                    return row[0], image
+
+    def _finish(self, job_id: str, result: Dict) -> None:
+        with self._connect() as connection:
+            if result["success"]:
+                connection.execute(
+                    "UPDATE analysis_jobs SET status = ?, result = ?, error = NULL, "
+                    "complete = ?, image = NULL, updated_at = ? WHERE id = ?",
+                    (
+                        COMPLETED,
+                        json.dumps(result["menu_items"]),
+                        result.get("complete", True),
+                        time.time(),
+                        job_id,
+                    ),
+                )
+            elif result.get("unavailable"):
+                # Keep the image and retry once the circuit may have closed;
+                # the error tells pollers why the job is still pending
+                now = time.time()
+                connection.execute(
+                    "UPDATE analysis_jobs SET status = ?, error = ?, "
+                    "updated_at = ?, available_at = ? WHERE id = ?",
+                    (
+                        PENDING,
+                        result.get("error", "Unknown error"),
+                        now,
+                        now + settings.ANALYSIS_JOB_RETRY_SECONDS,
+                        job_id,
+                    ),
+                )
+            else:
+                connection.execute(
+                    "UPDATE analysis_jobs SET status = ?, error = ?, image = NULL, "
+                    "updated_at = ? WHERE id = ?",
+                    (FAILED, result.get("error", "Unknown error"), time.time(), job_id),
+                )
+
+    def _recover(self) -> None:
+        """
+        Requeue jobs left running by a process that died mid-analysis.
+        """
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE analysis_jobs SET status = ?, updated_at = ? "
+                "WHERE status = ? AND updated_at < ?",
+                (
+                    PENDING,
+                    time.time(),
+                    RUNNING,
+                    time.time() - settings.ANALYSIS_JOB_STALE_SECONDS,
+                ),
+            )
+
+    def _requeue(self, job_ids: List[str]) -> None:
+        with self._connect() as connection:
+            connection.executemany(
+                "UPDATE analysis_jobs SET status = ?, updated_at = ? "
+                "WHERE id = ? AND status = ?",
+                [(PENDING, time.time(), job_id, RUNNING) for job_id in job_ids],
+            )
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT status, result, error, complete FROM analysis_jobs "
+                "WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "analysis_id": job_id,
+            "status": row[0],
+            "menu_items": json.loads(row[1]) if row[1] is not None else None,
+            "error": row[2],
+            "complete": bool(row[3]) if row[3] is not None else None,
+        }
+
+    async def submit(self, image_bytes: bytes) -> str:
+        job_id = str(uuid.uuid4())
+        await to_thread.run_sync(self._insert, job_id, image_bytes)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    async def _idle(self) -> None:
+        try:
+            await asyncio.wait_for(
+                self._wakeup.wait(), settings.ANALYSIS_JOB_POLL_INTERVAL
+            )
+        except asyncio.TimeoutError:
+            pass
+
+    async def _finish_job(self, job_id: str, result: Dict) -> None:
+        # Keep retrying: a job left running is only requeued by stop() or
+        # after ANALYSIS_JOB_STALE_SECONDS on the next start
+        while True:
+            try:
+                await to_thread.run_sync(self._finish, job_id, result)
+                self._running.discard(job_id)
+                return
+            except sqlite3.Error as e:
+                logger.warning("Could not record analysis job %s: %s", job_id, e)
+                if self._stopping:
+                    return
+                await asyncio.sleep(settings.ANALYSIS_JOB_POLL_INTERVAL)
+
+    async def _worker(self) -> None:
+        while not self._stopping:
+            try:
+                job = await to_thread.run_sync(self._claim)
+            except sqlite3.Error as e:
+                logger.warning("Could not claim an analysis job: %s", e)
+                await self._idle()
+                continue
+            if job is None:
+                if not self._stopping:
+                    self._wakeup.clear()
+                await self._idle()
+                continue
+
+            job_id, image_bytes = job
+            self._running.add(job_id)
+            try:
+                # Interactive uploads go ahead of queued jobs at the rate limiter
+                result = await analyze_menu_bytes(
+                    image_bytes, priority=BACKGROUND, request_id=job_id
+                )
+            except Exception as e:
+                result = {"success": False, "error": str(e), "menu_items": []}
+            await self._finish_job(job_id, result)
+
+    async def start(self) -> None:
+        if self._workers:
+            return
+        await to_thread.run_sync(self._recover)
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.worker_count)
+        ]
+
+    async def stop(self, drain_seconds: Optional[float] = None) -> None:
+        """
+        Stop claiming jobs and wait up to drain_seconds (default
+        ANALYSIS_JOB_DRAIN_SECONDS) for running analyses to finish. Analyses
+        still running then are cancelled and their jobs put back in the
+        queue instead of waiting out ANALYSIS_JOB_STALE_SECONDS.
+        """
+        if not self._workers:
+            return
+        if drain_seconds is None:
+            drain_seconds = settings.ANALYSIS_JOB_DRAIN_SECONDS
+        self._stopping = True
+        self._wakeup.set()
+        _, pending = await asyncio.wait(self._workers, timeout=drain_seconds)
+        for worker in pending:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        if self._running:
+            await to_thread.run_sync(self._requeue, list(self._running))
+            self._running.clear()
+        self._workers = []
+        self._wakeup = None
+
+
+analysis_job_queue = AnalysisJobQueue(
+    db_path=os.path.join(settings.UPLOAD_DIR, "analysis_jobs.sqlite3"),
+    worker_count=settings.ANALYSIS_WORKERS,
+)
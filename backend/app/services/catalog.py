@@ -0,0 +1,245 @@
+"""
+Product catalog storage and loaders.
+
+The catalog is held column by column: every repeated string (categories,
+prices, tags, uses, suppliers, variants) is interned once in a string pool
+and rows refer to it through compact ``array`` columns, instead of one
+nested dict per SKU. Catalogs can be loaded from the built-in ingredient
+data or from JSON, CSV or SQLite files, and are only loaded on first use.
+CSV and SQLite list fields arrive as joined strings that repeat across
+rows, so each distinct one is split and pooled only once.
+"""
+
+import csv
+import json
+import sqlite3
+import threading
+from array import array
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+from app.core.config import settings
+
+TEXT_FIELDS = ("price_range", "storage", "shelf_life")
+LIST_FIELDS = (
+    "variants",
+    "suppliers",
+    "quality_grades",
+    "packaging",
+    "common_uses",
+    "tags",
+)
+# Separator for list fields in CSV and SQLite sources
+LIST_SEPARATOR = "|"
+
+
+class _StringPool:
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def add(self, value: str) -> int:
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = self._ids[value] = len(self.values)
+            self.values.append(value)
+        return string_id
+
+    def add_all(self, values: Iterable[str]) -> List[int]:
+        ids = self._ids
+        result = []
+        for value in values:
+            string_id = ids.get(value)
+            if string_id is None:
+                string_id = ids[value] = len(self.values)
+                self.values.append(value)
+            result.append(string_id)
+        return result
+
+
+class _ListColumn:
+    """
+    A list-of-strings column stored as pooled ids plus row offsets.
+    """
+
+    def __init__(self):
+        self.ids = array("I")
+        self.offsets = array("I", [0])
+
+    def append(self, ids: Sequence[int]) -> None:
+        self.ids.extend(ids)
+        self.offsets.append(len(self.ids))
+
+    def get(self, row: int, pool: _StringPool) -> List[str]:
+        strings = pool.values
+        return [strings[i] for i in self.ids[self.offsets[row] : self.offsets[row + 1]]]
+
+
+class Catalog(Sequence):
+    """
+    Columnar catalog. Indexing a row returns a (category, item) pair with
+    the same shape as the built-in ingredient data, built on demand.
+    """
+
+    def __init__(self):
+        self._pool = _StringPool()
+        self._names: List[str] = []
+        self._categories = array("I")
+        self._texts = {field: array("I") for field in TEXT_FIELDS}
+        self._lists = {field: _ListColumn() for field in LIST_FIELDS}
+
+    def append(self, category: str, item: Mapping) -> None:
+        pool = self._pool
+        self._names.append(item["name"])
+        self._categories.append(pool.add(category))
+        for field in TEXT_FIELDS:
+            self._texts[field].append(pool.add(item.get(field) or ""))
+        for field in LIST_FIELDS:
+            self._lists[field].append(pool.add_all(item.get(field, ())))
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __getitem__(self, row: int) -> Tuple[str, Dict]:
+        if row < 0:
+            row += len(self)
+        strings = self._pool.values
+        item = {"name": self._names[row]}
+        for field in TEXT_FIELDS:
+            item[field] = strings[self._texts[field][row]]
+        for field in LIST_FIELDS:
+            item[field] = self._lists[field].get(row, self._pool)
+        return strings[self._categories[row]], item
+
+    def __iter__(self) -> Iterator[Tuple[str, Dict]]:
+        return (self[row] for row in range(len(self)))
+
+    def category(self, row: int) -> str:
+        return self._pool.values[self._categories[row]]
+
+    def name(self, row: int) -> str:
+        return self._names[row]
+
+    def field(self, row: int, field: str):
+        """
+        One field of a row, without building the rest of its item.
+        """
+        if field == "name":
+            return self._names[row]
+        if field in self._texts:
+            return self._pool.values[self._texts[field][row]]
+        return self._lists[field].get(row, self._pool)
+
+    @classmethod
+    def from_mapping(cls, data: Mapping[str, Iterable[Mapping]]) -> "Catalog":
+        """
+        Build from {category: [item, ...]}, the shape of INGREDIENTS_DATA.
+        """
+        catalog = cls()
+        for category, items in data.items():
+            for item in items:
+                catalog.append(category, item)
+        return catalog
+
+    @classmethod
+    def from_records(cls, records: Iterable[Mapping]) -> "Catalog":
+        """
+        Build from flat records carrying their own "category" field.
+        """
+        catalog = cls()
+        for record in records:
+            catalog.append(record["category"], record)
+        return catalog
+
+    @classmethod
+    def from_flat_rows(
+        cls, columns: Sequence[str], rows: Iterable[Sequence]
+    ) -> "Catalog":
+        """
+        Build from rows of values under the given column names, as read
+        from CSV and SQLite sources: list fields are joined by
+        LIST_SEPARATOR and missing columns read as empty.
+        """
+        catalog = cls()
+        pool = catalog._pool
+        position = {column: i for i, column in enumerate(columns)}
+        name_at, category_at = position["name"], position["category"]
+        texts = [(catalog._texts[field], position.get(field)) for field in TEXT_FIELDS]
+        lists = [(catalog._lists[field], position.get(field)) for field in LIST_FIELDS]
+        # Pooled ids of each distinct joined list value
+        joined: Dict[str, List[int]] = {}
+
+        for row in rows:
+            catalog._names.append(row[name_at])
+            catalog._categories.append(pool.add(row[category_at]))
+            for column, at in texts:
+                column.append(pool.add((row[at] if at is not None else "") or ""))
+            for column, at in lists:
+                value = (row[at] if at is not None else "") or ""
+                ids = joined.get(value)
+                if ids is None:
+                    ids = joined[value] = pool.add_all(
+                        part for part in value.split(LIST_SEPARATOR) if part
+                    )
+                # Inlined _ListColumn.append: this runs once per field and row
+                column.ids.extend(ids)
+                column.offsets.append(len(column.ids))
+        return catalog
+
+
+def load_json(path: str) -> Catalog:
+    with open(path, encoding="utf-8") as catalog_file:
+        data = json.load(catalog_file)
+    if isinstance(data, dict):
+        return Catalog.from_mapping(data)
+    return Catalog.from_records(data)
+
+
+def load_csv(path: str) -> Catalog:
+    with open(path, newline="", encoding="utf-8") as catalog_file:
+        reader = csv.reader(catalog_file)
+        return Catalog.from_flat_rows(next(reader, []), reader)
+
+
+def load_sqlite(path: str, table: str = "products") -> Catalog:
+    connection = sqlite3.connect(path)
+    try:
+        rows = connection.execute(f'SELECT * FROM "{table}" ORDER BY rowid')
+        columns = [column[0] for column in rows.description]
+        return Catalog.from_flat_rows(columns, rows)
+    finally:
+        connection.close()
+
+
+def load_catalog(source: str) -> Catalog:
+    """
+    Load a catalog from a .json, .csv or .sqlite/.db file, or the built-in
+    ingredient data when source is empty.
+    """
+    if not source:
+        from app.data.ingredients import INGREDIENTS_DATA
+
+        return Catalog.from_mapping(INGREDIENTS_DATA)
+
+    extension = source.rsplit(".", 1)[-1].lower()
+    if extension == "json":
+        return load_json(source)
+    if extension == "csv":
+        return load_csv(source)
+    if extension in ("sqlite", "sqlite3", "db"):
+        return load_sqlite(source)
+    raise ValueError(f"Unsupported catalog source: {source}")
+
+
+_catalog: Optional[Catalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> Catalog:
+    """
+    The catalog configured by CATALOG_SOURCE, loaded on first use.
+    """
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = load_catalog(settings.CATALOG_SOURCE)
+    return _catalog
@@ -0,0 +1,159 @@
+"""
+Facet index for filtering product lists by category, tag and price.
+
+Each facet value maps to a bitset (a Python int with bit ``i`` set for row
+``i``), so combined filters are a few integer ANDs. Price ranges are parsed
+once from strings like ``"$15-30/lb"`` and kept in sorted arrays that are
+bisected for min/max price bounds.
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+
+# Amounts may group thousands with commas, as in "$1,200-1,500/case"
+_PRICE_PATTERN = re.compile(
+    r"\$?\s*(\d[\d,]*(?:\.\d+)?)\s*(?:-\s*\$?\s*(\d[\d,]*(?:\.\d+)?))?\s*(?:/\s*(\w+))?"
+)
+
+
+def _amount(text: str) -> float:
+    return float(text.replace(",", ""))
+
+
+class PriceRange(NamedTuple):
+    low: float
+    high: float
+    unit: str
+
+
+def parse_price_range(value: str) -> Optional[PriceRange]:
+    """
+    Parse "$15-30/lb" into PriceRange(15.0, 30.0, "lb"). Single prices give
+    low == high; unparseable strings give None.
+    """
+    match = _PRICE_PATTERN.search(value or "")
+    if match is None:
+        return None
+    low = _amount(match.group(1))
+    high = _amount(match.group(2)) if match.group(2) else low
+    return PriceRange(min(low, high), max(low, high), match.group(3) or "")
+
+
+def _bits(rows: Sequence[int], size: int) -> int:
+    # Packed through numpy: OR-ing one bit at a time into a large int is
+    # quadratic in the catalog size
+    mask = np.zeros(size, dtype=bool)
+    mask[rows] = True
+    return int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
+
+
+def _rows(
+    bits: int, size: int, start: int = 0, limit: Optional[int] = None
+) -> List[int]:
+    if start >= size:
+        return []
+    # Shifting skips rows before start without walking them
+    bits >>= start
+    packed = np.frombuffer(
+        bits.to_bytes((size - start + 7) // 8, "little"), dtype=np.uint8
+    )
+    rows = np.flatnonzero(np.unpackbits(packed, bitorder="little"))
+    if limit is not None:
+        rows = rows[:limit]
+    return (rows + start).tolist()
+
+
+class FacetIndex:
+    """
+    Bitset index over rows of (labels, price range). Labels are matched
+    case-insensitively; category and tags share one label space, as the
+    filters have always matched either.
+    """
+
+    def __init__(self, rows: Sequence[Tuple[Iterable[str], Optional[PriceRange]]]):
+        self.size = len(rows)
+        self._all = (1 << self.size) - 1
+        labels: Dict[str, List[int]] = {}
+        lows: List[Tuple[float, int]] = []
+        highs: List[Tuple[float, int]] = []
+        for row, (row_labels, price) in enumerate(rows):
+            for label in {label.lower() for label in row_labels}:
+                labels.setdefault(label, []).append(row)
+            if price is not None:
+                lows.append((price.low, row))
+                highs.append((price.high, row))
+
+        self._labels = {
+            label: _bits(label_rows, self.size) for label, label_rows in labels.items()
+        }
+        self._priced = _bits([row for _, row in lows], self.size)
+        lows.sort()
+        highs.sort()
+        self._lows = [price for price, _ in lows]
+        self._low_rows = np.array([row for _, row in lows], dtype=np.intp)
+        self._highs = [price for price, _ in highs]
+        self._high_rows = np.array([row for _, row in highs], dtype=np.intp)
+
+    def label(self, value: str) -> int:
+        return self._labels.get(value.lower(), 0)
+
+    def price_between(
+        self, min_price: Optional[float] = None, max_price: Optional[float] = None
+    ) -> int:
+        """
+        Rows whose price range overlaps [min_price, max_price]. Rows without
+        a parseable price never match a price bound.
+        """
+        bits = self._priced
+        if max_price is not None:
+            # low <= max_price: a prefix of the rows sorted by low price
+            end = bisect_right(self._lows, max_price)
+            bits &= _bits(self._low_rows[:end], self.size)
+        if min_price is not None:
+            # high >= min_price: a suffix of the rows sorted by high price
+            start = bisect_left(self._highs, min_price)
+            bits &= _bits(self._high_rows[start:], self.size)
+        return bits
+
+    def select(
+        self,
+        category: Optional[str] = None,
+        tag: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+    ) -> int:
+        """
+        Bitset of the rows matching every given filter.
+        """
+        bits = self._all
+        if category:
+            bits &= self.label(category)
+        if tag:
+            bits &= self.label(tag)
+        if min_price is not None or max_price is not None:
+            bits &= self.price_between(min_price, max_price)
+        return bits
+
+    def rows(self, bits: int, start: int = 0, limit: Optional[int] = None) -> List[int]:
+        """
+        Rows set in bits, in row order, from row start onwards.
+        """
+        return _rows(bits, self.size, start, limit)
+
+    @staticmethod
+    def count(bits: int) -> int:
+        return bin(bits).count("1")
+
+    def filter(
+        self,
+        category: Optional[str] = None,
+        tag: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+    ) -> List[int]:
+        """
+        Rows matching every given filter, in row order.
+        """
+        return self.rows(self.select(category, tag, min_price, max_price))
@@ -0,0 +1,299 @@
+"""
+Perceptual hashing and near-duplicate lookup for menu images.
+
+A difference hash (dHash) survives re-photographing the same printed menu at
+a slightly different angle or exposure, but it only sees the layout: menus
+set in the same template hash alike whatever they list. Hashes of previously
+analyzed images are kept in a BK-tree to find candidates within a Hamming
+radius, and each candidate is then verified on a finer signature of the
+image's content area before its analysis is reused. Fingerprints are
+persisted next to the analysis cache and expire with it; each lookup first
+adds the ones other processes stored since the last.
+"""
+
+import io
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+from PIL import Image, ImageOps
+from app.core.config import settings
+from app.services.image_tiling import content_span
+
+HASH_SIZE = 8
+DETAIL_WIDTH = 64  # Width of the signature candidates are verified on
+DETAIL_MAX_HEIGHT = DETAIL_WIDTH * 8
+DETAIL_MAX_SHIFT = 1  # Signature pixels a re-photographed menu may move by
+DETAIL_ASPECT_TOLERANCE = 0.05  # Content areas differing more never match
+INK_THRESHOLD = 128  # Gray level below which a pixel counts as content
+
+
+class ImageFingerprint(NamedTuple):
+    phash: int
+    detail: np.ndarray  # Darkness of the content area, DETAIL_WIDTH wide
+
+
+def _difference_hash(gray: Image.Image, hash_size: int) -> int:
+    small = gray.resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    pixels = list(small.getdata())
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def _open_gray(image_bytes: bytes, size: int) -> Image.Image:
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        # Let the JPEG decoder downscale while decoding instead of afterwards
+        image.draft("L", (size, size))
+        return image.convert("L")
+
+
+def dhash(image_bytes: bytes, hash_size: int = HASH_SIZE) -> int:
+    """
+    Compute a 64-bit difference hash of an image.
+    """
+    return _difference_hash(_open_gray(image_bytes, hash_size * 8), hash_size)
+
+
+def content_detail(gray: Image.Image) -> np.ndarray:
+    """
+    Darkness of the image cropped to its content, DETAIL_WIDTH wide. The
+    crop makes the signature independent of margins and of the scale the
+    menu was photographed at.
+    """
+    gray = ImageOps.autocontrast(gray, cutoff=1)
+    ink = np.asarray(gray) < INK_THRESHOLD
+    top, bottom = content_span(ink.mean(axis=1))
+    left, right = content_span(ink.mean(axis=0))
+    content = gray.crop((left, top, right, bottom))
+    height = round(DETAIL_WIDTH * content.height / content.width)
+    small = content.resize(
+        (DETAIL_WIDTH, min(DETAIL_MAX_HEIGHT, max(1, height))),
+        Image.Resampling.BOX,
+    )
+    return 255 - np.asarray(small, dtype=np.uint8)
+
+
+def fingerprint(image_bytes: bytes) -> ImageFingerprint:
+    gray = _open_gray(image_bytes, DETAIL_WIDTH * 4)
+    return ImageFingerprint(_difference_hash(gray, HASH_SIZE), content_detail(gray))
+
+
+def detail_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    Highest correlation of two signatures over shifts of up to
+    DETAIL_MAX_SHIFT pixels each way; 0 when their content areas differ in
+    aspect ratio or either is blank.
+    """
+    if abs(len(a) - len(b)) > max(1, DETAIL_ASPECT_TOLERANCE * len(a)):
+        return 0.0
+    height = min(len(a), len(b)) - 2 * DETAIL_MAX_SHIFT
+    width = DETAIL_WIDTH - 2 * DETAIL_MAX_SHIFT
+    if height <= 0:
+        return 0.0
+
+    core = a[
+        DETAIL_MAX_SHIFT : DETAIL_MAX_SHIFT + height,
+        DETAIL_MAX_SHIFT : DETAIL_MAX_SHIFT + width,
+    ].astype(np.float32)
+    core -= core.mean()
+    core_norm = np.linalg.norm(core)
+    if not core_norm:
+        return 0.0
+
+    best = 0.0
+    for dy in range(2 * DETAIL_MAX_SHIFT + 1):
+        for dx in range(2 * DETAIL_MAX_SHIFT + 1):
+            window = b[dy : dy + height, dx : dx + width].astype(np.float32)
+            window -= window.mean()
+            window_norm = np.linalg.norm(window)
+            if window_norm:
+                best = max(
+                    best, float((core * window).sum()) / (core_norm * window_norm)
+                )
+    return best
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over integer hashes using Hamming distance.
+    """
+
+    def __init__(self):
+        self._root: Optional[Tuple[int, List[str], Dict[int, tuple]]] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, value: int, key: str) -> None:
+        self._size += 1
+        if self._root is None:
+            self._root = (value, [key], {})
+            return
+
+        node = self._root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                node[1].append(key)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (value, [key], {})
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> List[Tuple[int, str]]:
+        """
+        Return (distance, key) pairs within max_distance, closest first.
+        """
+        matches = []
+        if self._root is None:
+            return matches
+
+        stack = [self._root]
+        while stack:
+            node_value, keys, children = stack.pop()
+            distance = hamming_distance(value, node_value)
+            if distance <= max_distance:
+                matches.extend((distance, key) for key in keys)
+            low, high = distance - max_distance, distance + max_distance
+            stack.extend(
+                child for edge, child in children.items() if low <= edge <= high
+            )
+
+        matches.sort()
+        return matches
+
+
+class NearDuplicateIndex:
+    def __init__(self, db_path: str, ttl_seconds: int):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self._tree: Optional[BKTree] = None
+        # Newest row in the tree; if it is gone, the table was cleared
+        self._last_row: Tuple[int, Optional[str]] = (0, None)
+        self._lock = threading.Lock()
+        self._initialized = False
+        self.hits = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, timeout=10)
+        if not self._initialized:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS image_fingerprints ("
+                "key TEXT PRIMARY KEY, created_at REAL NOT NULL, "
+                "phash TEXT NOT NULL, detail BLOB NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_image_fingerprints_created "
+                "ON image_fingerprints (created_at)"
+            )
+            self._initialized = True
+        return connection
+
+    def _load(self, connection: sqlite3.Connection) -> BKTree:
+        last_rowid, last_key = self._last_row
+        if self._tree is not None and last_key is not None:
+            row = connection.execute(
+                "SELECT key FROM image_fingerprints WHERE rowid = ?", (last_rowid,)
+            ).fetchone()
+            rows = connection.execute(
+                "SELECT COUNT(*) FROM image_fingerprints"
+            ).fetchone()[0]
+            # Rebuild once cleared, or once most of the tree has expired
+            if row is None or row[0] != last_key or len(self._tree) > 2 * rows:
+                self._tree = None
+        if self._tree is None:
+            self._tree = BKTree()
+            self._last_row = (0, None)
+            last_rowid = 0
+        for rowid, key, phash in connection.execute(
+            "SELECT rowid, key, phash FROM image_fingerprints WHERE rowid > ? "
+            "ORDER BY rowid",
+            (last_rowid,),
+        ):
+            self._tree.add(int(phash, 16), key)
+            self._last_row = (rowid, key)
+        return self._tree
+
+    def find(
+        self,
+        image: ImageFingerprint,
+        max_distance: int,
+        key_suffix: str,
+        min_similarity: float,
+    ) -> List[str]:
+        """
+        Return keys of indexed images within max_distance whose signature
+        correlates with the image's by at least min_similarity, most similar
+        first. Only unexpired keys ending in key_suffix (the current model
+        and prompt version) are considered.
+        """
+        with self._lock, self._connect() as connection:
+            matches = self._load(connection).search(image.phash, max_distance)
+            candidates = list(
+                dict.fromkeys(key for _, key in matches if key.endswith(key_suffix))
+            )
+            rows = [
+                connection.execute(
+                    "SELECT key, detail FROM image_fingerprints "
+                    "WHERE key = ? AND created_at >= ?",
+                    (key, time.time() - self.ttl_seconds),
+                ).fetchone()
+                for key in candidates
+            ]
+
+        scored = []
+        for row in rows:
+            if row is None:
+                continue
+            detail = np.frombuffer(row[1], dtype=np.uint8).reshape(-1, DETAIL_WIDTH)
+            similarity = detail_similarity(image.detail, detail)
+            if similarity >= min_similarity:
+                scored.append((similarity, row[0]))
+        scored.sort(reverse=True)
+        return [key for _, key in scored]
+
+    def add(self, image: ImageFingerprint, key: str) -> None:
+        # The next lookup loads it into the tree, as in every other process
+        created_at = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO image_fingerprints "
+                "(key, created_at, phash, detail) VALUES (?, ?, ?, ?)",
+                (key, created_at, f"{image.phash:016x}", image.detail.tobytes()),
+            )
+            connection.execute(
+                "DELETE FROM image_fingerprints WHERE created_at < ?",
+                (created_at - self.ttl_seconds,),
+            )
+
+    def record_hit(self) -> None:
+        with self._lock:
+            self.hits += 1
+
+    def clear(self) -> None:
+        with self._connect() as connection:
+            connection.execute("DELETE FROM image_fingerprints")
+        with self._lock:
+            self._tree = None
+            self._last_row = (0, None)
+            self.hits = 0
+
+
+near_duplicate_index = NearDuplicateIndex(
+    db_path=os.path.join(settings.UPLOAD_DIR, "analysis_cache.sqlite3"),
+    ttl_seconds=settings.ANALYSIS_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,120 @@
+"""
+Image preprocessing applied before a menu image is sent to the vision model.
+
+The model downsamples large images anyway (longest side to 2048px, then
+shortest side to 768px), so uploads are orientation-corrected, downscaled to
+that effective resolution and re-encoded before base64 encoding. Each stage
+is timed so slow steps show up in the logs.
+"""
+
+import io
+import logging
+import time
+from typing import Dict, NamedTuple
+from PIL import Image, ImageOps
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MIME_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+
+
+class PreprocessedImage(NamedTuple):
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    timings: Dict[str, float]
+
+
+def detect_mime_type(image_bytes: bytes) -> str:
+    if image_bytes.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/jpeg"
+
+
+def target_size(width: int, height: int) -> tuple:
+    """
+    Size the model would downsample to: longest side within
+    IMAGE_MAX_DIMENSION and shortest side within IMAGE_MAX_SHORT_SIDE.
+    """
+    scale = min(
+        1.0,
+        settings.IMAGE_MAX_DIMENSION / max(width, height),
+        settings.IMAGE_MAX_SHORT_SIDE / min(width, height),
+    )
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def preprocess_image(image_bytes: bytes) -> PreprocessedImage:
+    """
+    Fix EXIF orientation, downscale, optionally normalize and re-encode an
+    image. Falls back to the original bytes when preprocessing is disabled,
+    the image cannot be decoded, or re-encoding would not make it smaller.
+    """
+    original = PreprocessedImage(image_bytes, detect_mime_type(image_bytes), 0, 0, {})
+    if not settings.IMAGE_PREPROCESSING_ENABLED:
+        return original
+
+    timings = {}
+    try:
+        start = time.perf_counter()
+        image = Image.open(io.BytesIO(image_bytes))
+        # Let the JPEG decoder skip resolution we would throw away anyway
+        image.draft("RGB", target_size(*image.size))
+        image.load()
+        timings["decode"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        transposed = ImageOps.exif_transpose(image)
+        changed = transposed is not image
+        image = transposed
+        timings["orientation"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        size = target_size(*image.size)
+        if size != image.size:
+            image = image.resize(size, Image.Resampling.LANCZOS)
+            changed = True
+        timings["resize"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if settings.IMAGE_GRAYSCALE:
+            image = image.convert("L")
+            changed = True
+        elif image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        if settings.IMAGE_AUTOCONTRAST:
+            image = ImageOps.autocontrast(image, cutoff=1)
+            changed = True
+        timings["normalize"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        output_format = settings.IMAGE_OUTPUT_FORMAT.upper()
+        buffer = io.BytesIO()
+        image.save(buffer, format=output_format, quality=settings.IMAGE_QUALITY)
+        data = buffer.getvalue()
+        timings["encode"] = time.perf_counter() - start
+
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning("Image preprocessing failed, sending original: %s", e)
+        return original
+
+    if not changed and len(data) >= len(image_bytes):
+        return original._replace(
+            width=image.width, height=image.height, timings=timings
+        )
+
+    logger.debug(
+        "Preprocessed image %d -> %d bytes (%dx%d) in %s",
+        len(image_bytes),
+        len(data),
+        image.width,
+        image.height,
+        {stage: round(seconds * 1000, 2) for stage, seconds in timings.items()},
+    )
+    return PreprocessedImage(
+        data, MIME_TYPES[output_format], image.width, image.height, timings
+    )
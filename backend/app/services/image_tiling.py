@@ -0,0 +1,155 @@
+"""
+Splitting large menu images into tiles analyzed separately.
+
+The vision model sees at most 768px on the short side, so a dense
+multi-column menu reaches it as small print and comes back as one long
+completion. Projecting dark pixels onto each axis finds the blank gutters
+between columns and the blank gaps between sections; each column is cut
+into bands of bounded aspect ratio at those gaps (or, where there is none,
+with an overlap so no line is lost), and every tile is analyzed on its own.
+"""
+
+import io
+import logging
+import math
+from typing import List, Tuple
+import numpy as np
+from PIL import Image, ImageOps
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Box = Tuple[int, int, int, int]  # left, upper, right, lower
+
+ANALYSIS_WIDTH = 1000  # Projections are computed on a copy this wide
+INK_THRESHOLD = 128  # Gray level below which a pixel counts as ink
+BLANK_INK = 0.005  # Share of ink for a pixel row/column to count as blank
+MIN_GUTTER_SHARE = 0.015  # Narrowest column gutter, as a share of width
+MIN_COLUMN_SHARE = 0.15  # Narrowest column, as a share of width
+SNAP_SHARE = 0.25  # How far a band cut may move to reach a blank row
+
+
+def blank_runs(blank: np.ndarray, min_length: int) -> List[Tuple[int, int]]:
+    """[start, end) of each run of True at least min_length long"""
+    padded = np.concatenate(([False], blank, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    return [
+        (int(start), int(end))
+        for start, end in zip(edges[::2], edges[1::2])
+        if end - start >= min_length
+    ]
+
+
+def content_span(ink: np.ndarray) -> Tuple[int, int]:
+    inked = np.flatnonzero(ink >= BLANK_INK)
+    if not len(inked):
+        return 0, len(ink)
+    return int(inked[0]), int(inked[-1]) + 1
+
+
+def find_columns(ink: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    Column spans from the share of ink in each pixel column, cut at the
+    middle of interior gutters that leave both sides wide enough.
+    """
+    start, end = content_span(ink)
+    width = len(ink)
+    min_column = MIN_COLUMN_SHARE * width
+    cuts = [start]
+    for gutter_start, gutter_end in blank_runs(
+        ink[start:end] < BLANK_INK, max(1, int(MIN_GUTTER_SHARE * width))
+    ):
+        cut = start + (gutter_start + gutter_end) // 2
+        if cut - cuts[-1] >= min_column and end - cut >= min_column:
+            cuts.append(cut)
+    cuts.append(end)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def find_bands(
+    ink: np.ndarray, max_height: float, overlap: int
+) -> List[Tuple[int, int]]:
+    """
+    Split a column's rows into bands no taller than max_height, cutting at
+    the blank row nearest each even split point, or overlapping neighbours
+    by overlap rows where no blank row is close enough.
+    """
+    start, end = content_span(ink)
+    count = math.ceil((end - start) / max_height)
+    if count <= 1:
+        return [(start, end)]
+
+    blank = np.flatnonzero(ink < BLANK_INK)
+    window = SNAP_SHARE * max_height
+    bands = []
+    upper = start
+    for i in range(1, count):
+        target = start + (end - start) * i / count
+        nearby = blank[np.abs(blank - target) <= window] if len(blank) else blank
+        if len(nearby):
+            cut = int(nearby[np.argmin(np.abs(nearby - target))])
+            bands.append((upper, cut))
+            upper = cut
+        else:
+            cut = int(target)
+            bands.append((upper, min(end, cut + overlap)))
+            upper = max(start, cut - overlap)
+    bands.append((upper, end))
+    return bands
+
+
+def plan_tiles(gray: Image.Image) -> List[Box]:
+    """
+    Tile boxes in gray's coordinates, in reading order: down each column,
+    columns left to right.
+    """
+    scale = min(1.0, ANALYSIS_WIDTH / gray.width)
+    small = gray.resize(
+        (max(1, round(gray.width * scale)), max(1, round(gray.height * scale)))
+    )
+    ink = np.asarray(small) < INK_THRESHOLD
+
+    boxes = []
+    for left, right in find_columns(ink.mean(axis=0)):
+        column_ink = ink[:, left:right].mean(axis=1)
+        max_height = (right - left) * settings.MENU_TILE_MAX_ASPECT
+        overlap = int(settings.MENU_TILE_OVERLAP * max_height)
+        for upper, lower in find_bands(column_ink, max_height, overlap):
+            boxes.append(
+                (
+                    int(left / scale),
+                    int(upper / scale),
+                    min(gray.width, math.ceil(right / scale)),
+                    min(gray.height, math.ceil(lower / scale)),
+                )
+            )
+    return boxes
+
+
+def split_menu_image(image_bytes: bytes) -> List[bytes]:
+    """
+    JPEG tiles of a large menu image, or an empty list when the image is
+    small, cannot be decoded, or would not split into 2 to
+    MENU_TILING_MAX_TILES tiles.
+    """
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        if image.width * image.height < settings.MENU_TILING_MIN_PIXELS:
+            return []
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        boxes = plan_tiles(ImageOps.autocontrast(image.convert("L"), cutoff=1))
+    except (OSError, ValueError) as e:
+        logger.warning("Tiling failed, analyzing whole image: %s", e)
+        return []
+
+    if not 1 < len(boxes) <= settings.MENU_TILING_MAX_TILES:
+        return []
+
+    tiles = []
+    for box in boxes:
+        buffer = io.BytesIO()
+        image.crop(box).save(buffer, format="JPEG", quality=settings.IMAGE_QUALITY)
+        tiles.append(buffer.getvalue())
+    return tiles
@@ -1,34 +1,195 @@
-import base64
-from typing import List, Dict
-import json
-from openai import OpenAI
+import asyncio
+import binascii
+import sqlite3
+import threading
+import time
+from typing import AsyncIterator, List, Dict, NamedTuple, Optional, Tuple
+import logging
+from anyio import to_thread
 from app.core.config import settings
-from app.data.ingredients import INGREDIENTS_DATA
+from app.core.metrics import (
+    ANALYSIS_ERRORS,
+    ANALYSIS_PATH_SECONDS,
+    ANALYSIS_PATH_TOKENS,
+    ANALYSIS_SALVAGED_ITEMS,
+    ANALYSIS_STAGE_SECONDS,
+    OCR_FALLBACKS,
+    RECOMMENDATION_STAGE_SECONDS,
+)
+from app.services.analysis_cache import analysis_cache
+from app.services.image_hash import (
+    ImageFingerprint,
+    fingerprint,
+    near_duplicate_index,
+)
+from app.services.image_preprocessing import preprocess_image
+from app.services.image_tiling import split_menu_image
+from app.services.recommendation_index import IngredientIndex
+from app.services.product_catalog import ProductRecords
+from app.services.catalog import Catalog, get_catalog
+from app.services.menu_ocr import read_menu_layout
+from app.services.menu_parsing import ParsedMenu, parse_menu_items, validate_item
+from app.services.menu_stream import MenuItemStreamParser
+from app.services.model_client import CircuitOpenError, model_client
+from app.services.rate_limiter import INTERACTIVE
+from app.services.token_usage import token_usage
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+logger = logging.getLogger(__name__)
 
+# Premium Mozzarella, Wagyu Beef, Heirloom Tomatoes, Extra Virgin Olive Oil
+# and Saffron Threads fill up menus with few matches
+DEFAULT_RECOMMENDATION_CATEGORIES = [
+    "Dairy & Cheese",
+    "Premium Meats",
+    "Specialty Produce",
+    "Premium Oils & Vinegars",
+    "Specialty Spices",
+]
 
-def encode_image(image_path: str) -> str:
+
+class RecommendationEngine(NamedTuple):
+    index: IngredientIndex
+    records: ProductRecords
+    default_positions: List[int]
+
+
+def _default_positions(catalog: Catalog) -> List[int]:
+    """
+    First item of each default category, then of any other category, so
+    catalogs without the built-in categories still get fill-ins.
+    """
+    first_by_category = {}
+    for position in range(len(catalog)):
+        first_by_category.setdefault(catalog.category(position), position)
+    preferred = [
+        first_by_category.pop(category)
+        for category in DEFAULT_RECOMMENDATION_CATEGORIES
+        if category in first_by_category
+    ]
+    return preferred + list(first_by_category.values())
+
+
+_engine: Optional[RecommendationEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_recommendation_engine() -> RecommendationEngine:
+    """
+    Index and product records for the configured catalog, built once so
+    ranking a menu only touches the postings of its terms. The app warms it
+    at startup; product records are built as they get recommended.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                catalog = get_catalog()
+                _engine = RecommendationEngine(
+                    IngredientIndex(catalog),
+                    ProductRecords(catalog),
+                    _default_positions(catalog),
+                )
+    return _engine
+
+
+# Bump whenever the prompts below change so cached analyses are not reused
+PROMPT_VERSION = "1"
+
+# How a menu was analyzed, for per-path metrics
+LOCAL_PATH = "local"
+TEXT_PATH = "text"
+VISION_PATH = "vision"
+TILED_PATH = "tiled"
+
+
+def read_image(image_path: str) -> bytes:
     with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode("utf-8")
+        return image_file.read()
 
 
-def analyze_menu_image(image_path: str) -> Dict:
+def encode_data_url(image_data: bytes, mime_type: str) -> str:
     """
-    Analyze a menu image using gpt-4o-mini.
-    Returns structured data about menu items, including names, prices, and ingredients.
+    Build a base64 data URL from an in-memory image.
+    The encoding is written chunk by chunk into one preallocated buffer, so
+    only that buffer and the final string are ever held alongside the image.
+    """
+    prefix = f"data:{mime_type};base64,".encode("ascii")
+    view = memoryview(image_data)
+    buffer = bytearray(len(prefix) + 4 * ((len(view) + 2) // 3))
+    buffer[: len(prefix)] = prefix
+
+    position = len(prefix)
+    chunk_size = 3 * 64 * 1024  # multiple of 3 so chunks encode without padding
+    for start in range(0, len(view), chunk_size):
+        encoded = binascii.b2a_base64(view[start : start + chunk_size], newline=False)
+        buffer[position : position + len(encoded)] = encoded
+        position += len(encoded)
+
+    return buffer.decode("ascii")
+
+
+def cache_version(ocr_mode: str) -> str:
+    # Menus read from local OCR are not interchangeable with vision results
+    return f"{PROMPT_VERSION}:ocr-{ocr_mode}"
+
+
+def lookup_cached_analysis(
+    image_bytes: bytes, ocr_mode: str
+) -> Tuple[str, Optional[ImageFingerprint], Optional[Dict]]:
+    """
+    Find a previous analysis of the same or a near-duplicate image made
+    with the given OCR mode. Returns the exact cache key, the image
+    fingerprint (when computed) and the cached result, if any.
     """
+    cache_key = analysis_cache.make_key(
+        image_bytes, settings.OPENAI_MODEL, cache_version(ocr_mode)
+    )
+    if not settings.ANALYSIS_CACHE_ENABLED:
+        return cache_key, None, None
+
+    cached = analysis_cache.get(cache_key)
+    if cached is not None or not settings.NEAR_DUPLICATE_ENABLED:
+        return cache_key, None, cached
+
     try:
-        # Encode the image to base64
-        base64_image = encode_image(image_path)
+        image_fingerprint = fingerprint(image_bytes)
+    except (OSError, ValueError) as e:
+        logger.warning("Perceptual hash failed: %s", e)
+        return cache_key, None, None
 
-        # Call gpt-4o-mini API with the image
-        response = client.chat.completions.create(
-            model=settings.OPENAI_MODEL,
-            messages=[
-                {
-                    "role": "system",
-                    "content": """You are a menu analysis expert. Your task is to extract menu items from images and return them in a specific JSON format.
+    key_suffix = f":{settings.OPENAI_MODEL}:{cache_version(ocr_mode)}"
+    for key in near_duplicate_index.find(
+        image_fingerprint,
+        settings.NEAR_DUPLICATE_MAX_DISTANCE,
+        key_suffix,
+        settings.NEAR_DUPLICATE_MIN_SIMILARITY,
+    ):
+        cached = analysis_cache.get(key, record=False)
+        if cached is not None:
+            near_duplicate_index.record_hit()
+            return cache_key, image_fingerprint, cached
+
+    return cache_key, image_fingerprint, None
+
+
+def store_cached_analysis(
+    cache_key: str, image_fingerprint: Optional[ImageFingerprint], result: Dict
+) -> None:
+    if not settings.ANALYSIS_CACHE_ENABLED:
+        return
+    analysis_cache.set(cache_key, result)
+    if image_fingerprint is not None:
+        near_duplicate_index.add(image_fingerprint, cache_key)
+
+
+def build_messages(image_url: str) -> List[Dict]:
+    """
+    Chat messages asking the model to extract menu items from an image.
+    """
+    return [
+        {
+            "role": "system",
+            "content": """You are a menu analysis expert. Your task is to extract menu items from images and return them in a specific JSON format.
                     Always return a valid JSON array of menu items with the following structure:
                     {
                         "menu_items": [
@@ -39,141 +200,549 @@ def analyze_menu_image(image_path: str) -> Dict:
                             }
                         ]
                     }""",
-                },
+        },
+        {
+            "role": "user",
+            "content": [
                 {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": """Please analyze this menu and extract all items.
+                    "type": "text",
+                    "text": """Please analyze this menu and extract all items.
                             Format requirements:
                             1. Return ONLY valid JSON
                             2. Each item must have: name, price, and ingredients array
                             3. Price must include currency symbol
                             4. Ingredients should be an array of strings
                             5. Do not include any explanations or text outside the JSON structure""",
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
-                            },
-                        },
-                    ],
+                },
+                {
+                    "type": "image_url",
+                    "image_url": {"url": image_url},
                 },
             ],
-            max_tokens=settings.MAX_TOKENS,
+        },
+    ]
+
+
+def build_remainder_messages(messages: List[Dict], items: List[Dict]) -> List[Dict]:
+    """
+    Messages asking for the rest of a menu whose response was cut off after
+    items: the original request plus the names already extracted.
+    """
+    names = "\n".join(f"- {item['name']}" for item in items)
+    return [
+        *messages,
+        {
+            "role": "user",
+            "content": f"""Your previous answer was cut off. These items were already extracted:
+{names}
+Return ONLY the menu items that come after them, in the same JSON format.""",
+        },
+    ]
+
+
+def build_text_messages(menu_text: str) -> List[Dict]:
+    """
+    Chat messages asking the model to extract menu items from OCR text
+    instead of an image.
+    """
+    system_message = build_messages("")[0]
+    return [
+        system_message,
+        {
+            "role": "user",
+            "content": f"""Please analyze this menu text, read by OCR, and extract all items.
+                            Format requirements:
+                            1. Return ONLY valid JSON
+                            2. Each item must have: name, price, and ingredients array
+                            3. Price must include currency symbol
+                            4. Ingredients should be an array of strings; infer them from the dish when the text lists none
+                            5. Do not include any explanations or text outside the JSON structure
+
+{menu_text}""",
+        },
+    ]
+
+
+async def prepare_image(image_bytes: bytes) -> Tuple[str, int]:
+    """
+    Shrink the image to what the model actually looks at and encode it, both
+    off the event loop. Returns the data URL and the pixel count sent (0 when
+    the image could not be decoded).
+    """
+    with ANALYSIS_STAGE_SECONDS.labels("preprocess").time():
+        preprocessed = await to_thread.run_sync(preprocess_image, image_bytes)
+    with ANALYSIS_STAGE_SECONDS.labels("encode").time():
+        image_url = await to_thread.run_sync(
+            encode_data_url, preprocessed.data, preprocessed.mime_type
+        )
+    return image_url, preprocessed.width * preprocessed.height
+
+
+def choose_max_tokens(image_pixels: int) -> int:
+    """
+    Completion budget for an image: sized from usage history when adaptive
+    budgets are on and there is enough of it, else MAX_TOKENS.
+    """
+    if settings.TOKEN_USAGE_ENABLED and settings.ADAPTIVE_MAX_TOKENS_ENABLED:
+        suggested = token_usage.suggest_max_tokens(settings.OPENAI_MODEL, image_pixels)
+        if suggested is not None:
+            return suggested
+    return settings.MAX_TOKENS
+
+
+def record_usage(
+    response, max_tokens: int, latency_ms: float, image_pixels: int, item_count: int
+) -> None:
+    if not settings.TOKEN_USAGE_ENABLED or response.usage is None:
+        return
+    try:
+        token_usage.record(
+            model=settings.OPENAI_MODEL,
+            prompt_tokens=response.usage.prompt_tokens,
+            completion_tokens=response.usage.completion_tokens,
+            max_tokens=max_tokens,
+            latency_ms=latency_ms,
+            image_pixels=image_pixels,
+            item_count=item_count,
+            truncated=response.choices[0].finish_reason == "length",
+        )
+    except sqlite3.Error as e:
+        logger.warning("Recording token usage failed: %s", e)
+
+
+async def request_menu_items(
+    messages: List[Dict],
+    max_tokens: int,
+    image_pixels: int,
+    priority: int,
+    request_id: Optional[str],
+    path: str,
+) -> Optional[ParsedMenu]:
+    """
+    Ask the model for the menu items in messages and validate them. Returns
+    None when nothing could be parsed from the response.
+
+    A completion cut off at max_tokens keeps the items it finished; the
+    model is then asked for the rest of the menu only, with the full
+    budget, up to MENU_SALVAGE_MAX_CONTINUATIONS times. Items still missing
+    after that leave the result marked incomplete.
+    """
+    items: List[Dict] = []
+    request_messages = messages
+    continuations = 0
+    while True:
+        start = time.perf_counter()
+        response = await model_client.create_completion(
+            priority=priority,
+            request_id=request_id,
+            model=settings.OPENAI_MODEL,
+            messages=request_messages,
+            max_tokens=max_tokens,
             temperature=0,
             response_format={"type": "json_object"},
         )
+        latency_ms = (time.perf_counter() - start) * 1000
+        ANALYSIS_STAGE_SECONDS.labels("model_call").observe(latency_ms / 1000)
+        if response.usage is not None:
+            ANALYSIS_PATH_TOKENS.labels(path, "prompt").inc(
+                response.usage.prompt_tokens
+            )
+            ANALYSIS_PATH_TOKENS.labels(path, "completion").inc(
+                response.usage.completion_tokens
+            )
 
-        # Parse the response
+        # Parse and validate the response in one pass
         content = response.choices[0].message.content
-        try:
-            parsed_content = json.loads(content)
-            menu_items = parsed_content.get("menu_items", [])
-
-            # Validate the structure of each menu item
-            validated_items = []
-            for item in menu_items:
-                if all(
-                    key in item for key in ["name", "price", "ingredients"]
-                ) and isinstance(item["ingredients"], list):
-                    validated_items.append(
-                        {
-                            "name": item["name"],
-                            "price": item["price"],
-                            "ingredients": item["ingredients"],
-                        }
-                    )
-
-            return {"success": True, "menu_items": validated_items}
-
-        except json.JSONDecodeError as e:
-            print(f"JSON Decode Error: {str(e)}")
-            print(f"Raw response: {content}")
+        with ANALYSIS_STAGE_SECONDS.labels("json_parse").time():
+            parsed = parse_menu_items(content)
+
+        await to_thread.run_sync(
+            record_usage,
+            response,
+            max_tokens,
+            latency_ms,
+            image_pixels,
+            len(parsed.items) if parsed else 0,
+        )
+
+        if parsed is not None:
+            # Continuations may repeat the last items they were shown
+            items = merge_menu_items([items, parsed.items]) if items else parsed.items
+        truncated = response.choices[0].finish_reason == "length"
+        if not truncated:
+            break
+        if not items and max_tokens < settings.MAX_TOKENS:
+            # Nothing to keep: an adaptive budget that turned out too small
+            # gets one retry with the full budget
+            max_tokens = settings.MAX_TOKENS
+            continue
+        if (
+            not items
+            or not settings.MENU_SALVAGE_ENABLED
+            or continuations >= settings.MENU_SALVAGE_MAX_CONTINUATIONS
+        ):
+            logger.warning("Model response truncated with %d items kept", len(items))
+            ANALYSIS_ERRORS.labels("truncated").inc()
+            break
+        continuations += 1
+        ANALYSIS_SALVAGED_ITEMS.inc(len(parsed.items) if parsed else 0)
+        request_messages = build_remainder_messages(messages, items)
+        max_tokens = settings.MAX_TOKENS
+
+    if parsed is None and not items:
+        logger.error("Model response is not valid JSON")
+        logger.debug("Raw response: %s", content)
+        ANALYSIS_ERRORS.labels("json_decode").inc()
+        return None
+    # Complete only when the last response ended normally as valid JSON
+    complete = not truncated and parsed is not None and parsed.complete
+    return ParsedMenu(items, complete)
+
+
+async def analyze_menu_vision(
+    image_bytes: bytes, priority: int, request_id: Optional[str]
+) -> Tuple[Optional[ParsedMenu], str]:
+    """
+    Analyze a menu image with the vision model: whole, or with tiling on and
+    a large multi-column image, as column/section tiles analyzed
+    concurrently and merged. Returns the items (None if a response could not
+    be parsed) and the path taken.
+    """
+    tiles = []
+    if settings.MENU_TILING_ENABLED:
+        with ANALYSIS_STAGE_SECONDS.labels("tiling").time():
+            tiles = await to_thread.run_sync(split_menu_image, image_bytes)
+    if not tiles:
+        return await analyze_image_items(image_bytes, priority, request_id), VISION_PATH
+
+    semaphore = asyncio.Semaphore(settings.MENU_TILING_MAX_CONCURRENCY)
+
+    async def analyze_tile(tile: bytes) -> Optional[ParsedMenu]:
+        async with semaphore:
+            return await analyze_image_items(tile, priority, request_id, TILED_PATH)
+
+    results = await asyncio.gather(*(analyze_tile(tile) for tile in tiles))
+    if any(menu is None for menu in results):
+        return None, TILED_PATH
+    # Tiles overlap where no blank row separated them, so items read twice
+    # collapse into one
+    return (
+        ParsedMenu(
+            merge_menu_items([menu.items for menu in results]),
+            complete=all(menu.complete for menu in results),
+        ),
+        TILED_PATH,
+    )
+
+
+async def analyze_image_items(
+    image_bytes: bytes,
+    priority: int,
+    request_id: Optional[str],
+    path: str = VISION_PATH,
+) -> Optional[ParsedMenu]:
+    image_url, image_pixels = await prepare_image(image_bytes)
+    max_tokens = await to_thread.run_sync(choose_max_tokens, image_pixels)
+    return await request_menu_items(
+        build_messages(image_url), max_tokens, image_pixels, priority, request_id, path
+    )
+
+
+async def analyze_menu_text(
+    image_bytes: bytes, priority: int, request_id: Optional[str]
+) -> Tuple[Optional[ParsedMenu], str]:
+    """
+    Try to analyze a menu from local OCR instead of sending the image.
+
+    When the OCR layout is confident, its items are returned as parsed in
+    local mode if every item has a description; otherwise only the OCR
+    text goes to a text-only completion. Returns the items (None to fall
+    back to vision) and the path taken.
+    """
+    with ANALYSIS_STAGE_SECONDS.labels("ocr").time():
+        layout = await to_thread.run_sync(read_menu_layout, image_bytes)
+    if layout is None:
+        OCR_FALLBACKS.labels("unavailable").inc()
+        return None, VISION_PATH
+    if not layout.confident:
+        OCR_FALLBACKS.labels("low_confidence").inc()
+        return None, VISION_PATH
+
+    if settings.MENU_OCR_MODE == "local" and layout.complete:
+        return ParsedMenu(layout.items, complete=True), LOCAL_PATH
+
+    # The image is not sent, so the call is recorded without a size and
+    # leaves the per-megapixel budget history alone
+    menu = await request_menu_items(
+        build_text_messages(layout.text),
+        settings.MAX_TOKENS,
+        0,
+        priority,
+        request_id,
+        TEXT_PATH,
+    )
+    if menu is None or not menu.items:
+        OCR_FALLBACKS.labels("text_failed").inc()
+        return None, VISION_PATH
+    return menu, TEXT_PATH
+
+
+async def analyze_menu_image(image_path: str) -> Dict:
+    """
+    Analyze a menu image stored on disk using gpt-4o-mini.
+    """
+    try:
+        image_bytes = await to_thread.run_sync(read_image, image_path)
+    except OSError as e:
+        logger.error("Reading menu image failed: %s", e)
+        ANALYSIS_ERRORS.labels("read").inc()
+        return {"success": False, "error": str(e), "menu_items": []}
+
+    return await analyze_menu_bytes(image_bytes)
+
+
+async def analyze_menu_bytes(
+    image_bytes: bytes, priority: int = INTERACTIVE, request_id: Optional[str] = None
+) -> Dict:
+    """
+    Analyze an in-memory menu image using gpt-4o-mini.
+    Returns structured data about menu items, including names, prices, and ingredients.
+
+    Hashing, preprocessing and base64 encoding run in a worker thread and the
+    model call uses the async client, so the event loop stays free for other
+    requests. Successful results are cached by image content, model, prompt
+    version and OCR mode, and reused for near-duplicate photos of the same
+    menu. A menu whose response was cut off before every item was read is
+    returned with "complete": False and not cached, so the next upload tries
+    again.
+
+    The model call waits its turn at the rate limiter with the given
+    priority; request_id lets callers look up its queue position meanwhile.
+    """
+    try:
+        # Hash and encode the image off the event loop
+        with ANALYSIS_STAGE_SECONDS.labels("cache_lookup").time():
+            cache_key, image_fingerprint, cached = await to_thread.run_sync(
+                lookup_cached_analysis, image_bytes, settings.MENU_OCR_MODE
+            )
+        if cached is not None:
+            return cached
+
+        start = time.perf_counter()
+        menu, path = None, VISION_PATH
+        if settings.MENU_OCR_MODE != "off":
+            menu, path = await analyze_menu_text(image_bytes, priority, request_id)
+
+        if menu is None:
+            menu, path = await analyze_menu_vision(image_bytes, priority, request_id)
+        ANALYSIS_PATH_SECONDS.labels(path).observe(time.perf_counter() - start)
+
+        if menu is None:
             return {
                 "success": False,
                 "error": "Failed to parse menu items",
                 "menu_items": [],
             }
 
+        result = {"success": True, "menu_items": menu.items, "complete": menu.complete}
+        if menu.complete:
+            await to_thread.run_sync(
+                store_cached_analysis, cache_key, image_fingerprint, result
+            )
+        return result
+
+    except CircuitOpenError as e:
+        # Upstream is degraded; tell callers to come back rather than fail
+        ANALYSIS_ERRORS.labels("circuit_open").inc()
+        return {
+            "success": False,
+            "error": str(e),
+            "unavailable": True,
+            "menu_items": [],
+        }
+
     except Exception as e:
-        print(f"Analysis Error: {str(e)}")
+        logger.exception("Menu analysis failed")
+        ANALYSIS_ERRORS.labels("model").inc()
         return {"success": False, "error": str(e), "menu_items": []}
 
 
+async def stream_menu_bytes(image_bytes: bytes) -> AsyncIterator[Dict]:
+    """
+    Analyze an in-memory menu image with a streamed completion, yielding
+    {"type": "item", "item": {...}} for each menu item as soon as the model
+    has written it, then a final {"type": "done", ...} event carrying the
+    same result analyze_menu_bytes would return.
+    """
+    try:
+        # Streaming always reads the image with the vision model
+        cache_key, image_fingerprint, cached = await to_thread.run_sync(
+            lookup_cached_analysis, image_bytes, "off"
+        )
+        if cached is not None:
+            for item in cached["menu_items"]:
+                yield {"type": "item", "item": item}
+            yield {"type": "done", **cached}
+            return
+
+        # Streamed completions carry no usage, so they are not recorded and
+        # keep the full budget: a truncated stream cannot be retried unseen
+        image_url, _ = await prepare_image(image_bytes)
+        stream = await model_client.create_completion(
+            model=settings.OPENAI_MODEL,
+            messages=build_messages(image_url),
+            max_tokens=settings.MAX_TOKENS,
+            temperature=0,
+            response_format={"type": "json_object"},
+            stream=True,
+        )
+
+        # Validate and forward each item as its closing brace arrives
+        parser = MenuItemStreamParser()
+        validated_items = []
+        async for chunk in stream:
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            for item in parser.feed(chunk.choices[0].delta.content):
+                validated = validate_item(item)
+                if validated is not None:
+                    validated_items.append(validated)
+                    yield {"type": "item", "item": validated}
+
+        parsed = parse_menu_items(parser.text)
+        if parsed is None:
+            logger.error("Streamed model response is not valid JSON")
+            logger.debug("Raw response: %s", parser.text)
+            ANALYSIS_ERRORS.labels("json_decode").inc()
+            yield {
+                "type": "done",
+                "success": False,
+                "error": "Failed to parse menu items",
+                "menu_items": validated_items,
+            }
+            return
+
+        result = {
+            "success": True,
+            "menu_items": validated_items,
+            "complete": parsed.complete,
+        }
+        if parsed.complete:
+            await to_thread.run_sync(
+                store_cached_analysis, cache_key, image_fingerprint, result
+            )
+        else:
+            # The items already sent stand; a cut-off menu is not cached
+            logger.warning(
+                "Streamed model response truncated with %d items kept",
+                len(validated_items),
+            )
+            ANALYSIS_ERRORS.labels("truncated").inc()
+        yield {"type": "done", **result}
+
+    except CircuitOpenError as e:
+        ANALYSIS_ERRORS.labels("circuit_open").inc()
+        yield {
+            "type": "done",
+            "success": False,
+            "error": str(e),
+            "unavailable": True,
+            "menu_items": [],
+        }
+
+    except Exception as e:
+        logger.exception("Streamed menu analysis failed")
+        ANALYSIS_ERRORS.labels("model").inc()
+        yield {"type": "done", "success": False, "error": str(e), "menu_items": []}
+
+
+def merge_menu_items(pages: List[List[Dict]]) -> List[Dict]:
+    """
+    Merge menu items from several pages, collapsing items with the same name
+    and price and combining their ingredients. Page order is preserved.
+    """
+    merged = {}
+    for page in pages:
+        for item in page:
+            key = (str(item["name"]).strip().lower(), str(item["price"]).strip())
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = {**item, "ingredients": list(item["ingredients"])}
+                continue
+            for ingredient in item["ingredients"]:
+                if ingredient not in existing["ingredients"]:
+                    existing["ingredients"].append(ingredient)
+    return list(merged.values())
+
+
+async def analyze_menu_pages(pages: List[bytes]) -> Dict:
+    """
+    Analyze the pages of one menu concurrently and merge the results.
+    At most BATCH_MAX_CONCURRENCY pages are in flight at once, so latency is
+    roughly that of the slowest page rather than the sum of all of them.
+    """
+    semaphore = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+
+    async def analyze_page(image_bytes: bytes) -> Dict:
+        async with semaphore:
+            return await analyze_menu_bytes(image_bytes)
+
+    results = await asyncio.gather(*(analyze_page(page) for page in pages))
+
+    for page_number, result in enumerate(results, start=1):
+        if not result["success"]:
+            failure = {
+                "success": False,
+                "error": f"Page {page_number}: {result.get('error', 'Unknown error')}",
+                "menu_items": [],
+            }
+            # Keep the circuit-open flag so the batch is answered with a 503
+            if result.get("unavailable"):
+                failure["unavailable"] = True
+            return failure
+
+    return {
+        "success": True,
+        "menu_items": merge_menu_items([result["menu_items"] for result in results]),
+        "complete": all(result.get("complete", True) for result in results),
+    }
+
+
 def get_ingredient_recommendations(menu_items: List[Dict]) -> Dict:
     """
     Generate product recommendations based on the analyzed menu items using our ingredients database.
+    Returns the RECOMMENDATION_TOP_K best-scoring catalog items with their
+    similarity scores, padded with default premium ingredients.
     """
     try:
-        # Extract all ingredients from menu items
-        menu_ingredients = set()
+        # Extract all ingredients from menu items, once per dish using them
+        menu_ingredients = []
         for item in menu_items:
-            menu_ingredients.update(item.get("ingredients", []))
-
-        # Find matching premium ingredients from our database
-        recommendations = []
-        for category, items in INGREDIENTS_DATA.items():
-            for item in items:
-                # Check if any of the menu ingredients match this premium ingredient's common uses or tags
-                is_relevant = any(
-                    menu_ing.lower() in [use.lower() for use in item["common_uses"]]
-                    or menu_ing.lower() in [tag.lower() for tag in item["tags"]]
-                    or menu_ing.lower() in item["name"].lower()
-                    for menu_ing in menu_ingredients
-                )
+            menu_ingredients.extend(item.get("ingredients", []))
 
-                if is_relevant and len(recommendations) < 5:
-                    recommendations.append(
-                        {
-                            "name": item["name"],
-                            "description": f"Premium {item['name']} available in variants: {', '.join(item['variants'])}. "
-                            f"Supplied by {', '.join(item['suppliers'])}. "
-                            f"Perfect for {', '.join(item['common_uses'])}.",
-                            "price_range": item["price_range"],
-                            "category": category,
-                            "tags": item["tags"],
-                        }
-                    )
+        # Rank the whole catalog against the menu and keep the best matches
+        engine = get_recommendation_engine()
+        top_k = settings.RECOMMENDATION_TOP_K
+        with RECOMMENDATION_STAGE_SECONDS.labels("matching").time():
+            ranked = engine.index.top_k(menu_ingredients, top_k)
+        recommendations = [
+            {**engine.records[position].recommendation, "score": round(score, 4)}
+            for position, score in ranked
+        ]
 
         # If we don't have enough recommendations, add some default premium ingredients
-        if len(recommendations) < 5:
-            default_recommendations = [
-                INGREDIENTS_DATA["Dairy & Cheese"][0],  # Premium Mozzarella
-                INGREDIENTS_DATA["Premium Meats"][0],  # Wagyu Beef
-                INGREDIENTS_DATA["Specialty Produce"][0],  # Heirloom Tomatoes
-                INGREDIENTS_DATA["Premium Oils & Vinegars"][
-                    0
-                ],  # Extra Virgin Olive Oil
-                INGREDIENTS_DATA["Specialty Spices"][0],  # Saffron Threads
-            ]
-
-            for item in default_recommendations:
-                if len(recommendations) >= 5:
-                    break
-
-                # Check if this item is not already recommended
-                if not any(rec["name"] == item["name"] for rec in recommendations):
-                    recommendations.append(
-                        {
-                            "name": item["name"],
-                            "description": f"Premium {item['name']} available in variants: {', '.join(item['variants'])}. "
-                            f"Supplied by {', '.join(item['suppliers'])}. "
-                            f"Perfect for {', '.join(item['common_uses'])}.",
-                            "price_range": item["price_range"],
-                            "category": next(
-                                cat
-                                for cat, items in INGREDIENTS_DATA.items()
-                                if item in items
-                            ),
-                            "tags": item["tags"],
-                        }
-                    )
+        chosen = {position for position, _ in ranked}
+        for position in engine.default_positions:
+            if len(recommendations) >= top_k:
+                break
+            if position not in chosen:
+                recommendations.append(
+                    {**engine.records[position].recommendation, "score": 0.0}
+                )
 
         return {"success": True, "recommendations": recommendations}
 
     except Exception as e:
-        print(f"Recommendation Error: {str(e)}")
+        logger.exception("Building recommendations failed")
+        ANALYSIS_ERRORS.labels("recommendation").inc()
         return {"success": False, "error": str(e), "recommendations": []}
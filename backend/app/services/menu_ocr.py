@@ -0,0 +1,152 @@
+"""
+Local OCR of menu images.
+
+Tesseract reads the text of an upload with a confidence per word. Lines
+ending in a price become menu items, and the unpriced lines under an item
+its description, read as a list of ingredients. A printed text menu reads
+confidently with prices on most lines; photos of dishes, handwriting and
+heavily designed menus fall short and are left to the vision model.
+"""
+
+import io
+import logging
+import re
+from typing import Dict, List, NamedTuple, Optional
+import pytesseract
+from PIL import Image, ImageOps
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# "Margherita Pizza .... $12.50", "Soup of the Day 8,00"
+PRICED_LINE = re.compile(
+    r"^(?P<name>.*?[^\W\d_].*?)[\s.·…_-]*"
+    r"(?P<price>[$€£]\s?\d{1,4}(?:[.,]\d{1,2})?|\d{1,4}[.,]\d{2})\s*$"
+)
+INGREDIENT_SEPARATORS = re.compile(r",|;|\s+and\s+|\s+with\s+|\s+&\s+", re.IGNORECASE)
+# Share of text lines that must carry a price for the layout to be a menu
+MIN_PRICED_SHARE = 0.25
+
+
+class OcrLine(NamedTuple):
+    text: str
+    confidence: float  # Mean word confidence, 0-100
+
+
+class MenuLayout(NamedTuple):
+    items: List[Dict]
+    text: str  # The lines as read, for a text-only completion
+    confidence: float
+    priced_lines: int
+    lines: int
+
+    @property
+    def confident(self) -> bool:
+        return (
+            self.confidence >= settings.MENU_OCR_MIN_CONFIDENCE
+            and len(self.items) >= settings.MENU_OCR_MIN_ITEMS
+            and self.priced_lines >= self.lines * MIN_PRICED_SHARE
+        )
+
+    @property
+    def complete(self) -> bool:
+        # Items with no description would reach recommendations without
+        # ingredients; the model can still infer them from the names
+        return all(item["ingredients"] for item in self.items)
+
+
+def read_lines(image_bytes: bytes) -> Optional[List[OcrLine]]:
+    """
+    Text lines of an image in reading order, or None when the image cannot
+    be decoded or tesseract is not installed.
+    """
+    try:
+        image = ImageOps.exif_transpose(Image.open(io.BytesIO(image_bytes)))
+        data = pytesseract.image_to_data(
+            image.convert("L"),
+            lang=settings.MENU_OCR_LANGUAGE,
+            output_type=pytesseract.Output.DICT,
+        )
+    except pytesseract.TesseractNotFoundError:
+        logger.warning("OCR skipped: tesseract is not installed")
+        return None
+    except (OSError, ValueError, pytesseract.TesseractError) as e:
+        logger.warning("OCR failed: %s", e)
+        return None
+
+    words: Dict[tuple, List[tuple]] = {}
+    for i, text in enumerate(data["text"]):
+        confidence = float(data["conf"][i])
+        if confidence < 0 or not text.strip():
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        words.setdefault(key, []).append((text.strip(), confidence))
+
+    return [
+        OcrLine(
+            " ".join(text for text, _ in line),
+            sum(confidence for _, confidence in line) / len(line),
+        )
+        for line in words.values()
+    ]
+
+
+def parse_ingredients(description: str) -> List[str]:
+    return [
+        part.strip(" .").lower()
+        for part in INGREDIENT_SEPARATORS.split(description)
+        if part.strip(" .")
+    ]
+
+
+def _is_heading(text: str) -> bool:
+    return text.endswith(":") or (text.isupper() and len(text.split()) <= 4)
+
+
+def parse_menu_lines(lines: List[OcrLine]) -> MenuLayout:
+    """
+    Menu items from OCR lines: each line ending in a price starts an item,
+    unpriced lines up to the next item or heading describe it.
+    """
+    items = []
+    current = None
+    priced = 0
+    for line in lines:
+        text = line.text.strip()
+        match = PRICED_LINE.match(text)
+        if match:
+            priced += 1
+            price = match.group("price").replace(" ", "")
+            if price[0] not in "$€£":
+                price = settings.MENU_OCR_CURRENCY_SYMBOL + price
+            current = {
+                "name": match.group("name").strip(),
+                "price": price,
+                "ingredients": [],
+            }
+            items.append(current)
+        elif _is_heading(text):
+            current = None
+        elif current is not None:
+            current["ingredients"].extend(parse_ingredients(text))
+
+    words = sum(len(line.text.split()) for line in lines)
+    confidence = (
+        sum(line.confidence * len(line.text.split()) for line in lines) / words
+        if words
+        else 0.0
+    )
+    return MenuLayout(
+        items=items,
+        text="\n".join(line.text for line in lines),
+        confidence=confidence,
+        priced_lines=priced,
+        lines=len(lines),
+    )
+
+
+def read_menu_layout(image_bytes: bytes) -> Optional[MenuLayout]:
+    lines = read_lines(image_bytes)
+    if lines is None:
+        return None
+    return parse_menu_lines(lines)
@@ -0,0 +1,73 @@
+"""
+Parsing and validation of menu analysis responses.
+
+A well-formed response is parsed and validated in one pass by a pydantic
+TypeAdapter straight from the JSON text. Only when that fails, because an
+item is malformed or the completion was cut off, are the items checked one
+at a time: malformed items are dropped, and every item completed before a
+truncation is salvaged with the streaming parser, so the rest of the menu
+can be requested instead of the whole of it.
+"""
+
+import json
+from typing import Dict, List, NamedTuple, Optional
+from pydantic import TypeAdapter, ValidationError
+from typing_extensions import TypedDict
+from app.services.menu_stream import ITEMS_KEY, MenuItemStreamParser
+
+
+class ParsedMenuItem(TypedDict):
+    name: str
+    price: str
+    ingredients: List[str]
+
+
+class _MenuResponse(TypedDict):
+    menu_items: List[ParsedMenuItem]
+
+
+# Keys other than the declared ones are dropped while validating
+RESPONSE_ADAPTER = TypeAdapter(_MenuResponse)
+ITEM_ADAPTER = TypeAdapter(ParsedMenuItem)
+
+
+class ParsedMenu(NamedTuple):
+    items: List[Dict]
+    complete: bool  # False when the JSON was cut off or otherwise invalid
+
+
+def validate_item(item) -> Optional[Dict]:
+    """
+    Name, price and ingredients of a well-formed menu item, else None.
+    """
+    try:
+        return ITEM_ADAPTER.validate_python(item)
+    except ValidationError:
+        return None
+
+
+def validate_items(items: List) -> List[Dict]:
+    """Valid items of a list, skipping the malformed ones"""
+    return [item for item in map(validate_item, items) if item is not None]
+
+
+def parse_menu_items(content: Optional[str]) -> Optional[ParsedMenu]:
+    """
+    Menu items of a model response. Returns None when nothing usable could
+    be read: the text is not JSON and no complete item precedes the point
+    where it breaks off.
+    """
+    content = content or ""
+    try:
+        return ParsedMenu(RESPONSE_ADAPTER.validate_json(content)[ITEMS_KEY], True)
+    except ValidationError:
+        pass
+
+    try:
+        document = json.loads(content)
+    except json.JSONDecodeError:
+        items = validate_items(MenuItemStreamParser().feed(content))
+        return ParsedMenu(items, False) if items else None
+
+    items = document.get(ITEMS_KEY, []) if isinstance(document, dict) else []
+    return ParsedMenu(validate_items(items if isinstance(items, list) else []), True)
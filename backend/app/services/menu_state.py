@@ -0,0 +1,158 @@
+"""
+Per-analysis menu state used by the recommendation endpoints.
+
+Each analysis (and optionally the rep's session) maps to its menu items and
+the recommendations precomputed for them. Reads go through a small
+in-process LRU whose entries live only briefly, in front of a shared backend
+so every worker process sees the same state and it survives restarts.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+
+
+class MemoryStateBackend:
+    """
+    Process-local backend, for single-worker deployments and tests.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[float, Dict]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def set(self, key: str, value: Dict, ttl_seconds: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + ttl_seconds, value)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SQLiteStateBackend:
+    """
+    Backend shared by all worker processes on a host through a SQLite file.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, timeout=10)
+        if not self._initialized:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS menu_state ("
+                "key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value TEXT NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_menu_state_expires "
+                "ON menu_state (expires_at)"
+            )
+            self._initialized = True
+        return connection
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT value FROM menu_state WHERE key = ? AND expires_at >= ?",
+                (key, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def set(self, key: str, value: Dict, ttl_seconds: int) -> None:
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO menu_state (key, expires_at, value) "
+                "VALUES (?, ?, ?)",
+                (key, now + ttl_seconds, json.dumps(value)),
+            )
+            connection.execute("DELETE FROM menu_state WHERE expires_at < ?", (now,))
+
+    def delete(self, key: str) -> None:
+        with self._connect() as connection:
+            connection.execute("DELETE FROM menu_state WHERE key = ?", (key,))
+
+
+class MenuStateStore:
+    def __init__(
+        self,
+        backend,
+        max_entries: int,
+        ttl_seconds: int,
+        local_ttl_seconds: float,
+    ):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.local_ttl_seconds = local_ttl_seconds
+        self._local: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key: str, value: Dict) -> None:
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.local_ttl_seconds, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                if entry[0] >= time.monotonic():
+                    self._local.move_to_end(key)
+                    return entry[1]
+                del self._local[key]
+
+        value = self.backend.get(key)
+        if value is not None:
+            self._remember(key, value)
+        return value
+
+    def set(self, key: str, value: Dict) -> None:
+        self.backend.set(key, value, self.ttl_seconds)
+        self._remember(key, value)
+
+    def delete(self, key: str) -> None:
+        self.backend.delete(key)
+        with self._lock:
+            self._local.pop(key, None)
+
+
+def create_menu_state_store() -> MenuStateStore:
+    if settings.MENU_STATE_BACKEND == "memory":
+        backend = MemoryStateBackend()
+    elif settings.MENU_STATE_BACKEND == "sqlite":
+        backend = SQLiteStateBackend(
+            os.path.join(settings.UPLOAD_DIR, "menu_state.sqlite3")
+        )
+    else:
+        raise ValueError(f"Unknown menu state backend: {settings.MENU_STATE_BACKEND}")
+
+    return MenuStateStore(
+        backend,
+        max_entries=settings.MENU_STATE_MAX_ENTRIES,
+        ttl_seconds=settings.MENU_STATE_TTL_SECONDS,
+        local_ttl_seconds=settings.MENU_STATE_LOCAL_TTL_SECONDS,
+    )
+
+
+menu_state_store = create_menu_state_store()
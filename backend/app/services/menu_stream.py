@@ -0,0 +1,96 @@
+"""
+Incremental parsing of streamed menu analysis responses.
+
+The model answers with ``{"menu_items": [{...}, {...}]}``. Rather than wait
+for the whole document, MenuItemStreamParser scans text as it arrives and
+returns each object of the ``menu_items`` array as soon as its closing
+brace is seen. Every character is scanned once, however the text is split.
+"""
+
+import json
+from typing import Dict, List, Optional
+
+ITEMS_KEY = "menu_items"
+
+
+class MenuItemStreamParser:
+    def __init__(self):
+        self.text = ""
+        self._position = 0
+        # Open containers, "{" or "["
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        # Stack depth inside the menu_items array, once it has opened
+        self._items_depth: Optional[int] = None
+        self._item_start = 0
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """
+        Add streamed text and return the menu items it completed.
+        Items that are not valid JSON objects are skipped.
+        """
+        self.text += chunk
+        text = self.text
+        stack = self._stack
+        items = []
+
+        for position in range(self._position, len(text)):
+            char = text[position]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if len(stack) == 1:
+                        # Keys of the top-level object; small, decode fully
+                        self._last_string = json.loads(
+                            text[self._string_start : position + 1]
+                        )
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = position
+            elif char in "{[":
+                if (
+                    char == "{"
+                    and self._items_depth is not None
+                    and len(stack) == self._items_depth
+                ):
+                    self._item_start = position
+                stack.append(char)
+                if (
+                    char == "["
+                    and len(stack) == 2
+                    and self._items_depth is None
+                    and self._last_string == ITEMS_KEY
+                ):
+                    self._items_depth = len(stack)
+            elif char in "}]":
+                if not stack:
+                    continue
+                stack.pop()
+                if (
+                    char == "}"
+                    and self._items_depth is not None
+                    and len(stack) == self._items_depth
+                ):
+                    item = self._decode(text[self._item_start : position + 1])
+                    if item is not None:
+                        items.append(item)
+
+        self._position = len(text)
+        return items
+
+    @staticmethod
+    def _decode(fragment: str) -> Optional[Dict]:
+        try:
+            item = json.loads(fragment)
+        except json.JSONDecodeError:
+            return None
+        return item if isinstance(item, dict) else None
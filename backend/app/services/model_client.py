@@ -0,0 +1,245 @@
+"""
+Shared client for the model API.
+
+One AsyncOpenAI client is created per process on top of a pooled httpx
+transport, so calls reuse keep-alive connections instead of paying a TLS
+handshake each time. ModelClient wraps its completion calls with the rate
+limiter, jittered exponential retries for transient failures and a circuit
+breaker that fails fast while the upstream is degraded.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+import httpx
+import openai
+from openai import AsyncOpenAI
+from app.core.config import settings
+from app.core.metrics import MODEL_RETRIES
+from app.services.rate_limiter import INTERACTIVE, RateLimiter, rate_limiter
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the model while the circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures. While open every
+    call fails fast; after reset_seconds one trial call is let through and
+    its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.state = CLOSED
+
+    def check(self) -> None:
+        """Raise CircuitOpenError if before_call would, without claiming the trial"""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN:
+                if self._clock() - self._opened_at < self.reset_seconds:
+                    raise CircuitOpenError("Model service unavailable, retry later")
+            elif self._trial_in_flight:
+                raise CircuitOpenError("Model service unavailable, retry later")
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN:
+                if self._clock() - self._opened_at < self.reset_seconds:
+                    raise CircuitOpenError("Model service unavailable, retry later")
+                self.state = HALF_OPEN
+            if self._trial_in_flight:
+                raise CircuitOpenError("Model service unavailable, retry later")
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            self.state = CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = OPEN
+                self._opened_at = self._clock()
+
+    def release(self) -> None:
+        # A trial call ended with an error that says nothing about upstream
+        # health; let the next call try again
+        with self._lock:
+            self._trial_in_flight = False
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409) or error.status_code >= 500
+    return False
+
+
+def is_upstream_failure(error: Exception) -> bool:
+    # Rate limiting means our quota is spent, not that the upstream is down
+    return is_retryable(error) and not isinstance(error, openai.RateLimitError)
+
+
+def retry_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Full-jitter exponential backoff for the given retry (0-based)"""
+    return random.uniform(0, min(max_delay, base_delay * 2**attempt))
+
+
+def estimate_tokens(messages: List[Dict], max_tokens: int) -> int:
+    """
+    Tokens a call counts against the quota: roughly four characters per
+    text token, a fixed estimate per image, and the completion budget.
+    """
+    text_chars = 0
+    images = 0
+    for message in messages:
+        content = message["content"]
+        parts = [content] if isinstance(content, str) else content
+        for part in parts:
+            if isinstance(part, str):
+                text_chars += len(part)
+            elif part.get("type") == "image_url":
+                images += 1
+            else:
+                text_chars += len(part.get("text", ""))
+    return text_chars // 4 + images * settings.RATE_LIMIT_IMAGE_TOKENS + max_tokens
+
+
+def create_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.MODEL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.MODEL_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.MODEL_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            connect=settings.MODEL_CONNECT_TIMEOUT,
+            read=settings.MODEL_READ_TIMEOUT,
+            write=settings.MODEL_WRITE_TIMEOUT,
+            pool=settings.MODEL_POOL_TIMEOUT,
+        ),
+    )
+
+
+def create_openai_client(
+    base_url: Optional[str] = None, api_key: Optional[str] = None
+) -> AsyncOpenAI:
+    return AsyncOpenAI(
+        api_key=api_key or settings.OPENAI_API_KEY,
+        base_url=base_url or settings.OPENAI_BASE_URL or None,
+        # Retries are handled by ModelClient so they share the breaker
+        max_retries=0,
+        http_client=create_http_client(),
+    )
+
+
+class ModelClient:
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        breaker: CircuitBreaker,
+        max_retries: int,
+        base_delay: float,
+        max_delay: float,
+        limiter: Optional[RateLimiter] = None,
+    ):
+        self.client = client
+        self.breaker = breaker
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    async def create_completion(
+        self,
+        priority: int = INTERACTIVE,
+        request_id: Optional[str] = None,
+        **kwargs,
+    ) -> Any:
+        """
+        client.chat.completions.create with rate limiting, retries and the
+        circuit breaker. Every attempt first waits its turn at the rate
+        limiter, by priority, and checks the circuit both before and after
+        the wait. Raises CircuitOpenError without calling the model while the
+        circuit is open, and the last error once retries are exhausted.
+        """
+        attempt = 0
+        while True:
+            if self.limiter is not None and settings.RATE_LIMIT_ENABLED:
+                # Fail fast instead of queueing for a call that will not run
+                self.breaker.check()
+                await self.limiter.acquire(
+                    estimate_tokens(kwargs["messages"], kwargs.get("max_tokens", 0)),
+                    priority,
+                    request_id,
+                )
+            self.breaker.before_call()
+            try:
+                response = await self.client.chat.completions.create(**kwargs)
+            except Exception as e:
+                if is_upstream_failure(e):
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.release()
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                logger.warning("Model call failed, retrying: %s", e)
+                MODEL_RETRIES.inc()
+                await asyncio.sleep(
+                    retry_delay(attempt, self.base_delay, self.max_delay)
+                )
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelled mid-call: no outcome, so free the trial slot
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return response
+
+    async def close(self) -> None:
+        await self.client.close()
+
+
+client = create_openai_client()
+model_client = ModelClient(
+    client,
+    CircuitBreaker(
+        settings.MODEL_CIRCUIT_FAILURE_THRESHOLD, settings.MODEL_CIRCUIT_RESET_SECONDS
+    ),
+    max_retries=settings.MODEL_MAX_RETRIES,
+    base_delay=settings.MODEL_RETRY_BASE_DELAY,
+    max_delay=settings.MODEL_RETRY_MAX_DELAY,
+    limiter=rate_limiter,
+)
@@ -0,0 +1,81 @@
+"""
+Product records of catalog entries, built on demand.
+
+Category, description and tags are derived from the raw ingredient data the
+first time a product is recommended and then kept in a bounded cache, so
+recommendation requests only pick records instead of formatting strings for
+every match, without materializing a record for every SKU of a large
+catalog.
+"""
+
+from functools import lru_cache
+from typing import Dict, NamedTuple, Sequence, Tuple
+
+# Records kept per catalog; recommendations mostly hit a few hot products
+RECORD_CACHE_SIZE = 8192
+
+
+class ProductRecord(NamedTuple):
+    position: int
+    category: str
+    name: str
+    description: str
+    price_range: str
+    tags: Tuple[str, ...]
+    # Shared, read-only recommendation payload; copy before adding fields
+    recommendation: Dict
+
+
+def describe(item: Dict) -> str:
+    return (
+        f"Premium {item['name']} available in variants: {', '.join(item['variants'])}. "
+        f"Supplied by {', '.join(item['suppliers'])}. "
+        f"Perfect for {', '.join(item['common_uses'])}."
+    )
+
+
+def build_product_record(position: int, category: str, item: Dict) -> ProductRecord:
+    description = describe(item)
+    tags = tuple(item["tags"])
+    return ProductRecord(
+        position=position,
+        category=category,
+        name=item["name"],
+        description=description,
+        price_range=item["price_range"],
+        tags=tags,
+        recommendation={
+            "name": item["name"],
+            "description": description,
+            "price_range": item["price_range"],
+            "category": category,
+            "tags": list(tags),
+        },
+    )
+
+
+class ProductRecords(Sequence):
+    """
+    The product record of every (category, item) pair of a catalog, in
+    catalog order, built when first indexed.
+    """
+
+    def __init__(
+        self, items: Sequence[Tuple[str, Dict]], cache_size: int = RECORD_CACHE_SIZE
+    ):
+        self.items = items
+        self._record = lru_cache(maxsize=cache_size)(self._build)
+
+    def _build(self, position: int) -> ProductRecord:
+        category, item = self.items[position]
+        return build_product_record(position, category, item)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __getitem__(self, position: int) -> ProductRecord:
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("product record index out of range")
+        return self._record(position)
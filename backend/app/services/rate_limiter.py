@@ -0,0 +1,257 @@
+"""
+Token-bucket rate limiting for model calls.
+
+Two buckets, one for requests and one for tokens, refill continuously up to
+one minute's quota. A call reserves one request plus its estimated tokens
+before it goes out, so bursts queue up here instead of turning into 429s
+from the API. Waiting calls are served by priority (interactive uploads
+before background jobs), then in arrival order, and can report their queue
+position and estimated wait.
+
+The bucket levels live in memory or, to share one quota between worker
+processes, in a SQLite table updated under an exclusive transaction.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from anyio import to_thread
+from app.core.config import settings
+
+# Lower values are served first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+REQUESTS = "requests"
+TOKENS = "tokens"
+
+
+class BucketLimit(NamedTuple):
+    capacity: float
+    per_second: float
+
+
+def take(
+    levels: Dict[str, Tuple[float, float]],
+    limits: Dict[str, BucketLimit],
+    costs: Dict[str, float],
+    now: float,
+) -> float:
+    """
+    Refill each bucket in levels ({name: (level, updated_at)}) to now and
+    take costs from all of them if every bucket has enough, updating levels
+    in place. Returns 0 on success, otherwise the seconds until all buckets
+    will have enough.
+    """
+    refilled = {}
+    delay = 0.0
+    for name, limit in limits.items():
+        level, updated_at = levels.get(name, (limit.capacity, now))
+        level = min(limit.capacity, level + (now - updated_at) * limit.per_second)
+        refilled[name] = level
+        # A single call larger than the bucket waits for a full bucket
+        missing = min(costs.get(name, 0), limit.capacity) - level
+        if missing > 0:
+            delay = max(delay, missing / limit.per_second)
+
+    for name, level in refilled.items():
+        if delay == 0:
+            level -= min(costs.get(name, 0), limits[name].capacity)
+        levels[name] = (level, now)
+    return delay
+
+
+class MemoryBucketStore:
+    def __init__(self, limits: Dict[str, BucketLimit]):
+        self.limits = limits
+        self._levels: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def try_take(self, costs: Dict[str, float], now: float) -> float:
+        with self._lock:
+            return take(self._levels, self.limits, costs, now)
+
+
+class SQLiteBucketStore:
+    """
+    Bucket levels shared by every process using the same database file.
+    """
+
+    def __init__(self, db_path: str, limits: Dict[str, BucketLimit]):
+        self.db_path = db_path
+        self.limits = limits
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        if not self._initialized:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+                "name TEXT PRIMARY KEY, level REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._initialized = True
+        return connection
+
+    def try_take(self, costs: Dict[str, float], now: float) -> float:
+        connection = self._connect()
+        try:
+            # Lock out other processes between reading and writing the levels
+            connection.execute("BEGIN IMMEDIATE")
+            levels = {
+                name: (level, updated_at)
+                for name, level, updated_at in connection.execute(
+                    "SELECT name, level, updated_at FROM rate_limit_buckets"
+                )
+            }
+            delay = take(levels, self.limits, costs, now)
+            connection.executemany(
+                "INSERT OR REPLACE INTO rate_limit_buckets (name, level, updated_at) "
+                "VALUES (?, ?, ?)",
+                [
+                    (name, level, updated_at)
+                    for name, (level, updated_at) in levels.items()
+                ],
+            )
+            connection.execute("COMMIT")
+            return delay
+        except Exception:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+
+class QueuePosition(NamedTuple):
+    position: int  # Calls ahead in this process's queue
+    eta_seconds: float
+
+
+class _Waiter:
+    __slots__ = ("priority", "sequence", "costs", "request_id", "event")
+
+    def __init__(self, priority, sequence, costs, request_id):
+        self.priority = priority
+        self.sequence = sequence
+        self.costs = costs
+        self.request_id = request_id
+        self.event = asyncio.Event()
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        store,
+        blocking_store: bool = False,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.store = store
+        # Stores that block (SQLite) are called from a worker thread
+        self._blocking_store = blocking_store
+        self._clock = clock
+        self._queue: List[_Waiter] = []
+        self._sequence = itertools.count()
+
+    async def _try_take(self, costs: Dict[str, float]) -> float:
+        if self._blocking_store:
+            return await to_thread.run_sync(self.store.try_take, costs, self._clock())
+        return self.store.try_take(costs, self._clock())
+
+    def _wake_head(self) -> None:
+        if self._queue:
+            self._queue[0].event.set()
+
+    async def acquire(
+        self,
+        tokens: float,
+        priority: int = INTERACTIVE,
+        request_id: Optional[str] = None,
+    ) -> None:
+        """
+        Wait until one request and tokens are available, behind any queued
+        call of the same or higher priority.
+        """
+        waiter = _Waiter(
+            priority, next(self._sequence), {REQUESTS: 1, TOKENS: tokens}, request_id
+        )
+        heapq.heappush(self._queue, waiter)
+        # A new head may have jumped ahead of one that is sleeping
+        self._wake_head()
+        try:
+            while True:
+                delay = None
+                if self._queue[0] is waiter:
+                    delay = await self._try_take(waiter.costs)
+                    if delay == 0:
+                        return
+                waiter.event.clear()
+                try:
+                    await asyncio.wait_for(waiter.event.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._queue.remove(waiter)
+            heapq.heapify(self._queue)
+            self._wake_head()
+
+    def position(self, request_id: str) -> Optional[QueuePosition]:
+        """
+        Queue position and estimated wait of a call waiting with request_id,
+        or None if it is not waiting.
+        """
+        ordered = sorted(self._queue)
+        for position, waiter in enumerate(ordered):
+            if waiter.request_id == request_id:
+                return QueuePosition(position, self._eta(ordered[: position + 1]))
+        return None
+
+    def estimate(self, tokens: float, priority: int = INTERACTIVE) -> QueuePosition:
+        """
+        Where a new call would queue and roughly how long it would wait.
+        """
+        ahead = [waiter for waiter in self._queue if waiter.priority <= priority]
+        costs = {REQUESTS: 1, TOKENS: tokens}
+        return QueuePosition(len(ahead), self._eta(ahead, costs))
+
+    def _eta(self, waiters: List[_Waiter], extra: Optional[Dict] = None) -> float:
+        # Time for the buckets to refill everything queued up to this call;
+        # ignores what is left in the buckets, so it errs on the long side
+        eta = 0.0
+        for name, limit in self.store.limits.items():
+            needed = sum(waiter.costs[name] for waiter in waiters)
+            needed += (extra or {}).get(name, 0)
+            eta = max(eta, needed / limit.per_second)
+        return eta
+
+
+def create_rate_limiter() -> RateLimiter:
+    limits = {
+        REQUESTS: BucketLimit(
+            settings.RATE_LIMIT_REQUESTS_PER_MINUTE,
+            settings.RATE_LIMIT_REQUESTS_PER_MINUTE / 60,
+        ),
+        TOKENS: BucketLimit(
+            settings.RATE_LIMIT_TOKENS_PER_MINUTE,
+            settings.RATE_LIMIT_TOKENS_PER_MINUTE / 60,
+        ),
+    }
+    if settings.RATE_LIMIT_BACKEND == "memory":
+        return RateLimiter(MemoryBucketStore(limits))
+    return RateLimiter(
+        SQLiteBucketStore(
+            db_path=os.path.join(settings.UPLOAD_DIR, "rate_limit.sqlite3"),
+            limits=limits,
+        ),
+        blocking_store=True,
+    )
+
+
+rate_limiter = create_rate_limiter()
@@ -0,0 +1,55 @@
+"""
+Memoized recommendation results keyed by a fingerprint of the menu items.
+
+Products, product detail and filter requests for the same menu share one
+built product list, so paging and opening details are dictionary lookups.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+def menu_fingerprint(menu_items: List[Dict]) -> str:
+    """
+    Stable fingerprint of a menu: the same items in the same order always
+    produce the same value, regardless of dict key order.
+    """
+    payload = json.dumps(menu_items, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RecommendationCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, fingerprint: str) -> Optional[Any]:
+        with self._lock:
+            value = self._entries.get(fingerprint)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(fingerprint)
+            self.hits += 1
+            return value
+
+    def set(self, fingerprint: str, value: Any) -> None:
+        with self._lock:
+            self._entries[fingerprint] = value
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, fingerprint: str) -> None:
+        with self._lock:
+            self._entries.pop(fingerprint, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,180 @@
+"""
+TF-IDF index over the ingredient catalog for recommendation ranking.
+
+Catalog names, tags, common uses and variants are normalized once into
+token terms (whole phrases, every run of consecutive words in a name, and
+the single words of longer phrases) forming a sparse TF-IDF matrix stored
+column-wise in NumPy arrays. Ranking a menu is then one sparse
+matrix-vector product over the whole catalog via ``numpy.bincount``,
+touching only the postings of the menu's terms instead of scanning every
+catalog item.
+"""
+
+import math
+import re
+from array import array
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+from app.services.catalog import Catalog
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+@lru_cache(maxsize=None)
+def _stem(token: str) -> str:
+    # Light plural folding so "tomato" matches "Heirloom Tomatoes"
+    if len(token) > 4 and token.endswith(("oes", "ches", "shes", "sses")):
+        return token[:-2]
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+@lru_cache(maxsize=65536)
+def tokenize(text: str) -> Tuple[str, ...]:
+    # Cached: tags, uses and variants repeat across most of a catalog
+    return tuple(_stem(token) for token in _TOKEN_PATTERN.findall(text.lower()))
+
+
+def normalize(text: str) -> str:
+    return " ".join(tokenize(text))
+
+
+# Relative weight of each catalog field in the TF-IDF vectors
+NAME_WEIGHT = 3.0
+TAG_WEIGHT = 2.0
+USE_WEIGHT = 2.0
+VARIANT_WEIGHT = 1.0
+# Share of a multi-word phrase's weight given to each of its words
+WORD_WEIGHT = 0.5
+
+
+@lru_cache(maxsize=65536)
+def _phrase_terms(phrase: str) -> Tuple[Tuple[str, float], ...]:
+    # (term, share of the phrase weight) pairs
+    tokens = tokenize(phrase)
+    if not tokens:
+        return ()
+    terms = [(" ".join(tokens), 1.0)]
+    if len(tokens) > 1:
+        terms.extend((token, WORD_WEIGHT) for token in tokens)
+    return tuple(terms)
+
+
+def _add_phrase(terms: Dict[str, float], phrase: str, weight: float) -> None:
+    for term, share in _phrase_terms(phrase):
+        terms[term] += weight * share
+
+
+class IngredientIndex:
+    """
+    Scores catalog items against a menu's ingredients. An ingredient scores
+    highest on items naming it in a tag, a common use or a run of
+    consecutive words of their name ("olive oil" in "Extra Virgin Olive
+    Oil"), and partially on items sharing some of its words.
+    """
+
+    def __init__(self, catalog: Catalog):
+        self.items = catalog
+        self._build_vectors()
+
+    def _build_vectors(self) -> None:
+        """
+        Build the catalog's TF-IDF matrix in compressed sparse column form:
+        postings of term t are _positions/_weights[_indptr[t]:_indptr[t + 1]].
+        Fields are read column by column, without building catalog items,
+        and postings are collected in typed arrays.
+        """
+        self._term_ids: Dict[str, int] = {}
+        term_ids_get = self._term_ids.setdefault
+        term_column, position_column, tf_column = array("i"), array("i"), array("d")
+        field = self.items.field
+        for position in range(len(self.items)):
+            terms: Dict[str, float] = defaultdict(float)
+            tokens = tokenize(field(position, "name"))
+            for start in range(len(tokens)):
+                for end in range(start + 1, len(tokens) + 1):
+                    terms[" ".join(tokens[start:end])] += NAME_WEIGHT
+            for tag in field(position, "tags"):
+                _add_phrase(terms, tag, TAG_WEIGHT)
+            for use in field(position, "common_uses"):
+                _add_phrase(terms, use, USE_WEIGHT)
+            for variant in field(position, "variants"):
+                _add_phrase(terms, variant, VARIANT_WEIGHT)
+
+            for term, tf in terms.items():
+                term_column.append(term_ids_get(term, len(self._term_ids)))
+                position_column.append(position)
+                tf_column.append(tf)
+
+        # Views over the collected arrays, without copying the postings
+        term_ids = np.frombuffer(term_column, dtype=np.int32)
+        positions = np.frombuffer(position_column, dtype=np.int32)
+        term_count = len(self._term_ids)
+
+        document_frequency = np.bincount(term_ids, minlength=term_count)
+        self._idf = np.log((1 + len(self.items)) / (1 + document_frequency)) + 1
+
+        # Weight by IDF and scale every item vector to unit length
+        weights = self._idf[term_ids]
+        weights *= np.frombuffer(tf_column, dtype=np.float64)
+        del tf_column
+        norms = np.sqrt(np.bincount(positions, weights * weights, len(self.items)))
+        weights /= np.where(norms > 0, norms, 1.0)[positions]
+
+        order = np.argsort(term_ids, kind="stable")
+        self._positions = positions[order]
+        self._weights = weights[order]
+        self._indptr = np.concatenate(([0], np.cumsum(document_frequency)))
+
+    def query_vector(self, menu_ingredients: Iterable[str]) -> Dict[int, float]:
+        """
+        Unit-length TF-IDF weights of a menu by term id, so scores are cosine
+        similarities. Ingredients used by several dishes count more; terms
+        missing from the catalog are dropped.
+        """
+        terms: Dict[str, float] = defaultdict(float)
+        for ingredient in menu_ingredients:
+            _add_phrase(terms, ingredient, 1.0)
+        query = {}
+        for term, weight in terms.items():
+            term_id = self._term_ids.get(term)
+            if term_id is not None:
+                query[term_id] = weight * self._idf[term_id]
+        norm = math.sqrt(sum(w * w for w in query.values())) or 1.0
+        return {term_id: weight / norm for term_id, weight in query.items()}
+
+    def scores(self, menu_ingredients: Iterable[str]) -> np.ndarray:
+        """
+        Similarity of every catalog item to the menu, as one array.
+        """
+        query = self.query_vector(menu_ingredients)
+        if not query:
+            return np.zeros(len(self.items))
+
+        slices = [
+            (slice(self._indptr[t], self._indptr[t + 1]), w) for t, w in query.items()
+        ]
+        positions = np.concatenate([self._positions[span] for span, _ in slices])
+        weights = np.concatenate([self._weights[span] * w for span, w in slices])
+        return np.bincount(positions, weights=weights, minlength=len(self.items))
+
+    def top_k(self, menu_ingredients: Iterable[str], k: int) -> List[Tuple[int, float]]:
+        """
+        Return up to k (position, score) pairs with a positive score, best
+        first; ties keep catalog order.
+        """
+        scores = self.scores(menu_ingredients)
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            best = np.argpartition(-scores[candidates], k - 1)[:k]
+            candidates = candidates[best]
+        order = np.lexsort((candidates, -scores[candidates]))
+        return [(int(p), float(scores[p])) for p in candidates[order]]
+
+    def __len__(self) -> int:
+        return len(self.items)
@@ -0,0 +1,125 @@
+"""
+Token usage accounting and adaptive completion budgets.
+
+Every model call is recorded in a SQLite table under ``UPLOAD_DIR`` with its
+prompt/completion tokens, the max_tokens it reserved, latency and the size
+of the image sent. The history answers "where do our tokens go" and sizes
+max_tokens for the next call: completion tokens scale with how much menu
+fits in the image, so the budget is the high percentile of completion
+tokens per megapixel seen so far, times the image size and a safety margin.
+"""
+
+import os
+import sqlite3
+import time
+from typing import Dict, Optional
+from app.core.config import settings
+
+
+class TokenUsageStore:
+    def __init__(self, db_path: str, history_size: int):
+        self.db_path = db_path
+        self.history_size = history_size
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, timeout=10)
+        if not self._initialized:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS token_usage ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, "
+                "model TEXT NOT NULL, prompt_tokens INTEGER NOT NULL, "
+                "completion_tokens INTEGER NOT NULL, max_tokens INTEGER NOT NULL, "
+                "latency_ms REAL NOT NULL, image_pixels INTEGER NOT NULL, "
+                "item_count INTEGER NOT NULL, truncated INTEGER NOT NULL)"
+            )
+            self._initialized = True
+        return connection
+
+    def record(
+        self,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        max_tokens: int,
+        latency_ms: float,
+        image_pixels: int,
+        item_count: int,
+        truncated: bool,
+    ) -> None:
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO token_usage (created_at, model, prompt_tokens, "
+                "completion_tokens, max_tokens, latency_ms, image_pixels, "
+                "item_count, truncated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    time.time(),
+                    model,
+                    prompt_tokens,
+                    completion_tokens,
+                    max_tokens,
+                    latency_ms,
+                    image_pixels,
+                    item_count,
+                    int(truncated),
+                ),
+            )
+            # Keep the table bounded; aggregates cover what is retained
+            connection.execute(
+                "DELETE FROM token_usage WHERE created_at < ?",
+                (time.time() - settings.TOKEN_USAGE_RETENTION_SECONDS,),
+            )
+
+    def stats(self) -> Dict:
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(prompt_tokens), 0), "
+                "COALESCE(SUM(completion_tokens), 0), COALESCE(SUM(max_tokens), 0), "
+                "COALESCE(AVG(latency_ms), 0), COALESCE(SUM(truncated), 0), "
+                "COALESCE(AVG(item_count), 0) FROM token_usage"
+            ).fetchone()
+        calls, prompt, completion, reserved, latency, truncated, items = row
+        return {
+            "calls": calls,
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "total_tokens": prompt + completion,
+            "reserved_completion_tokens": reserved,
+            "avg_latency_ms": round(latency, 1),
+            "avg_item_count": round(items, 1),
+            "truncated": truncated,
+        }
+
+    def suggest_max_tokens(self, model: str, image_pixels: int) -> Optional[int]:
+        """
+        Completion budget for sending an image of image_pixels to model, or
+        None while there is too little history (or no image size) to go on.
+        """
+        if image_pixels <= 0:
+            return None
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT completion_tokens, image_pixels FROM token_usage "
+                "WHERE model = ? AND truncated = 0 AND image_pixels > 0 "
+                "ORDER BY id DESC LIMIT ?",
+                (model, self.history_size),
+            ).fetchall()
+        if len(rows) < settings.ADAPTIVE_MAX_TOKENS_MIN_SAMPLES:
+            return None
+
+        per_megapixel = sorted(
+            completion * 1_000_000 / pixels for completion, pixels in rows
+        )
+        high = per_megapixel[
+            min(len(per_megapixel) - 1, int(len(per_megapixel) * 0.95))
+        ]
+        budget = high * image_pixels / 1_000_000 * settings.ADAPTIVE_MAX_TOKENS_MARGIN
+        return max(
+            settings.ADAPTIVE_MAX_TOKENS_MIN, min(settings.MAX_TOKENS, int(budget))
+        )
+
+
+token_usage = TokenUsageStore(
+    db_path=os.path.join(settings.UPLOAD_DIR, "token_usage.sqlite3"),
+    history_size=settings.ADAPTIVE_MAX_TOKENS_HISTORY,
+)
@@ -0,0 +1,89 @@
+"""
+Stored benchmark results and regression checks.
+
+Results are flat {metric: value} mappings saved per suite in
+benchmarks/baselines.json. Metrics named *_rps are better when higher;
+every other metric is a latency and better when lower. A run regresses
+when a metric is worse than its baseline by more than the tolerance.
+"""
+
+import json
+import os
+from typing import Dict, List, Sequence
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_TOLERANCE = 0.2  # 20% slack for machine noise
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending sequence"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(len(sorted_values) * fraction)))
+    return sorted_values[rank]
+
+
+def load_baselines(path: str = BASELINES_PATH) -> Dict[str, Dict[str, float]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(
+    suite: str, results: Dict[str, float], path: str = BASELINES_PATH
+) -> None:
+    baselines = load_baselines(path)
+    baselines[suite] = {name: round(value, 4) for name, value in results.items()}
+    with open(path, "w") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(
+    results: Dict[str, float],
+    baseline: Dict[str, float],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> List[str]:
+    """Descriptions of the metrics that regressed against baseline"""
+    regressions = []
+    for name, value in results.items():
+        expected = baseline.get(name)
+        if not expected:
+            continue
+        if name.endswith("_rps"):
+            change = (expected - value) / expected
+        else:
+            change = (value - expected) / expected
+        if change > tolerance:
+            regressions.append(
+                f"{name}: {value:.3f} vs baseline {expected:.3f} "
+                f"({change:+.0%} worse)"
+            )
+    return regressions
+
+
+def report(
+    suite: str,
+    results: Dict[str, float],
+    save: bool = False,
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> bool:
+    """
+    Save results as the suite's baseline, or compare them with the stored
+    one and print any regressions. Returns False if something regressed.
+    """
+    if save:
+        save_baseline(suite, results)
+        print(f"Saved {len(results)} {suite} metrics to {BASELINES_PATH}")
+        return True
+    baseline = load_baselines().get(suite)
+    if not baseline:
+        print(f"No {suite} baseline stored; run with --save-baseline to record one")
+        return True
+    regressions = compare(results, baseline, tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print(f"No regressions against the {suite} baseline (±{tolerance:.0%})")
+    return not regressions
@@ -0,0 +1,91 @@
+"""
+Micro-benchmark: catalog load time and memory, nested dicts vs Catalog.
+
+Writes a synthetic catalog to JSON, CSV and SQLite, times loading each
+into a Catalog and compares the traced memory of the columnar layout with
+the equivalent nested dicts.
+
+Run from the backend directory:
+    python -m benchmarks.bench_catalog_loading
+"""
+
+import csv
+import json
+import os
+import sqlite3
+import tempfile
+import timeit
+import tracemalloc
+from app.services.catalog import LIST_FIELDS, LIST_SEPARATOR, Catalog, load_catalog
+from benchmarks.bench_recommendation_index import synthetic_catalog
+
+
+def traced_size(build) -> int:
+    """Memory still held by the result of build()"""
+    tracemalloc.start()
+    try:
+        result = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def flat_records(catalog: dict) -> list:
+    records = []
+    for category, items in catalog.items():
+        for item in items:
+            record = {"category": category, **item}
+            for field in LIST_FIELDS:
+                record[field] = LIST_SEPARATOR.join(item[field])
+            records.append(record)
+    return records
+
+
+def write_sources(catalog: dict, directory: str) -> dict:
+    json_path = os.path.join(directory, "catalog.json")
+    with open(json_path, "w") as catalog_file:
+        json.dump(catalog, catalog_file)
+
+    records = flat_records(catalog)
+    columns = list(records[0])
+    csv_path = os.path.join(directory, "catalog.csv")
+    with open(csv_path, "w", newline="") as catalog_file:
+        writer = csv.DictWriter(catalog_file, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(records)
+
+    sqlite_path = os.path.join(directory, "catalog.sqlite3")
+    connection = sqlite3.connect(sqlite_path)
+    with connection:
+        connection.execute(f"CREATE TABLE products ({', '.join(columns)})")
+        connection.executemany(
+            f"INSERT INTO products VALUES ({', '.join('?' for _ in columns)})",
+            [tuple(record[column] for column in columns) for record in records],
+        )
+    connection.close()
+    return {"json": json_path, "csv": csv_path, "sqlite": sqlite_path}
+
+
+def main():
+    size = 100_000
+    catalog = synthetic_catalog(size)
+    # Round-trip through JSON so nested dicts hold unshared strings, as
+    # they would after loading a real file
+    serialized = json.dumps(catalog)
+
+    dict_bytes = traced_size(lambda: json.loads(serialized))
+    columnar_bytes = traced_size(lambda: Catalog.from_mapping(json.loads(serialized)))
+    print(f"{size} SKUs")
+    print(f"  nested dicts: {dict_bytes / 1e6:8.1f} MB")
+    print(f"  Catalog:      {columnar_bytes / 1e6:8.1f} MB")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, path in write_sources(catalog, directory).items():
+            seconds = min(timeit.repeat(lambda: load_catalog(path), number=1, repeat=3))
+            print(f"  load {name:<7} {seconds:8.2f} s")
+
+
+if __name__ == "__main__":
+    main()
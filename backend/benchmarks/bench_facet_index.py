@@ -0,0 +1,68 @@
+"""
+Micro-benchmark: product filtering by list scan vs FacetIndex.
+
+Builds facet rows for synthetic catalogs of increasing size and times a
+combined category + tag + price filter with a per-product scan and with
+bitset intersection.
+
+Run from the backend directory:
+    python -m benchmarks.bench_facet_index
+"""
+
+import timeit
+from app.services.facet_index import FacetIndex, parse_price_range
+from benchmarks.bench_recommendation_index import synthetic_catalog
+
+FILTERS = {
+    "category": "Category 7",
+    "tag": "premium",
+    "min_price": 20,
+    "max_price": 60,
+}
+
+
+def facet_rows(catalog: dict) -> list:
+    return [
+        ([*item["tags"], category], parse_price_range(item["price_range"]))
+        for category, items in catalog.items()
+        for item in items
+    ]
+
+
+def scan_filter(rows: list, category, tag, min_price, max_price) -> list:
+    """Lowercase every product's labels and compare prices per request"""
+    matches = []
+    for row, (labels, price) in enumerate(rows):
+        search_tags = [label.lower() for label in labels]
+        if category.lower() not in search_tags or tag.lower() not in search_tags:
+            continue
+        if price is None or price.high < min_price or price.low > max_price:
+            continue
+        matches.append(row)
+    return matches
+
+
+def main():
+    print(
+        f"{'SKUs':>8} {'build (s)':>10} {'scan (ms)':>10} "
+        f"{'facets (ms)':>12} {'speedup':>8} {'matches':>8}"
+    )
+    for size in (1_000, 10_000, 100_000):
+        rows = facet_rows(synthetic_catalog(size))
+        build = timeit.timeit(lambda: FacetIndex(rows), number=1)
+        index = FacetIndex(rows)
+        assert index.filter(**FILTERS) == scan_filter(rows, **FILTERS)
+
+        repeats = 10
+        scan = timeit.timeit(lambda: scan_filter(rows, **FILTERS), number=repeats)
+        faceted = timeit.timeit(lambda: index.filter(**FILTERS), number=repeats * 10)
+        scan_ms = scan / repeats * 1000
+        faceted_ms = faceted / (repeats * 10) * 1000
+        print(
+            f"{size:>8} {build:>10.3f} {scan_ms:>10.3f} {faceted_ms:>12.3f} "
+            f"{scan_ms / faceted_ms:>7.0f}x {len(index.filter(**FILTERS)):>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Micro-benchmark: recommendation matching by catalog scan vs TF-IDF index.
+
+Builds synthetic catalogs of increasing size from the real ingredient data
+and times matching a typical menu with the original scan-based approach and
+ranking the whole catalog with IngredientIndex top-k.
+
+Run from the backend directory:
+    python -m benchmarks.bench_recommendation_index
+"""
+
+import random
+import timeit
+from app.data.ingredients import INGREDIENTS_DATA
+from app.services.catalog import Catalog
+from app.services.recommendation_index import IngredientIndex
+
+MENU_INGREDIENTS = [
+    "mozzarella",
+    "tomato",
+    "basil",
+    "olive oil",
+    "pasta",
+    "garlic",
+    "parmesan",
+    "mushrooms",
+    "cream",
+    "beef",
+]
+
+
+def synthetic_catalog(size: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    templates = [item for items in INGREDIENTS_DATA.values() for item in items]
+    catalog = {}
+    for sku in range(size):
+        template = rng.choice(templates)
+        item = dict(template)
+        item["name"] = f"{template['name']} {sku}"
+        item["tags"] = template["tags"] + [f"line{sku % 500}"]
+        catalog.setdefault(f"Category {sku % 40}", []).append(item)
+    return catalog
+
+
+def scan_match(catalog: dict, menu_ingredients: list, limit: int = 5) -> list:
+    """The matching loop get_ingredient_recommendations used before the index"""
+    matches = []
+    for items in catalog.values():
+        for item in items:
+            is_relevant = any(
+                menu_ing.lower() in [use.lower() for use in item["common_uses"]]
+                or menu_ing.lower() in [tag.lower() for tag in item["tags"]]
+                or menu_ing.lower() in item["name"].lower()
+                for menu_ing in menu_ingredients
+            )
+            if is_relevant and len(matches) < limit:
+                matches.append(item["name"])
+    return matches
+
+
+def main():
+    print(
+        f"{'SKUs':>8} {'build (s)':>10} {'scan (ms)':>10} "
+        f"{'top-k (ms)':>11} {'speedup':>8}"
+    )
+    for size in (1_000, 10_000, 100_000):
+        catalog = synthetic_catalog(size)
+        columns = Catalog.from_mapping(catalog)
+        build = timeit.timeit(lambda: IngredientIndex(columns), number=1)
+        index = IngredientIndex(columns)
+
+        repeats = 3 if size >= 100_000 else 10
+        scan = timeit.timeit(
+            lambda: scan_match(catalog, MENU_INGREDIENTS), number=repeats
+        )
+        ranked = timeit.timeit(
+            lambda: index.top_k(MENU_INGREDIENTS, 5), number=repeats * 10
+        )
+        scan_ms = scan / repeats * 1000
+        rank_ms = ranked / (repeats * 10) * 1000
+        print(
+            f"{size:>8} {build:>10.2f} {scan_ms:>10.2f} {rank_ms:>11.3f} "
+            f"{scan_ms / rank_ms:>7.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Micro-benchmark: recommending products for a menu and building responses.
+
+Installs synthetic catalogs of increasing size as the recommendation
+engine, then times get_ingredient_recommendations for a typical menu and
+building the products response (product views and facet index, a JSON
+page and the full NDJSON stream) for growing recommendation counts.
+
+Run from the backend directory:
+    python -m benchmarks.bench_recommendations [--save-baseline]
+"""
+
+import argparse
+import sys
+import timeit
+from app.api.routes.recommendations import (
+    ProductFilters,
+    _build_products,
+    _product_list_response,
+    _stream_products,
+)
+from app.core.config import settings
+from app.services import menu_analysis
+from app.services.catalog import Catalog
+from app.services.menu_analysis import (
+    RecommendationEngine,
+    _default_positions,
+    get_ingredient_recommendations,
+)
+from app.services.product_catalog import ProductRecords
+from app.services.recommendation_index import IngredientIndex
+from benchmarks.baselines import DEFAULT_TOLERANCE, report
+from benchmarks.bench_recommendation_index import MENU_INGREDIENTS, synthetic_catalog
+
+MENU = [
+    {"name": f"Dish {i}", "price": "$12", "ingredients": MENU_INGREDIENTS[i::3]}
+    for i in range(3)
+]
+NO_FILTERS = ProductFilters(None, None, None, None)
+
+
+def install_engine(size: int) -> None:
+    catalog = Catalog.from_mapping(synthetic_catalog(size))
+    menu_analysis._engine = RecommendationEngine(
+        IngredientIndex(catalog), ProductRecords(catalog), _default_positions(catalog)
+    )
+
+
+def per_call_ms(func, number: int) -> float:
+    return timeit.timeit(func, number=number) / number * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    results = {}
+    original_top_k = settings.RECOMMENDATION_TOP_K
+    print(
+        f"{'SKUs':>8} {'top-k':>6} {'recommend (ms)':>15} {'build (ms)':>11} "
+        f"{'page (ms)':>10} {'ndjson (ms)':>12}"
+    )
+    try:
+        for size in (1_000, 10_000, 100_000):
+            install_engine(size)
+            for top_k in (5, 100, 1_000):
+                settings.RECOMMENDATION_TOP_K = top_k
+                recommendations = get_ingredient_recommendations(MENU)
+                assert recommendations["success"]
+                products = _build_products(recommendations["recommendations"])
+
+                number = 20 if size >= 100_000 else 100
+                recommend = per_call_ms(
+                    lambda: get_ingredient_recommendations(MENU), number
+                )
+                build = per_call_ms(
+                    lambda: _build_products(recommendations["recommendations"]),
+                    number,
+                )
+                page = per_call_ms(
+                    lambda: _product_list_response(products, NO_FILTERS, 1, 50),
+                    number * 10,
+                )
+                stream = per_call_ms(
+                    lambda: b"".join(_stream_products(products, NO_FILTERS)), number
+                )
+                print(
+                    f"{size:>8} {top_k:>6} {recommend:>15.3f} {build:>11.3f} "
+                    f"{page:>10.3f} {stream:>12.3f}"
+                )
+                key = f"{size}_skus_top_{top_k}"
+                results[f"recommend_ms_{key}"] = recommend
+                results[f"build_ms_{key}"] = build
+                results[f"page_ms_{key}"] = page
+                results[f"ndjson_ms_{key}"] = stream
+    finally:
+        settings.RECOMMENDATION_TOP_K = original_top_k
+        menu_analysis._engine = None
+
+    if not report("recommendations", results, args.save_baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
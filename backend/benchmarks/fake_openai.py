@@ -0,0 +1,206 @@
+"""
+Local stand-in for the OpenAI chat completions API.
+
+Answers POST /v1/chat/completions (plain and streamed) with a synthetic
+menu after a configurable delay, and fails a configurable share of calls,
+so the load driver can exercise the full request path without network
+access or API spend. Point the backend at it with OPENAI_BASE_URL.
+
+Run from the backend directory:
+    python -m benchmarks.fake_openai --port 8100 --latency 0.8 --jitter 0.2
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+DISHES = [
+    ("Margherita Pizza", ["tomato", "mozzarella", "basil", "olive oil"]),
+    ("Pasta Carbonara", ["pasta", "eggs", "parmesan", "pancetta"]),
+    ("Mushroom Risotto", ["arborio rice", "mushrooms", "parmesan", "cream"]),
+    ("Grilled Ribeye", ["beef", "garlic", "butter", "rosemary"]),
+    ("Caesar Salad", ["romaine", "parmesan", "anchovies", "croutons"]),
+    ("Creme Brulee", ["cream", "vanilla", "sugar", "eggs"]),
+    ("Seared Salmon", ["salmon", "lemon", "dill", "butter"]),
+    ("Truffle Fries", ["potatoes", "truffle oil", "parmesan", "parsley"]),
+]
+
+
+def menu_content(item_count: int) -> str:
+    items = []
+    for i in range(item_count):
+        name, ingredients = DISHES[i % len(DISHES)]
+        items.append(
+            {
+                "name": name if i < len(DISHES) else f"{name} {i // len(DISHES) + 1}",
+                "price": f"${12 + i % 20}.99",
+                "ingredients": ingredients,
+            }
+        )
+    return json.dumps({"menu_items": items})
+
+
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        latency: float = 0.5,
+        jitter: float = 0.1,
+        error_rate: float = 0.0,
+        item_count: int = 12,
+        seed: Optional[int] = None,
+    ):
+        super().__init__(address, FakeOpenAIHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.content = menu_content(item_count)
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def next_call(self) -> Dict:
+        """Delay and outcome of the next call, drawn under the lock"""
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self._random.gauss(self.latency, self.jitter))
+            failed = self._random.random() < self.error_rate
+        return {"delay": delay, "failed": failed}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        call = self.server.next_call()
+        time.sleep(call["delay"])
+        if call["failed"]:
+            self._send_json(500, {"error": {"message": "injected failure"}})
+            return
+
+        content = self.server.content
+        model = request.get("model", "gpt-4o-mini")
+        if request.get("stream"):
+            self._send_stream(model, content)
+        else:
+            self._send_json(200, completion(model, content))
+
+    def _send_json(self, status: int, body: Dict) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, model: str, content: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for piece in stream_pieces(content):
+            self._write_chunk(
+                b"data: %s\n\n" % json.dumps(chunk(model, piece)).encode()
+            )
+        self._write_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+    def log_message(self, *args):
+        pass
+
+
+def usage(content: str) -> Dict:
+    completion_tokens = len(content) // 4
+    return {
+        "prompt_tokens": 1200,
+        "completion_tokens": completion_tokens,
+        "total_tokens": 1200 + completion_tokens,
+    }
+
+
+def completion(model: str, content: str) -> Dict:
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": usage(content),
+    }
+
+
+def stream_pieces(content: str, size: int = 40) -> List[str]:
+    return [content[i : i + size] for i in range(0, len(content), size)]
+
+
+def chunk(model: str, piece: str) -> Dict:
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+    }
+
+
+def start_fake_server(host: str = "127.0.0.1", port: int = 0, **options) -> FakeServer:
+    """Serve on a background thread; port 0 picks a free one"""
+    server = FakeServer((host, port), **options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.5, help="Mean seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Std dev seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="0 to 1")
+    parser.add_argument("--items", type=int, default=12, help="Menu items returned")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    server = FakeServer(
+        (args.host, args.port),
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        item_count=args.items,
+        seed=args.seed,
+    )
+    print(f"Fake OpenAI API at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+End-to-end load test of the analyze-menu and product listing endpoints.
+
+Starts the fake model server and the API under uvicorn (with the analysis
+cache and rate limiter off, so every upload reaches the model), then drives
+each endpoint at stepped concurrency for a fixed time per step and reports
+requests per second and p50/p95/p99 latency. Pass --target to load an
+already running API instead.
+
+Run from the backend directory:
+    python -m benchmarks.load_test [--steps 1 4 16] [--duration 10] [--save-baseline]
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, NamedTuple, Optional
+import httpx
+from PIL import Image, ImageDraw
+from benchmarks.baselines import DEFAULT_TOLERANCE, percentile, report
+from benchmarks.fake_openai import start_fake_server
+
+ANALYZE_PATH = "/api/v1/menu/analyze-menu"
+PRODUCTS_PATH = "/api/v1/recommendations/products"
+
+
+class StepResult(NamedTuple):
+    endpoint: str
+    concurrency: int
+    requests: int
+    errors: int
+    rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+
+def menu_images(count: int, seed: int = 0) -> List[bytes]:
+    """Distinct menu-like JPEGs, so uploads don't share cache entries"""
+    rng = random.Random(seed)
+    images = []
+    for _ in range(count):
+        image = Image.new("RGB", (1200, 1600), "white")
+        draw = ImageDraw.Draw(image)
+        for line in range(40):
+            y = 60 + line * 36
+            draw.rectangle(
+                (80, y, 80 + rng.randint(300, 900), y + 14),
+                fill=(rng.randint(0, 80),) * 3,
+            )
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=85)
+        images.append(buffer.getvalue())
+    return images
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_api(model_base_url: str, upload_dir: str, port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": model_base_url,
+        "OPENAI_API_KEY": "load-test",
+        "UPLOAD_DIR": upload_dir,
+        "ANALYSIS_CACHE_ENABLED": "false",
+        "NEAR_DUPLICATE_ENABLED": "false",
+        "RATE_LIMIT_ENABLED": "false",
+    }
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+
+
+async def wait_until_up(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as http:
+        while True:
+            try:
+                await http.get(f"{base_url}/")
+                return
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.2)
+
+
+async def run_step(
+    http: httpx.AsyncClient,
+    endpoint: str,
+    make_request,
+    concurrency: int,
+    duration: float,
+) -> StepResult:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id: int):
+        nonlocal errors
+        sequence = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await make_request(http, worker_id, sequence)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+            sequence += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return StepResult(
+        endpoint=endpoint,
+        concurrency=concurrency,
+        requests=len(latencies),
+        errors=errors,
+        rps=len(latencies) / elapsed,
+        p50_ms=percentile(latencies, 0.50) * 1000,
+        p95_ms=percentile(latencies, 0.95) * 1000,
+        p99_ms=percentile(latencies, 0.99) * 1000,
+    )
+
+
+async def run_load(
+    base_url: str, steps: List[int], duration: float, endpoints: List[str]
+) -> List[StepResult]:
+    images = menu_images(max(steps) * 2)
+    limits = httpx.Limits(max_connections=max(steps), max_keepalive_connections=None)
+    timeout = httpx.Timeout(120.0)
+
+    async def analyze(http, worker_id, sequence):
+        image = images[(worker_id + sequence * max(steps)) % len(images)]
+        return await http.post(
+            ANALYZE_PATH, files={"file": ("menu.jpg", image, "image/jpeg")}
+        )
+
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=timeout
+    ) as http:
+        seeded = await analyze(http, 0, 0)
+        seeded.raise_for_status()
+        analysis_id = seeded.json()["analysis_id"]
+
+        async def products(http, worker_id, sequence):
+            return await http.get(
+                PRODUCTS_PATH, params={"analysis_id": analysis_id, "page_size": 20}
+            )
+
+        requests = {"analyze_menu": analyze, "products": products}
+        results = []
+        for endpoint in endpoints:
+            for concurrency in steps:
+                result = await run_step(
+                    http, endpoint, requests[endpoint], concurrency, duration
+                )
+                print_result(result)
+                results.append(result)
+        return results
+
+
+def print_header() -> None:
+    print(
+        f"{'endpoint':>14} {'conc':>5} {'requests':>9} {'errors':>7} "
+        f"{'rps':>8} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}"
+    )
+
+
+def print_result(result: StepResult) -> None:
+    print(
+        f"{result.endpoint:>14} {result.concurrency:>5} {result.requests:>9} "
+        f"{result.errors:>7} {result.rps:>8.1f} {result.p50_ms:>9.1f} "
+        f"{result.p95_ms:>9.1f} {result.p99_ms:>9.1f}"
+    )
+
+
+def flatten(results: List[StepResult]) -> Dict[str, float]:
+    metrics = {}
+    for result in results:
+        key = f"{result.endpoint}_c{result.concurrency}"
+        metrics[f"{key}_rps"] = result.rps
+        metrics[f"{key}_p50_ms"] = result.p50_ms
+        metrics[f"{key}_p95_ms"] = result.p95_ms
+        metrics[f"{key}_p99_ms"] = result.p99_ms
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds/step")
+    parser.add_argument(
+        "--endpoints",
+        nargs="+",
+        choices=["analyze_menu", "products"],
+        default=["analyze_menu", "products"],
+    )
+    parser.add_argument("--target", help="Base URL of a running API")
+    parser.add_argument("--model-latency", type=float, default=0.5)
+    parser.add_argument("--model-jitter", type=float, default=0.1)
+    parser.add_argument("--model-error-rate", type=float, default=0.0)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    fake_server = None
+    api: Optional[subprocess.Popen] = None
+    upload_dir = tempfile.TemporaryDirectory()
+    base_url = args.target
+    try:
+        if base_url is None:
+            fake_server = start_fake_server(
+                latency=args.model_latency,
+                jitter=args.model_jitter,
+                error_rate=args.model_error_rate,
+                seed=0,
+            )
+            port = free_port()
+            api = start_api(fake_server.base_url, upload_dir.name, port)
+            base_url = f"http://127.0.0.1:{port}"
+        asyncio.run(wait_until_up(base_url))
+
+        print_header()
+        results = asyncio.run(
+            run_load(base_url, args.steps, args.duration, args.endpoints)
+        )
+    finally:
+        if api is not None:
+            api.terminate()
+            api.wait()
+        if fake_server is not None:
+            fake_server.shutdown()
+        upload_dir.cleanup()
+
+    # A running API has its own model and data, so it gets its own baseline
+    suite = "load_test" if args.target is None else f"load_test {args.target}"
+    if not report(suite, flatten(results), args.save_baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
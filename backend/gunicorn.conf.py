@@ -0,0 +1,74 @@
+"""
+Gunicorn settings for production serving; see serve.py.
+
+The app is imported once in the master process and forked into
+WEB_CONCURRENCY uvicorn workers. Catalog, recommendation index and menu
+state are loaded or read through SQLite, so any worker can answer any
+request; Prometheus samples are written to a shared directory and summed
+by /metrics.
+"""
+
+import gc
+import logging
+import os
+import shutil
+import tempfile
+
+# Workers write their metrics here. prometheus_client reads this when it is
+# first imported, so it must be set before the app is preloaded.
+if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="metrics-")
+    _remove_metrics_dir = True
+else:
+    _remove_metrics_dir = False
+
+from app.core.config import settings  # noqa: E402
+
+logger = logging.getLogger("gunicorn.error")
+
+bind = f"{settings.HOST}:{settings.PORT}"
+workers = settings.WEB_CONCURRENCY or os.cpu_count() or 1
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True  # Import once and share the loaded pages copy-on-write
+graceful_timeout = settings.GRACEFUL_SHUTDOWN_SECONDS
+keepalive = 5
+
+
+def on_starting(server):
+    # Samples left by a previous run would be summed with this one's
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    for name in os.listdir(metrics_dir):
+        if name.endswith(".db"):
+            os.remove(os.path.join(metrics_dir, name))
+
+    if server.cfg.workers > 1:
+        for name in ("RATE_LIMIT_BACKEND", "MENU_STATE_BACKEND"):
+            if getattr(settings, name) == "memory":
+                logger.warning(
+                    "%s=memory is per process; use sqlite with %d workers",
+                    name,
+                    server.cfg.workers,
+                )
+
+
+def when_ready(server):
+    from app.services.menu_analysis import get_recommendation_engine
+
+    # Build the catalog and recommendation index before forking, so workers
+    # share them instead of each building its own on its first request
+    get_recommendation_engine()
+    # Keep the preloaded objects out of garbage collection; collecting them
+    # in a worker would write to, and so copy, every page they live on
+    gc.collect()
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def on_exit(server):
+    if _remove_metrics_dir:
+        shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
@@ -1,13 +1,40 @@
-from fastapi import FastAPI, APIRouter
+from contextlib import asynccontextmanager
+from anyio import to_thread
+from fastapi import FastAPI, APIRouter, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
+from prometheus_client import CONTENT_TYPE_LATEST
 from app.api.routes import menu_analysis, recommendations
 from app.core.config import settings
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.services.analysis_jobs import analysis_job_queue
+from app.services.menu_analysis import get_recommendation_engine
+from app.services.model_client import model_client
 
-# Create the main application
-app = FastAPI(
-    title=settings.PROJECT_NAME,
-    description="""
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the catalog and build the recommendation index before serving,
+    # off the event loop; a no-op when gunicorn built them before forking
+    await to_thread.run_sync(get_recommendation_engine)
+    # Run background analysis workers for the lifetime of the app
+    await analysis_job_queue.start()
+    yield
+    # Let running analyses finish; the rest go back on the queue
+    await analysis_job_queue.stop()
+    # Close pooled connections to the model API
+    await model_client.close()
+
+
+def create_app() -> FastAPI:
+    """
+    Build the application. Nothing here opens a connection or starts a task,
+    so the app can be imported once in a server's master process and forked
+    into its workers (see serve.py); per-process work starts in lifespan.
+    """
+    app = FastAPI(
+        title=settings.PROJECT_NAME,
+        description="""
     AI-Powered Sales Assistant API provides menu analysis and product recommendations.
     
     ## Features
@@ -19,71 +46,89 @@ app = FastAPI(
     ## Authentication
     All API endpoints are currently open for testing. Authentication will be added in future versions.
     """,
-    version="1.0.0",
-    docs_url="/api/docs",
-    redoc_url="/api/redoc",
-    openapi_url="/api/openapi.json",
-)
-
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.BACKEND_CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Create API router with version prefix
-api_router = APIRouter(prefix="/api/v1")
-
-# Include route modules
-api_router.include_router(menu_analysis.router, prefix="/menu", tags=["Menu Analysis"])
-api_router.include_router(
-    recommendations.router, prefix="/recommendations", tags=["Product Recommendations"]
-)
-
-# Include API router in main app
-app.include_router(api_router)
-
-
-# Customize OpenAPI schema
-def custom_openapi():
-    if app.openapi_schema:
-        return app.openapi_schema
-
-    openapi_schema = get_openapi(
-        title=settings.PROJECT_NAME,
         version="1.0.0",
-        description=app.description,
-        routes=app.routes,
+        docs_url="/api/docs",
+        redoc_url="/api/redoc",
+        openapi_url="/api/openapi.json",
+        lifespan=lifespan,
+    )
+
+    # Add CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.BACKEND_CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Time every request by route
+    app.add_middleware(MetricsMiddleware)
+
+    # Create API router with version prefix
+    api_router = APIRouter(prefix="/api/v1")
+
+    # Include route modules
+    api_router.include_router(
+        menu_analysis.router, prefix="/menu", tags=["Menu Analysis"]
+    )
+    api_router.include_router(
+        recommendations.router,
+        prefix="/recommendations",
+        tags=["Product Recommendations"],
     )
 
-    # Add API server URLs
-    openapi_schema["servers"] = [
-        {"url": "http://localhost:8000", "description": "Development server"},
-    ]
+    # Include API router in main app
+    app.include_router(api_router)
 
-    # Add security schemes if needed
-    # openapi_schema["components"]["securitySchemes"] = {...}
+    # Customize OpenAPI schema
+    def custom_openapi():
+        if app.openapi_schema:
+            return app.openapi_schema
 
-    app.openapi_schema = openapi_schema
-    return app.openapi_schema
+        openapi_schema = get_openapi(
+            title=settings.PROJECT_NAME,
+            version="1.0.0",
+            description=app.description,
+            routes=app.routes,
+        )
 
+        # Add API server URLs
+        openapi_schema["servers"] = [
+            {"url": "http://localhost:8000", "description": "Development server"},
+        ]
 
-app.openapi = custom_openapi
+        # Add security schemes if needed
+        # openapi_schema["components"]["securitySchemes"] = {...}
 
+        app.openapi_schema = openapi_schema
+        return app.openapi_schema
 
-@app.get("/", tags=["Root"])
-async def root():
-    """
-    Root endpoint providing API information and links to documentation.
-    """
-    return {
-        "name": settings.PROJECT_NAME,
-        "version": "1.0.0",
-        "description": "AI-Powered Sales Assistant API",
-        "docs_url": "/api/docs",
-        "redoc_url": "/api/redoc",
-        "openapi_url": "/api/openapi.json",
-    }
+    app.openapi = custom_openapi
+
+    @app.get("/", tags=["Root"])
+    async def root():
+        """
+        Root endpoint providing API information and links to documentation.
+        """
+        return {
+            "name": settings.PROJECT_NAME,
+            "version": "1.0.0",
+            "description": "AI-Powered Sales Assistant API",
+            "docs_url": "/api/docs",
+            "redoc_url": "/api/redoc",
+            "openapi_url": "/api/openapi.json",
+        }
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics() -> Response:
+        """
+        Prometheus metrics in the text exposition format.
+        """
+        return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+    return app
+
+
+# Create the main application
+app = create_app()
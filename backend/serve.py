@@ -0,0 +1,17 @@
+"""
+Production server: gunicorn with WEB_CONCURRENCY uvicorn worker processes
+(one per CPU by default), configured by gunicorn.conf.py. Use run.py for
+development with reload.
+
+Extra arguments are passed to gunicorn:
+    python serve.py --workers 4 --bind 0.0.0.0:8080
+"""
+
+import os
+import sys
+from gunicorn.app.wsgiapp import run
+
+if __name__ == "__main__":
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.argv = [sys.argv[0], "--config", "gunicorn.conf.py", *sys.argv[1:], "main:app"]
+    run()
@@ -0,0 +1,287 @@
+import json
+import os
+from unittest.mock import patch, AsyncMock
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.services.rate_limiter import QueuePosition
+from main import app
+
+client = TestClient(app)
+
+MOCK_ANALYSIS = {
+    "success": True,
+    "menu_items": [
+        {
+            "name": "Margherita Pizza",
+            "price": "$14.99",
+            "ingredients": ["tomato sauce", "mozzarella", "basil"],
+        }
+    ],
+}
+
+
+def test_analyze_menu_from_memory(tmp_path, monkeypatch):
+    """Test that uploads are analyzed from memory without touching disk"""
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    with patch(
+        "app.api.routes.menu_analysis.analyze_menu_bytes",
+        new_callable=AsyncMock,
+        return_value=MOCK_ANALYSIS,
+    ) as mock_analyze:
+        response = client.post(
+            "/api/v1/menu/analyze-menu",
+            files={"file": ("menu.jpg", b"image bytes", "image/jpeg")},
+        )
+
+    assert response.status_code == 200
+    assert response.json()["menu_items"][0]["name"] == "Margherita Pizza"
+    assert response.json()["analysis_id"]
+    assert bytes(mock_analyze.await_args.args[0]) == b"image bytes"
+    assert os.listdir(tmp_path) == []
+
+
+def test_analyze_menu_persists_when_configured(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "PERSIST_UPLOADS", True)
+    with patch(
+        "app.api.routes.menu_analysis.analyze_menu_bytes",
+        new_callable=AsyncMock,
+        return_value=MOCK_ANALYSIS,
+    ):
+        response = client.post(
+            "/api/v1/menu/analyze-menu",
+            files={"file": ("menu.png", b"image bytes", "image/png")},
+        )
+
+    assert response.status_code == 200
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_analyze_menu_rejects_oversized_upload(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", 1024)
+    with patch(
+        "app.api.routes.menu_analysis.analyze_menu_bytes", new_callable=AsyncMock
+    ) as mock_analyze:
+        response = client.post(
+            "/api/v1/menu/analyze-menu",
+            files={"file": ("menu.jpg", b"x" * 2048, "image/jpeg")},
+        )
+
+    assert response.status_code == 400
+    assert "File size exceeds" in response.json()["detail"]
+    mock_analyze.assert_not_called()
+
+
+def test_analyze_menu_keeps_large_upload_in_memory():
+    image = os.urandom(3 * 1024 * 1024)
+    with patch(
+        "app.api.routes.menu_analysis.analyze_menu_bytes",
+        new_callable=AsyncMock,
+        return_value=MOCK_ANALYSIS,
+    ) as mock_analyze, patch(
+        "starlette.formparsers.SpooledTemporaryFile",
+        side_effect=AssertionError("spooled to disk"),
+    ):
+        response = client.post(
+            "/api/v1/menu/analyze-menu",
+            files={"file": ("menu.jpg", image, "image/jpeg")},
+        )
+
+    assert response.status_code == 200
+    assert bytes(mock_analyze.await_args.args[0]) == image
+
+
+def test_analyze_menu_requires_file():
+    response = client.post("/api/v1/menu/analyze-menu", data={"note": "no file"})
+    assert response.status_code == 400
+
+    response = client.post(
+        "/api/v1/menu/analyze-menu",
+        files={"other": ("menu.jpg", b"image bytes", "image/jpeg")},
+    )
+    assert response.status_code == 422
+
+
+def test_analyze_menu_reports_incomplete_menu():
+    with patch(
+        "app.api.routes.menu_analysis.analyze_menu_bytes",
+        new_callable=AsyncMock,
+        return_value={**MOCK_ANALYSIS, "complete": False},
+    ):
+        response = client.post(
+            "/api/v1/menu/analyze-menu",
+            files={"file": ("menu.jpg", b"image bytes", "image/jpeg")},
+        )
+
+    assert response.status_code == 200
+    assert response.json()["complete"] is False
+
+
+def test_analyze_menu_rejects_extension():
+    response = client.post(
+        "/api/v1/menu/analyze-menu",
+        files={"file": ("menu.gif", b"GIF89a", "image/gif")},
+    )
+    assert response.status_code == 400
+
+
+def test_analyze_menu_batch_merges_pages():
+    with patch(
+        "app.api.routes.menu_analysis.analyze_menu_pages",
+        new_callable=AsyncMock,
+        return_value=MOCK_ANALYSIS,
+    ) as mock_analyze:
+        response = client.post(
+            "/api/v1/menu/analyze-menu/batch",
+            files=[
+                ("files", ("food.jpg", b"food", "image/jpeg")),
+                ("files", ("drinks.png", b"drinks", "image/png")),
+            ],
+        )
+
+    assert response.status_code == 200
+    assert len(response.json()["menu_items"]) == 1
+    pages = mock_analyze.await_args.args[0]
+    assert [bytes(page) for page in pages] == [b"food", b"drinks"]
+
+
+def test_analyze_menu_batch_unavailable():
+    with patch(
+        "app.api.routes.menu_analysis.analyze_menu_pages",
+        new_callable=AsyncMock,
+        return_value={
+            "success": False,
+            "error": "Page 1: Model service unavailable, retry later",
+            "unavailable": True,
+            "menu_items": [],
+        },
+    ):
+        response = client.post(
+            "/api/v1/menu/analyze-menu/batch",
+            files=[("files", ("food.jpg", b"food", "image/jpeg"))],
+        )
+
+    assert response.status_code == 503
+
+
+def test_analyze_menu_batch_limits_file_count(monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_MAX_FILES", 1)
+    response = client.post(
+        "/api/v1/menu/analyze-menu/batch",
+        files=[
+            ("files", ("food.jpg", b"food", "image/jpeg")),
+            ("files", ("drinks.jpg", b"drinks", "image/jpeg")),
+        ],
+    )
+    assert response.status_code == 400
+
+
+def test_submit_and_poll_analysis():
+    with patch(
+        "app.api.routes.menu_analysis.analysis_job_queue.submit",
+        new_callable=AsyncMock,
+        return_value="job-1",
+    ):
+        response = client.post(
+            "/api/v1/menu/analysis",
+            files={"file": ("menu.jpg", b"image bytes", "image/jpeg")},
+        )
+    assert response.status_code == 202
+    assert response.json() == {
+        "analysis_id": "job-1",
+        "status": "pending",
+        "menu_items": None,
+        "error": None,
+        "complete": None,
+        "queue_position": None,
+        "eta_seconds": None,
+    }
+
+    with patch(
+        "app.api.routes.menu_analysis.analysis_job_queue.get",
+        return_value={
+            "analysis_id": "job-1",
+            "status": "completed",
+            "menu_items": MOCK_ANALYSIS["menu_items"],
+            "error": None,
+        },
+    ):
+        response = client.get("/api/v1/menu/analysis/job-1")
+    assert response.status_code == 200
+    assert response.json()["menu_items"][0]["name"] == "Margherita Pizza"
+
+
+def test_poll_reports_rate_limit_queue_position():
+    with patch(
+        "app.api.routes.menu_analysis.analysis_job_queue.get",
+        return_value={
+            "analysis_id": "job-1",
+            "status": "running",
+            "menu_items": None,
+            "error": None,
+        },
+    ), patch(
+        "app.api.routes.menu_analysis.rate_limiter.position",
+        return_value=QueuePosition(2, 4.5),
+    ):
+        response = client.get("/api/v1/menu/analysis/job-1")
+
+    assert response.json()["queue_position"] == 2
+    assert response.json()["eta_seconds"] == 4.5
+
+
+def test_get_unknown_analysis():
+    with patch(
+        "app.api.routes.menu_analysis.analysis_job_queue.get", return_value=None
+    ):
+        response = client.get("/api/v1/menu/analysis/missing")
+    assert response.status_code == 404
+
+
+def test_analyze_menu_stream():
+    item = MOCK_ANALYSIS["menu_items"][0]
+
+    async def events(content):
+        yield {"type": "item", "item": item}
+        yield {"type": "done", **MOCK_ANALYSIS}
+
+    with patch("app.api.routes.menu_analysis.stream_menu_bytes", side_effect=events):
+        response = client.post(
+            "/api/v1/menu/analyze-menu/stream",
+            files={"file": ("menu.jpg", b"image bytes", "image/jpeg")},
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0] == {"type": "item", "item": item}
+    assert lines[1]["success"] is True
+    products = client.get(
+        f"/api/v1/recommendations/products?analysis_id={lines[1]['analysis_id']}"
+    )
+    assert products.status_code == 200
+
+
+def test_analyze_menu_stream_unavailable():
+    async def events(content):
+        yield {
+            "type": "done",
+            "success": False,
+            "error": "Model service unavailable, retry later",
+            "unavailable": True,
+            "menu_items": [],
+        }
+
+    with patch("app.api.routes.menu_analysis.stream_menu_bytes", side_effect=events):
+        response = client.post(
+            "/api/v1/menu/analyze-menu/stream",
+            files={"file": ("menu.jpg", b"image bytes", "image/jpeg")},
+        )
+
+    assert response.status_code == 200
+    assert json.loads(response.text) == {
+        "type": "done",
+        "success": False,
+        "error": "Error analyzing menu: Model service unavailable, retry later",
+        "unavailable": True,
+    }
@@ -0,0 +1,95 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from main import app
+
+client = TestClient(app)
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_metrics_endpoint_exposes_route_latency():
+    before = sample(
+        "http_request_duration_seconds_count",
+        method="GET",
+        route="/api/v1/recommendations/products",
+        status="200",
+    )
+
+    client.get("/api/v1/recommendations/products")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "http_request_duration_seconds_bucket" in response.text
+    assert (
+        sample(
+            "http_request_duration_seconds_count",
+            method="GET",
+            route="/api/v1/recommendations/products",
+            status="200",
+        )
+        == before + 1
+    )
+
+
+def test_metrics_use_route_template_for_path_parameters():
+    client.get("/api/v1/recommendations/products/not-a-product")
+    client.get("/api/v1/menu/analysis/unknown-job")
+
+    assert sample(
+        "http_request_duration_seconds_count",
+        method="GET",
+        route="/api/v1/menu/analysis/{analysis_id}",
+        status="404",
+    )
+    assert not sample(
+        "http_request_duration_seconds_count",
+        method="GET",
+        route="/api/v1/menu/analysis/unknown-job",
+        status="404",
+    )
+
+
+def test_analysis_stages_are_timed():
+    stages = ("upload_read", "preprocess", "encode", "model_call", "json_parse")
+    before = {
+        stage: sample("menu_analysis_stage_seconds_count", stage=stage)
+        for stage in stages
+    }
+    response = MagicMock(
+        choices=[
+            MagicMock(
+                message=MagicMock(content='{"menu_items": []}'), finish_reason="stop"
+            )
+        ],
+        usage=None,
+    )
+
+    with patch(
+        "app.services.model_client.client.chat.completions.create",
+        new=AsyncMock(return_value=response),
+    ):
+        result = client.post(
+            "/api/v1/menu/analyze-menu",
+            files={"file": ("menu.jpg", b"image bytes", "image/jpeg")},
+        )
+
+    assert result.status_code == 200
+    for stage in stages:
+        assert sample("menu_analysis_stage_seconds_count", stage=stage) == (
+            before[stage] + 1
+        )
+
+
+def test_metrics_are_read_from_worker_files_when_multiprocess(tmp_path, monkeypatch):
+    client.get("/")
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+
+    response = client.get("/metrics")
+
+    # This process's registry is not consulted; no worker has written yet
+    assert response.status_code == 200
+    assert "http_request_duration_seconds_count" not in response.text
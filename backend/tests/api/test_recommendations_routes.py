@@ -0,0 +1,161 @@
+import json
+import asyncio
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.api.routes.recommendations import update_menu_items
+from app.schemas.product import ProductList, ProductResponse
+from app.services.menu_analysis import get_ingredient_recommendations
+from app.services.recommendation_cache import RecommendationCache
+from main import app
+
+client = TestClient(app)
+
+PIZZA_MENU = [
+    {"name": "Margherita", "price": "$12", "ingredients": ["mozzarella", "Pizza"]}
+]
+DESSERT_MENU = [
+    {"name": "Creme Brulee", "price": "$9", "ingredients": ["Desserts", "Baking"]}
+]
+
+
+def product_names(response):
+    return [product["name"] for product in response.json()["products"]]
+
+
+def test_analyses_do_not_share_recommendations():
+    asyncio.run(update_menu_items(PIZZA_MENU, "pizza-analysis"))
+    asyncio.run(update_menu_items(DESSERT_MENU, "dessert-analysis"))
+
+    pizza = client.get("/api/v1/recommendations/products?analysis_id=pizza-analysis")
+    dessert = client.get(
+        "/api/v1/recommendations/products?analysis_id=dessert-analysis"
+    )
+
+    assert pizza.status_code == 200
+    assert "Premium Mozzarella" in product_names(pizza)
+    assert "Vanilla Beans" in product_names(dessert)
+    assert product_names(pizza) != product_names(dessert)
+
+
+def test_session_latest_analysis():
+    asyncio.run(update_menu_items(PIZZA_MENU, "first", session_id="rep-1"))
+    asyncio.run(update_menu_items(DESSERT_MENU, "second", session_id="rep-1"))
+
+    by_session = client.get(
+        "/api/v1/recommendations/products", headers={"X-Session-ID": "rep-1"}
+    )
+    by_id = client.get("/api/v1/recommendations/products?analysis_id=second")
+
+    assert product_names(by_session) == product_names(by_id)
+
+
+def test_unknown_analysis_and_defaults():
+    missing = client.get("/api/v1/recommendations/products?analysis_id=missing")
+    defaults = client.get("/api/v1/recommendations/products")
+
+    assert missing.status_code == 404
+    assert defaults.status_code == 200
+    assert defaults.json()["total"] == 5
+
+
+def test_product_detail_uses_analysis():
+    asyncio.run(update_menu_items(PIZZA_MENU, "pizza-analysis"))
+    listing = client.get("/api/v1/recommendations/products?analysis_id=pizza-analysis")
+    detail = client.get("/api/v1/recommendations/products/1?analysis_id=pizza-analysis")
+
+    assert detail.status_code == 200
+    assert detail.json()["product"] == listing.json()["products"][0]
+
+
+def test_product_endpoints_share_memoized_products():
+    with patch(
+        "app.api.routes.recommendations.get_ingredient_recommendations",
+        wraps=get_ingredient_recommendations,
+    ) as mock_recommend, patch(
+        "app.api.routes.recommendations.product_cache", RecommendationCache(16)
+    ):
+        asyncio.run(update_menu_items(PIZZA_MENU, "pizza-analysis"))
+        for url in (
+            "/api/v1/recommendations/products?analysis_id=pizza-analysis",
+            "/api/v1/recommendations/products?analysis_id=pizza-analysis&page=2",
+            "/api/v1/recommendations/products/2?analysis_id=pizza-analysis",
+        ):
+            assert client.get(url).status_code == 200
+        response = client.post(
+            "/api/v1/recommendations/products/filter?analysis_id=pizza-analysis",
+            json={"tag": "Italian"},
+        )
+
+    assert response.status_code == 200
+    assert mock_recommend.call_count == 1
+
+
+def test_pre_serialized_responses_match_schemas():
+    asyncio.run(update_menu_items(PIZZA_MENU, "pizza-analysis"))
+    listing = client.get(
+        "/api/v1/recommendations/products?analysis_id=pizza-analysis&page_size=2"
+    )
+    detail = client.get("/api/v1/recommendations/products/1?analysis_id=pizza-analysis")
+
+    products = ProductList.model_validate_json(listing.content)
+    assert listing.headers["content-type"] == "application/json"
+    assert (products.total, products.page, products.page_size) == (5, 1, 2)
+    assert [p.id for p in products.products] == ["1", "2"]
+    assert products.products[0].tags[-1] == "Dairy & Cheese"
+    assert ProductResponse.model_validate_json(detail.content).product.id == "1"
+
+
+def test_filter_products_by_price():
+    asyncio.run(update_menu_items(PIZZA_MENU, "pizza-analysis"))
+    url = "/api/v1/recommendations/products/filter?analysis_id=pizza-analysis"
+
+    everything = client.post(url, json={})
+    cheap = client.post(url, json={"max_price": 20})
+    cheese = client.post(url, json={"category": "Dairy & Cheese", "max_price": 20})
+
+    assert cheap.status_code == 200
+    assert 0 < cheap.json()["total"] < everything.json()["total"]
+    for product in cheap.json()["products"]:
+        low = float(product["price"].lstrip("$").split("-")[0])
+        assert low <= 20
+    assert "Premium Mozzarella" in product_names(cheese)
+
+
+def test_cursor_pagination_walks_all_products():
+    asyncio.run(update_menu_items(PIZZA_MENU, "pizza-analysis"))
+    url = "/api/v1/recommendations/products?analysis_id=pizza-analysis&page_size=2"
+    everything = client.get(url + "&page_size=100").json()
+
+    names, cursor = [], None
+    while True:
+        page = client.get(url + (f"&cursor={cursor}" if cursor else "")).json()
+        names.extend(product["name"] for product in page["products"])
+        assert page["total"] == everything["total"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert names == [product["name"] for product in everything["products"]]
+    assert everything["next_cursor"] is None
+
+
+def test_invalid_cursor():
+    response = client.get("/api/v1/recommendations/products?cursor=not-a-cursor")
+
+    assert response.status_code == 400
+
+
+def test_ndjson_export():
+    asyncio.run(update_menu_items(PIZZA_MENU, "pizza-analysis"))
+    listing = client.get(
+        "/api/v1/recommendations/products?analysis_id=pizza-analysis&page_size=100"
+    )
+    export = client.post(
+        "/api/v1/recommendations/products/filter"
+        "?analysis_id=pizza-analysis&format=ndjson",
+        json={},
+    )
+
+    assert export.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in export.text.splitlines()]
+    assert lines == listing.json()["products"]
@@ -0,0 +1,109 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+from app.api.uploads import read_uploads, upload_request_body
+from app.core.config import settings
+
+BOUNDARY = "menu-boundary"
+
+
+def multipart_body(*files) -> bytes:
+    body = b""
+    for field, filename, content in files:
+        body += (
+            (
+                f"--{BOUNDARY}\r\n"
+                f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+                "Content-Type: image/jpeg\r\n\r\n"
+            ).encode()
+            + content
+            + b"\r\n"
+        )
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+
+def make_request(body: bytes, chunk_size: int = 64, content_length: bool = True):
+    """A request whose body arrives in chunks; chunks_read counts what was read"""
+    chunks = [body[i : i + chunk_size] for i in range(0, len(body), chunk_size)]
+    state = {"chunks_read": 0}
+
+    async def receive():
+        index = state["chunks_read"]
+        state["chunks_read"] += 1
+        return {
+            "type": "http.request",
+            "body": chunks[index] if index < len(chunks) else b"",
+            "more_body": index + 1 < len(chunks),
+        }
+
+    headers = [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]
+    if content_length:
+        headers.append((b"content-length", str(len(body)).encode()))
+    scope = {"type": "http", "method": "POST", "headers": headers}
+    return Request(scope, receive), state
+
+
+def test_reads_files_of_field():
+    request, _ = make_request(
+        multipart_body(
+            ("files", "food.jpg", b"food" * 100),
+            ("other", "skip.jpg", b"skipped"),
+            ("files", "drinks.PNG", b"drinks"),
+        )
+    )
+
+    uploads = asyncio.run(read_uploads(request, "files", max_files=2))
+
+    assert [(u.filename, u.extension, bytes(u.content)) for u in uploads] == [
+        ("food.jpg", "jpg", b"food" * 100),
+        ("drinks.PNG", "png", b"drinks"),
+    ]
+
+
+def test_rejects_declared_oversized_body_before_reading(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", 1024)
+    request, state = make_request(
+        multipart_body(("file", "menu.jpg", b"x" * 64 * 1024))
+    )
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(read_uploads(request, "file"))
+
+    assert error.value.status_code == 400
+    assert state["chunks_read"] == 0
+
+
+def test_rejects_oversized_file_as_it_arrives(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", 1024)
+    body = multipart_body(("file", "menu.jpg", b"x" * 8 * 1024))
+    request, state = make_request(body, content_length=False)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(read_uploads(request, "file"))
+
+    assert "File size exceeds" in error.value.detail
+    assert state["chunks_read"] < len(body) // 64 / 2
+
+
+def test_rejects_extension_and_file_count_from_part_headers():
+    request, state = make_request(
+        multipart_body(("file", "menu.gif", b"GIF89a" * 100)), chunk_size=256
+    )
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(read_uploads(request, "file"))
+    assert "File type not allowed" in error.value.detail
+    assert state["chunks_read"] == 1
+
+    request, _ = make_request(
+        multipart_body(("file", "a.jpg", b"a"), ("file", "b.jpg", b"b"))
+    )
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(read_uploads(request, "file"))
+    assert "Too many files" in error.value.detail
+
+
+def test_upload_request_body_documents_files():
+    body = upload_request_body("files", multiple=True)["requestBody"]
+    schema = body["content"]["multipart/form-data"]["schema"]
+    assert schema["properties"]["files"]["items"]["format"] == "binary"
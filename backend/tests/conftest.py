@@ -0,0 +1,32 @@
+import pytest
+from app.core.config import settings
+from app.services.menu_state import MenuStateStore, MemoryStateBackend
+
+
+@pytest.fixture(autouse=True)
+def disable_analysis_cache(monkeypatch):
+    """Keep cached analyses from leaking between tests"""
+    monkeypatch.setattr(settings, "ANALYSIS_CACHE_ENABLED", False)
+
+
+@pytest.fixture(autouse=True)
+def disable_rate_limit(monkeypatch):
+    """Keep the shared rate limit from throttling tests"""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+
+
+@pytest.fixture(autouse=True)
+def disable_token_usage(monkeypatch):
+    """Keep token accounting out of the shared usage database"""
+    monkeypatch.setattr(settings, "TOKEN_USAGE_ENABLED", False)
+
+
+@pytest.fixture(autouse=True)
+def menu_state(monkeypatch):
+    """Give each test its own in-memory menu state"""
+    store = MenuStateStore(
+        MemoryStateBackend(), max_entries=16, ttl_seconds=60, local_ttl_seconds=5
+    )
+    monkeypatch.setattr("app.api.routes.recommendations.menu_state_store", store)
+    monkeypatch.setattr("app.api.routes.menu_analysis.menu_state_store", store)
+    return store
@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+from unittest.mock import patch, mock_open, MagicMock, AsyncMock
+from app.core.config import settings
+from app.services.analysis_cache import AnalysisCache
+from app.services.menu_analysis import analyze_menu_image
+
+MOCK_SUCCESSFUL_RESPONSE = MagicMock(
+    choices=[
+        MagicMock(
+            message=MagicMock(
+                content='{"menu_items": [{"name": "Margherita Pizza", '
+                '"price": "$14.99", "ingredients": ["mozzarella", "basil"]}]}'
+            )
+        )
+    ],
+    usage=None,
+)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AnalysisCache(
+        db_path=str(tmp_path / "cache.sqlite3"), max_entries=2, ttl_seconds=60
+    )
+
+
+def test_key_depends_on_content_model_and_prompt():
+    key = AnalysisCache.make_key(b"image", "gpt-4o-mini", "1")
+    assert key == AnalysisCache.make_key(b"image", "gpt-4o-mini", "1")
+    assert key != AnalysisCache.make_key(b"other", "gpt-4o-mini", "1")
+    assert key != AnalysisCache.make_key(b"image", "gpt-4o", "1")
+    assert key != AnalysisCache.make_key(b"image", "gpt-4o-mini", "2")
+
+
+def test_memory_and_disk_tiers(cache):
+    value = {"success": True, "menu_items": []}
+    assert cache.get("a") is None
+    cache.set("a", value)
+    assert cache.get("a") == value
+
+    # Evict "a" from memory; it is still served from disk
+    cache.set("b", value)
+    cache.set("c", value)
+    assert cache.get("a") == value
+
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["memory_hits"] == 1
+    assert stats["disk_hits"] == 1
+    assert stats["memory_entries"] == 2
+    assert stats["disk_entries"] == 3
+
+
+def test_expired_entries_are_misses(cache):
+    cache.set("a", {"success": True, "menu_items": []})
+    cache.ttl_seconds = -1
+    assert cache.get("a") is None
+    assert cache.stats()["disk_entries"] == 0
+
+
+def test_purge(cache):
+    cache.set("a", {"success": True, "menu_items": []})
+    cache.purge()
+    assert cache.get("a") is None
+    assert cache.stats()["disk_entries"] == 0
+
+
+def test_repeated_analysis_skips_model_call(cache, monkeypatch):
+    monkeypatch.setattr(settings, "ANALYSIS_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "NEAR_DUPLICATE_ENABLED", False)
+    with patch("app.services.menu_analysis.analysis_cache", cache), patch(
+        "builtins.open", mock_open(read_data=b"menu")
+    ), patch(
+        "app.services.model_client.client.chat.completions.create",
+        new_callable=AsyncMock,
+        return_value=MOCK_SUCCESSFUL_RESPONSE,
+    ) as mock_api:
+
+        first = asyncio.run(analyze_menu_image("menu.jpg"))
+        second = asyncio.run(analyze_menu_image("menu.jpg"))
+
+        assert first == second
+        assert mock_api.await_count == 1
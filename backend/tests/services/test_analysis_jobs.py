@@ -0,0 +1,228 @@
+import asyncio
+import sqlite3
+import time
+import pytest
+from unittest.mock import patch, AsyncMock
+from app.core.config import settings
+from app.services.analysis_jobs import AnalysisJobQueue
+from app.services.rate_limiter import BACKGROUND
+
+MOCK_ANALYSIS = {
+    "success": True,
+    "menu_items": [{"name": "Soup", "price": "$5", "ingredients": ["leek"]}],
+}
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return AnalysisJobQueue(db_path=str(tmp_path / "jobs.sqlite3"), worker_count=2)
+
+
+async def wait_for_status(queue, job_id, statuses, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not reach {statuses}")
+
+
+def test_submit_then_poll(queue):
+    async def run():
+        await queue.start()
+        try:
+            job_id = await queue.submit(b"menu")
+            assert queue.get(job_id)["status"] in ("pending", "running")
+            return await wait_for_status(queue, job_id, ("completed", "failed"))
+        finally:
+            await queue.stop()
+
+    with patch(
+        "app.services.analysis_jobs.analyze_menu_bytes",
+        new_callable=AsyncMock,
+        return_value=MOCK_ANALYSIS,
+    ) as mock_analyze:
+        job = asyncio.run(run())
+
+    assert job["status"] == "completed"
+    assert job["menu_items"] == MOCK_ANALYSIS["menu_items"]
+    assert job["complete"] is True
+    mock_analyze.assert_awaited_once_with(
+        b"menu", priority=BACKGROUND, request_id=job["analysis_id"]
+    )
+
+
+def test_failed_analysis_is_recorded(queue):
+    async def run():
+        await queue.start()
+        try:
+            job_id = await queue.submit(b"menu")
+            return await wait_for_status(queue, job_id, ("completed", "failed"))
+        finally:
+            await queue.stop()
+
+    with patch(
+        "app.services.analysis_jobs.analyze_menu_bytes",
+        new_callable=AsyncMock,
+        side_effect=Exception("API Error"),
+    ):
+        job = asyncio.run(run())
+
+    assert job["status"] == "failed"
+    assert job["error"] == "API Error"
+    assert job["menu_items"] is None
+
+
+def test_unavailable_model_requeues_job(queue, monkeypatch):
+    monkeypatch.setattr(settings, "ANALYSIS_JOB_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(settings, "ANALYSIS_JOB_RETRY_SECONDS", 0.2)
+    attempts = []
+
+    async def fake_analyze(image_bytes, priority, request_id):
+        attempts.append((time.monotonic(), bytes(image_bytes)))
+        if len(attempts) == 1:
+            return {
+                "success": False,
+                "error": "Model service unavailable, retry later",
+                "unavailable": True,
+                "menu_items": [],
+            }
+        return MOCK_ANALYSIS
+
+    async def run():
+        await queue.start()
+        try:
+            job_id = await queue.submit(b"menu")
+            return await wait_for_status(queue, job_id, ("completed", "failed"))
+        finally:
+            await queue.stop()
+
+    with patch("app.services.analysis_jobs.analyze_menu_bytes", fake_analyze):
+        job = asyncio.run(run())
+
+    assert job["status"] == "completed"
+    assert job["error"] is None
+    # Retried with the kept image once the delay had passed
+    assert [image for _, image in attempts] == [b"menu", b"menu"]
+    assert attempts[1][0] - attempts[0][0] >= 0.2
+
+
+def test_jobs_survive_restart(queue, monkeypatch):
+    """Test that pending and stale running jobs are picked up after a restart"""
+    monkeypatch.setattr(settings, "ANALYSIS_JOB_STALE_SECONDS", 0)
+
+    # Simulate a process that queued two jobs and died mid-analysis on one
+    pending_id = asyncio.run(queue.submit(b"pending"))
+    running_id = asyncio.run(queue.submit(b"running"))
+    queue._claim()
+
+    restarted = AnalysisJobQueue(db_path=queue.db_path, worker_count=2)
+
+    async def run():
+        await restarted.start()
+        try:
+            return [
+                await wait_for_status(restarted, job_id, ("completed",))
+                for job_id in (pending_id, running_id)
+            ]
+        finally:
+            await restarted.stop()
+
+    with patch(
+        "app.services.analysis_jobs.analyze_menu_bytes",
+        new_callable=AsyncMock,
+        return_value=MOCK_ANALYSIS,
+    ):
+        jobs = asyncio.run(run())
+
+    assert [job["status"] for job in jobs] == ["completed", "completed"]
+
+
+def test_unknown_job(queue):
+    assert queue.get("missing") is None
+
+
+def test_stop_drains_running_analysis(queue):
+    """Test that stopping waits for an analysis in flight to finish"""
+    started = asyncio.Event()
+
+    async def slow_analysis(*args, **kwargs):
+        started.set()
+        await asyncio.sleep(0.2)
+        return MOCK_ANALYSIS
+
+    async def run():
+        await queue.start()
+        job_id = await queue.submit(b"menu")
+        await started.wait()
+        await queue.stop(drain_seconds=5)
+        return queue.get(job_id)
+
+    with patch(
+        "app.services.analysis_jobs.analyze_menu_bytes", side_effect=slow_analysis
+    ):
+        job = asyncio.run(run())
+
+    assert job["status"] == "completed"
+
+
+def test_stop_requeues_analysis_past_drain_timeout(queue):
+    """Test that an analysis outlasting the drain is handed back to the queue"""
+    started = asyncio.Event()
+
+    async def stuck_analysis(*args, **kwargs):
+        started.set()
+        await asyncio.sleep(60)
+
+    async def run():
+        await queue.start()
+        job_id = await queue.submit(b"menu")
+        await started.wait()
+        await queue.stop(drain_seconds=0.05)
+        return queue.get(job_id)
+
+    with patch(
+        "app.services.analysis_jobs.analyze_menu_bytes", side_effect=stuck_analysis
+    ):
+        job = asyncio.run(run())
+
+    assert job["status"] == "pending"
+    assert queue._claim()[0] == job["analysis_id"]
+
+
+def test_worker_survives_database_errors(queue, monkeypatch):
+    monkeypatch.setattr(settings, "ANALYSIS_JOB_POLL_INTERVAL", 0.01)
+    queue.worker_count = 1
+    claim, finish = queue._claim, queue._finish
+    failures = {"claim": 2, "finish": 2}
+
+    def flaky(name, method):
+        def call(*args):
+            if failures[name]:
+                failures[name] -= 1
+                raise sqlite3.OperationalError("database is locked")
+            return method(*args)
+
+        return call
+
+    monkeypatch.setattr(queue, "_claim", flaky("claim", claim))
+    monkeypatch.setattr(queue, "_finish", flaky("finish", finish))
+
+    async def run():
+        await queue.start()
+        try:
+            job_id = await queue.submit(b"menu")
+            return await wait_for_status(queue, job_id, ("completed", "failed"))
+        finally:
+            await queue.stop()
+
+    with patch(
+        "app.services.analysis_jobs.analyze_menu_bytes",
+        new_callable=AsyncMock,
+        return_value=MOCK_ANALYSIS,
+    ):
+        job = asyncio.run(run())
+
+    assert job["status"] == "completed"
+    assert failures == {"claim": 0, "finish": 0}
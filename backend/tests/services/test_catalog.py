@@ -0,0 +1,119 @@
+import csv
+import json
+import sqlite3
+import pytest
+from app.data.ingredients import INGREDIENTS_DATA
+from app.services.catalog import Catalog, load_catalog
+
+RECORDS = [
+    {
+        "category": "Premium Meats",
+        "name": "Wagyu Beef",
+        "price_range": "$80-120/lb",
+        "variants": ["A5", "A4"],
+        "suppliers": ["Snake River Farms"],
+        "quality_grades": ["A5"],
+        "packaging": ["Whole loin"],
+        "storage": "Refrigerated",
+        "shelf_life": "2 weeks",
+        "common_uses": ["steak", "burgers"],
+        "tags": ["premium", "beef"],
+    },
+    {
+        "category": "Dairy & Cheese",
+        "name": "Burrata",
+        "price_range": "$12-18/lb",
+        "variants": [],
+        "suppliers": ["Local Creamery"],
+        "quality_grades": [],
+        "packaging": ["8oz ball"],
+        "storage": "Refrigerated",
+        "shelf_life": "5 days",
+        "common_uses": ["salads"],
+        "tags": ["premium", "cheese"],
+    },
+]
+
+
+def _flatten(record):
+    return {
+        key: "|".join(value) if isinstance(value, list) else value
+        for key, value in record.items()
+    }
+
+
+def _expected():
+    return [
+        (record["category"], {k: v for k, v in record.items() if k != "category"})
+        for record in RECORDS
+    ]
+
+
+def test_from_mapping_matches_builtin_data():
+    catalog = Catalog.from_mapping(INGREDIENTS_DATA)
+
+    expected = [
+        (category, item)
+        for category, items in INGREDIENTS_DATA.items()
+        for item in items
+    ]
+    assert len(catalog) == len(expected)
+    assert list(catalog) == expected
+    assert catalog[-1] == expected[-1]
+    assert catalog.name(0) == expected[0][1]["name"]
+    assert catalog.category(0) == expected[0][0]
+
+
+def test_repeated_strings_are_pooled():
+    catalog = Catalog.from_records(RECORDS)
+
+    # "premium" appears in both rows but is stored once
+    assert catalog._pool.values.count("premium") == 1
+
+
+def test_load_json_records(tmp_path):
+    path = tmp_path / "catalog.json"
+    path.write_text(json.dumps(RECORDS))
+
+    assert list(load_catalog(str(path))) == _expected()
+
+
+def test_load_csv(tmp_path):
+    path = tmp_path / "catalog.csv"
+    with open(path, "w", newline="") as catalog_file:
+        writer = csv.DictWriter(catalog_file, fieldnames=list(RECORDS[0]))
+        writer.writeheader()
+        writer.writerows(_flatten(record) for record in RECORDS)
+
+    assert list(load_catalog(str(path))) == _expected()
+
+
+def test_load_csv_without_optional_columns(tmp_path):
+    path = tmp_path / "catalog.csv"
+    path.write_text("category,name,tags\nPremium Meats,Wagyu Beef,premium|beef\n")
+
+    [(category, item)] = list(load_catalog(str(path)))
+    assert category == "Premium Meats"
+    assert item["tags"] == ["premium", "beef"]
+    assert item["variants"] == []
+    assert item["storage"] == ""
+
+
+def test_load_sqlite(tmp_path):
+    path = tmp_path / "catalog.sqlite3"
+    columns = list(RECORDS[0])
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute(f"CREATE TABLE products ({', '.join(columns)})")
+        connection.executemany(
+            f"INSERT INTO products VALUES ({', '.join('?' for _ in columns)})",
+            [tuple(_flatten(record).values()) for record in RECORDS],
+        )
+    connection.close()
+
+    assert list(load_catalog(str(path))) == _expected()
+
+
+def test_unsupported_source():
+    with pytest.raises(ValueError):
+        load_catalog("catalog.xml")
@@ -0,0 +1,51 @@
+from app.services.facet_index import FacetIndex, PriceRange, parse_price_range
+
+ROWS = [
+    (["Dairy & Cheese", "cheese", "Italian"], parse_price_range("$15-30/lb")),
+    (["Premium Meats", "beef"], parse_price_range("$200-400/lb")),
+    (["Specialty Produce", "Italian"], parse_price_range("$5-10/lb")),
+    (["Premium Oils & Vinegars"], parse_price_range("market price")),
+]
+
+
+def test_parse_price_range():
+    assert parse_price_range("$15-30/lb") == PriceRange(15.0, 30.0, "lb")
+    assert parse_price_range("$30-100/bottle") == PriceRange(30.0, 100.0, "bottle")
+    assert parse_price_range("$12.50") == PriceRange(12.5, 12.5, "")
+    assert parse_price_range("market price") is None
+
+
+def test_parse_price_range_with_thousands_separators():
+    assert parse_price_range("$1,200-1,500/case") == PriceRange(1200.0, 1500.0, "case")
+    assert parse_price_range("$950-1,100/case") == PriceRange(950.0, 1100.0, "case")
+    assert parse_price_range("$2,499.99") == PriceRange(2499.99, 2499.99, "")
+
+
+def test_label_filters_are_case_insensitive_and_combine():
+    index = FacetIndex(ROWS)
+
+    assert index.filter() == [0, 1, 2, 3]
+    assert index.filter(tag="italian") == [0, 2]
+    assert index.filter(category="dairy & cheese", tag="Italian") == [0]
+    assert index.filter(tag="seafood") == []
+
+
+def test_price_filters_match_overlapping_ranges():
+    index = FacetIndex(ROWS)
+
+    assert index.filter(max_price=10) == [2]
+    assert index.filter(min_price=25) == [0, 1]
+    assert index.filter(min_price=10, max_price=20) == [0, 2]
+    assert index.filter(tag="Italian", min_price=11) == [0]
+    # Rows without a parseable price never satisfy a price bound
+    assert 3 not in index.filter(min_price=0)
+
+
+def test_rows_from_start_with_limit():
+    index = FacetIndex(ROWS)
+    bits = index.select(tag="Italian")
+
+    assert index.count(bits) == 2
+    assert index.rows(bits, start=1) == [2]
+    assert index.rows(index.select(), start=1, limit=2) == [1, 2]
+    assert index.rows(bits, start=10) == []
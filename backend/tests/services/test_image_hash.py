@@ -0,0 +1,195 @@
+import asyncio
+import io
+import random
+import numpy as np
+from unittest.mock import patch, mock_open, MagicMock, AsyncMock
+from PIL import Image, ImageDraw, ImageEnhance, ImageFont
+from app.core.config import settings
+from app.services.analysis_cache import AnalysisCache
+from app.services.image_hash import (
+    DETAIL_WIDTH,
+    BKTree,
+    ImageFingerprint,
+    NearDuplicateIndex,
+    dhash,
+    fingerprint,
+    hamming_distance,
+)
+from app.services.menu_analysis import analyze_menu_image
+
+MOCK_SUCCESSFUL_RESPONSE = MagicMock(
+    choices=[
+        MagicMock(
+            message=MagicMock(
+                content='{"menu_items": [{"name": "Margherita Pizza", '
+                '"price": "$14.99", "ingredients": ["mozzarella", "basil"]}]}'
+            )
+        )
+    ],
+    usage=None,
+)
+
+
+def make_menu_image(seed: int, brightness: float = 1.0) -> bytes:
+    """Render a fake menu: random text-like bars on a light background"""
+    rng = random.Random(seed)
+    image = Image.new("RGB", (640, 480), "white")
+    draw = ImageDraw.Draw(image)
+    for row in range(12):
+        y = 20 + row * 38
+        draw.rectangle([30, y, 30 + rng.randint(150, 560), y + 18], fill="black")
+    image = ImageEnhance.Brightness(image).enhance(brightness)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def make_text_menu(seed: int, brightness: float = 1.0) -> bytes:
+    """Render a text menu in a fixed template: dish names, right-aligned prices"""
+    rng = random.Random(seed)
+    words = (
+        "chicken beef salmon garlic basil tomato roasted grilled crispy soup".split()
+    )
+    font = ImageFont.load_default()
+    image = Image.new("RGB", (900, 1200), (245, 240, 230))
+    draw = ImageDraw.Draw(image)
+    for row in range(30):
+        y = 60 + row * 36
+        name = " ".join(rng.choice(words).title() for _ in range(rng.randint(2, 4)))
+        draw.text((60, y), name, fill=(20, 20, 20), font=font)
+        draw.text((780, y), f"${rng.randint(5, 40)}.95", fill=(20, 20, 20), font=font)
+    image = ImageEnhance.Brightness(image).enhance(brightness)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def make_fingerprint(phash: int, seed: int = 0) -> ImageFingerprint:
+    detail = np.random.default_rng(seed).integers(0, 256, (80, DETAIL_WIDTH))
+    return ImageFingerprint(phash, detail.astype(np.uint8))
+
+
+def test_dhash_tolerates_exposure_changes():
+    original = dhash(make_menu_image(1))
+    darker = dhash(make_menu_image(1, brightness=0.8))
+    other = dhash(make_menu_image(2))
+
+    assert hamming_distance(original, darker) <= 6
+    assert hamming_distance(original, other) > 6
+
+
+def test_bk_tree_matches_brute_force():
+    rng = random.Random(0)
+    values = [rng.getrandbits(64) for _ in range(500)]
+    tree = BKTree()
+    for i, value in enumerate(values):
+        tree.add(value, str(i))
+
+    query = values[42] ^ 0b1011  # three bits away from an indexed value
+    expected = sorted(
+        (hamming_distance(query, value), str(i))
+        for i, value in enumerate(values)
+        if hamming_distance(query, value) <= 10
+    )
+
+    assert len(tree) == 500
+    assert tree.search(query, 10) == expected
+    assert tree.search(query, 10)[0] == (3, "42")
+
+
+def test_same_template_menus_are_not_near_duplicates(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "cache.sqlite3"), ttl_seconds=60)
+    menus = [fingerprint(make_text_menu(seed)) for seed in range(8)]
+    for seed, menu in enumerate(menus):
+        index.add(menu, f"{seed}:1")
+
+    # The layout alone puts most pairs within the hash radius
+    close = [
+        (a, b)
+        for a in range(8)
+        for b in range(a + 1, 8)
+        if hamming_distance(menus[a].phash, menus[b].phash) <= 6
+    ]
+    assert close
+    for seed, menu in enumerate(menus):
+        assert index.find(menu, 6, ":1", 0.95) == [f"{seed}:1"]
+
+    darker = fingerprint(make_text_menu(3, brightness=0.8))
+    assert index.find(darker, 6, ":1", 0.95) == ["3:1"]
+
+
+def test_index_persists_and_filters_by_suffix(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite3")
+    index = NearDuplicateIndex(db_path, ttl_seconds=60)
+    index.add(make_fingerprint(0b1111), "abc:gpt-4o-mini:1")
+    index.add(make_fingerprint(0b1110), "def:gpt-4o:1")
+
+    reloaded = NearDuplicateIndex(db_path, ttl_seconds=60)
+    query = make_fingerprint(0b1111)
+    assert reloaded.find(query, 2, ":gpt-4o-mini:1", 0.95) == ["abc:gpt-4o-mini:1"]
+    assert reloaded.find(make_fingerprint(0b1111, seed=1), 2, ":1", 0.95) == []
+
+    reloaded.clear()
+    assert reloaded.find(query, 2, ":gpt-4o-mini:1", 0.95) == []
+
+
+def test_index_sees_hashes_added_by_other_processes(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite3")
+    worker_a = NearDuplicateIndex(db_path, ttl_seconds=60)
+    worker_b = NearDuplicateIndex(db_path, ttl_seconds=60)
+    assert worker_a.find(make_fingerprint(0b1111), 2, ":1", 0.95) == []
+
+    worker_b.add(make_fingerprint(0b1111), "abc:1")
+    assert worker_a.find(make_fingerprint(0b1110), 2, ":1", 0.95) == ["abc:1"]
+
+    worker_b.clear()
+    worker_b.add(make_fingerprint(0b0000), "def:1")
+    assert worker_a.find(make_fingerprint(0b1111), 2, ":1", 0.95) == []
+    assert worker_a.find(make_fingerprint(0b0001), 2, ":1", 0.95) == ["def:1"]
+
+
+def test_expired_fingerprints_are_pruned(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "cache.sqlite3"), ttl_seconds=60)
+    with patch("app.services.image_hash.time.time", return_value=1000.0):
+        for i in range(10):
+            index.add(make_fingerprint(i), f"old-{i}:1")
+        assert len(index.find(make_fingerprint(0), 64, ":1", 0.95)) == 10
+
+    with patch("app.services.image_hash.time.time", return_value=1100.0):
+        assert index.find(make_fingerprint(0), 64, ":1", 0.95) == []
+        index.add(make_fingerprint(0, seed=1), "new:1")
+        assert index.find(make_fingerprint(0, seed=1), 64, ":1", 0.95) == ["new:1"]
+        with index._connect() as connection:
+            rows = connection.execute(
+                "SELECT COUNT(*) FROM image_fingerprints"
+            ).fetchone()[0]
+
+    assert rows == 1
+    assert len(index._tree) == 1
+
+
+def test_near_duplicate_photo_reuses_analysis(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ANALYSIS_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "NEAR_DUPLICATE_ENABLED", True)
+    db_path = str(tmp_path / "cache.sqlite3")
+    cache = AnalysisCache(db_path=db_path, max_entries=8, ttl_seconds=60)
+    index = NearDuplicateIndex(db_path, ttl_seconds=60)
+
+    with patch("app.services.menu_analysis.analysis_cache", cache), patch(
+        "app.services.menu_analysis.near_duplicate_index", index
+    ), patch(
+        "app.services.model_client.client.chat.completions.create",
+        new_callable=AsyncMock,
+        return_value=MOCK_SUCCESSFUL_RESPONSE,
+    ) as mock_api:
+
+        with patch("builtins.open", mock_open(read_data=make_menu_image(1))):
+            first = asyncio.run(analyze_menu_image("menu.jpg"))
+        with patch(
+            "builtins.open", mock_open(read_data=make_menu_image(1, brightness=0.8))
+        ):
+            second = asyncio.run(analyze_menu_image("menu-again.jpg"))
+
+        assert first == second
+        assert mock_api.await_count == 1
+        assert index.hits == 1
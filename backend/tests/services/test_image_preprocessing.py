@@ -0,0 +1,70 @@
+import io
+from PIL import Image
+from app.core.config import settings
+from app.services.image_preprocessing import (
+    detect_mime_type,
+    preprocess_image,
+    target_size,
+)
+
+
+def make_image(size, format="JPEG", orientation=None) -> bytes:
+    image = Image.effect_noise((size[0] // 8, size[1] // 8), 64).convert("RGB")
+    image = image.resize(size)
+    buffer = io.BytesIO()
+    kwargs = {}
+    if orientation is not None:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        kwargs["exif"] = exif
+    image.save(buffer, format=format, **kwargs)
+    return buffer.getvalue()
+
+
+def test_target_size_matches_model_limits():
+    assert target_size(4000, 3000) == (1024, 768)
+    assert target_size(3000, 4000) == (768, 1024)
+    assert target_size(640, 480) == (640, 480)
+
+
+def test_large_image_is_downscaled_and_shrunk():
+    original = make_image((3000, 2000))
+    result = preprocess_image(original)
+
+    assert (result.width, result.height) == (1152, 768)
+    assert result.mime_type == "image/jpeg"
+    assert len(result.data) < len(original)
+    assert {"decode", "orientation", "resize", "normalize", "encode"} <= set(
+        result.timings
+    )
+
+
+def test_exif_orientation_is_applied():
+    # Orientation 6 means the camera was rotated 90 degrees
+    result = preprocess_image(make_image((1200, 800), orientation=6))
+    assert (result.width, result.height) == (768, 1152)
+
+
+def test_png_is_reencoded_with_correct_mime(monkeypatch):
+    monkeypatch.setattr(settings, "IMAGE_OUTPUT_FORMAT", "WEBP")
+    result = preprocess_image(make_image((1600, 1200), format="PNG"))
+
+    assert result.mime_type == "image/webp"
+    assert Image.open(io.BytesIO(result.data)).format == "WEBP"
+
+
+def test_grayscale_option(monkeypatch):
+    monkeypatch.setattr(settings, "IMAGE_GRAYSCALE", True)
+    result = preprocess_image(make_image((800, 600)))
+    assert Image.open(io.BytesIO(result.data)).mode == "L"
+
+
+def test_undecodable_or_disabled_passes_original(monkeypatch):
+    png = make_image((1200, 800), format="PNG")
+    assert preprocess_image(b"not an image").data == b"not an image"
+    assert detect_mime_type(png) == "image/png"
+
+    monkeypatch.setattr(settings, "IMAGE_PREPROCESSING_ENABLED", False)
+    result = preprocess_image(png)
+    assert result.data == png
+    assert result.mime_type == "image/png"
@@ -0,0 +1,77 @@
+import io
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+from app.core.config import settings
+from app.services.image_tiling import find_bands, plan_tiles, split_menu_image
+
+
+def menu_page(width, height, columns, section_gap_at=None):
+    """White page with rows of dark 'text' bars in the given x-ranges"""
+    image = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    for left, right in columns:
+        for y in range(40, height - 40, 30):
+            if section_gap_at and section_gap_at[0] <= y < section_gap_at[1]:
+                continue
+            draw.rectangle((left, y, right, y + 12), fill=0)
+    return image
+
+
+def encode(image):
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def tiling(monkeypatch):
+    monkeypatch.setattr(settings, "MENU_TILING_MIN_PIXELS", 1_000_000)
+    monkeypatch.setattr(settings, "MENU_TILE_MAX_ASPECT", 1.5)
+
+
+def test_plan_tiles_finds_columns(tiling):
+    page = menu_page(2400, 1500, [(100, 1100), (1300, 2300)])
+
+    boxes = plan_tiles(page)
+
+    assert len(boxes) == 2
+    (left_a, _, right_a, _), (left_b, _, right_b, _) = boxes
+    assert left_a <= 100 and 1100 <= right_a <= 1300
+    assert 1100 <= left_b <= 1300 and right_b >= 2300
+
+
+def test_tall_column_is_cut_at_blank_rows(tiling):
+    page = menu_page(1000, 3000, [(50, 950)])
+
+    boxes = plan_tiles(page)
+
+    assert len(boxes) == 3
+    assert all(lower - upper <= 900 * 1.5 * 1.3 for _, upper, _, lower in boxes)
+    for (_, _, _, lower), (_, upper, _, _) in zip(boxes, boxes[1:]):
+        assert lower == upper
+        row = np.asarray(page)[upper, 50:950]
+        assert (row > 128).all()
+
+
+def test_bands_overlap_without_blank_rows():
+    ink = np.full(300, 0.5)
+
+    bands = find_bands(ink, max_height=100, overlap=10)
+
+    assert bands == [(0, 110), (90, 210), (190, 300)]
+
+
+def test_small_or_single_tile_images_are_not_split(tiling):
+    assert split_menu_image(encode(menu_page(600, 800, [(50, 550)]))) == []
+    assert split_menu_image(encode(menu_page(1500, 1000, [(50, 1450)]))) == []
+    assert split_menu_image(b"not an image") == []
+
+
+def test_split_menu_image_returns_jpeg_tiles(tiling):
+    tiles = split_menu_image(encode(menu_page(2400, 1500, [(100, 1100), (1300, 2300)])))
+
+    assert len(tiles) == 2
+    assert all(tile.startswith(b"\xff\xd8") for tile in tiles)
+    widths = [Image.open(io.BytesIO(tile)).width for tile in tiles]
+    assert all(1000 <= width <= 1200 for width in widths)
@@ -1,6 +1,20 @@
+import asyncio
+import base64
+import json
 import pytest
-from unittest.mock import patch, mock_open, MagicMock
-from app.services.menu_analysis import analyze_menu_image
+from unittest.mock import patch, mock_open, MagicMock, AsyncMock
+from app.core.config import settings
+from app.services.analysis_cache import AnalysisCache
+from app.services.menu_analysis import (
+    analyze_menu_bytes,
+    analyze_menu_image,
+    analyze_menu_pages,
+    encode_data_url,
+    merge_menu_items,
+    stream_menu_bytes,
+)
+from app.services.menu_ocr import MenuLayout
+from app.services.model_client import CircuitOpenError
 
 # Mock successful API response
 MOCK_SUCCESSFUL_RESPONSE = MagicMock(
@@ -25,12 +39,14 @@ MOCK_SUCCESSFUL_RESPONSE = MagicMock(
                 """
             )
         )
-    ]
+    ],
+    usage=None,
 )
 
 # Mock invalid JSON response
 MOCK_INVALID_JSON_RESPONSE = MagicMock(
-    choices=[MagicMock(message=MagicMock(content="Invalid JSON response"))]
+    choices=[MagicMock(message=MagicMock(content="Invalid JSON response"))],
+    usage=None,
 )
 
 # Mock invalid structure response
@@ -50,7 +66,8 @@ MOCK_INVALID_STRUCTURE_RESPONSE = MagicMock(
                 """
             )
         )
-    ]
+    ],
+    usage=None,
 )
 
 
@@ -61,12 +78,13 @@ def mock_image_path():
 
 def test_successful_menu_analysis(mock_image_path):
     """Test successful menu analysis with valid response"""
-    with patch("builtins.open", mock_open(read_data="test image data")), patch(
-        "app.services.menu_analysis.client.chat.completions.create",
+    with patch("builtins.open", mock_open(read_data=b"test image data")), patch(
+        "app.services.model_client.client.chat.completions.create",
+        new_callable=AsyncMock,
         return_value=MOCK_SUCCESSFUL_RESPONSE,
     ):
 
-        result = analyze_menu_image(mock_image_path)
+        result = asyncio.run(analyze_menu_image(mock_image_path))
 
         assert result["success"] is True
         assert len(result["menu_items"]) == 2
@@ -78,12 +96,13 @@ def test_successful_menu_analysis(mock_image_path):
 
 def test_invalid_json_response(mock_image_path):
     """Test handling of invalid JSON response"""
-    with patch("builtins.open", mock_open(read_data="test image data")), patch(
-        "app.services.menu_analysis.client.chat.completions.create",
+    with patch("builtins.open", mock_open(read_data=b"test image data")), patch(
+        "app.services.model_client.client.chat.completions.create",
+        new_callable=AsyncMock,
         return_value=MOCK_INVALID_JSON_RESPONSE,
     ):
 
-        result = analyze_menu_image(mock_image_path)
+        result = asyncio.run(analyze_menu_image(mock_image_path))
 
         assert result["success"] is False
         assert "Failed to parse menu items" in result["error"]
@@ -92,12 +111,13 @@ def test_invalid_json_response(mock_image_path):
 
 def test_invalid_structure_response(mock_image_path):
     """Test handling of response with invalid menu item structure"""
-    with patch("builtins.open", mock_open(read_data="test image data")), patch(
-        "app.services.menu_analysis.client.chat.completions.create",
+    with patch("builtins.open", mock_open(read_data=b"test image data")), patch(
+        "app.services.model_client.client.chat.completions.create",
+        new_callable=AsyncMock,
         return_value=MOCK_INVALID_STRUCTURE_RESPONSE,
     ):
 
-        result = analyze_menu_image(mock_image_path)
+        result = asyncio.run(analyze_menu_image(mock_image_path))
 
         assert result["success"] is True
         assert len(result["menu_items"]) == 0  # Should be 0 as the item is invalid
@@ -108,7 +128,7 @@ def test_file_not_found(mock_image_path):
     with patch("builtins.open", mock_open()) as mock_file:
         mock_file.side_effect = FileNotFoundError()
 
-        result = analyze_menu_image(mock_image_path)
+        result = asyncio.run(analyze_menu_image(mock_image_path))
 
         assert result["success"] is False
         assert "menu_items" in result
@@ -117,12 +137,13 @@ def test_file_not_found(mock_image_path):
 
 def test_api_error(mock_image_path):
     """Test handling of API error"""
-    with patch("builtins.open", mock_open(read_data="test image data")), patch(
-        "app.services.menu_analysis.client.chat.completions.create"
+    with patch("builtins.open", mock_open(read_data=b"test image data")), patch(
+        "app.services.model_client.client.chat.completions.create",
+        new_callable=AsyncMock,
     ) as mock_api:
 
         mock_api.side_effect = Exception("API Error")
-        result = analyze_menu_image(mock_image_path)
+        result = asyncio.run(analyze_menu_image(mock_image_path))
 
         assert result["success"] is False
         assert "API Error" in result["error"]
@@ -132,15 +153,545 @@ def test_api_error(mock_image_path):
 def test_empty_menu_items(mock_image_path):
     """Test handling of empty menu items"""
     mock_empty_response = MagicMock(
-        choices=[MagicMock(message=MagicMock(content='{"menu_items": []}'))]
+        choices=[MagicMock(message=MagicMock(content='{"menu_items": []}'))],
+        usage=None,
     )
 
-    with patch("builtins.open", mock_open(read_data="test image data")), patch(
-        "app.services.menu_analysis.client.chat.completions.create",
+    with patch("builtins.open", mock_open(read_data=b"test image data")), patch(
+        "app.services.model_client.client.chat.completions.create",
+        new_callable=AsyncMock,
         return_value=mock_empty_response,
     ):
 
-        result = analyze_menu_image(mock_image_path)
+        result = asyncio.run(analyze_menu_image(mock_image_path))
 
         assert result["success"] is True
         assert len(result["menu_items"]) == 0
+
+
+def test_concurrent_analyses_do_not_block(mock_image_path):
+    """Test that in-flight model calls overlap instead of running serially"""
+
+    async def slow_create(*args, **kwargs):
+        await asyncio.sleep(0.2)
+        return MOCK_SUCCESSFUL_RESPONSE
+
+    async def run_batch():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        results = await asyncio.gather(
+            *(analyze_menu_image(mock_image_path) for _ in range(10))
+        )
+        return results, loop.time() - start
+
+    with patch("builtins.open", mock_open(read_data=b"test image data")), patch(
+        "app.services.model_client.client.chat.completions.create",
+        side_effect=slow_create,
+    ):
+
+        results, elapsed = asyncio.run(run_batch())
+
+        assert all(result["success"] for result in results)
+        assert elapsed < 1.0
+
+
+@pytest.mark.parametrize("size", [0, 1, 2, 3, 196607, 196608, 500000])
+def test_encode_data_url_matches_base64(size):
+    """Test chunked data URL encoding against a plain base64 encoding"""
+    data = bytes(i % 251 for i in range(size))
+    expected = "data:image/png;base64," + base64.b64encode(data).decode("ascii")
+
+    assert encode_data_url(data, "image/png") == expected
+    assert encode_data_url(bytearray(data), "image/png") == expected
+
+
+def test_merge_menu_items_collapses_duplicates():
+    """Test that the same item on two pages is merged into one"""
+    pages = [
+        [
+            {"name": "Tiramisu", "price": "$9", "ingredients": ["mascarpone"]},
+            {"name": "Espresso", "price": "$3", "ingredients": ["coffee"]},
+        ],
+        [
+            {
+                "name": "tiramisu ",
+                "price": "$9",
+                "ingredients": ["cocoa", "mascarpone"],
+            },
+            {"name": "Espresso", "price": "$4", "ingredients": ["coffee"]},
+        ],
+    ]
+
+    merged = merge_menu_items(pages)
+
+    assert [item["name"] for item in merged] == ["Tiramisu", "Espresso", "Espresso"]
+    assert merged[0]["ingredients"] == ["mascarpone", "cocoa"]
+    assert pages[0][0]["ingredients"] == ["mascarpone"]
+
+
+def test_analyze_menu_pages_bounded_concurrency(monkeypatch):
+    """Test that pages run concurrently but never above the configured limit"""
+    monkeypatch.setattr(settings, "BATCH_MAX_CONCURRENCY", 2)
+    in_flight = 0
+    peak = 0
+
+    async def fake_analyze(image_bytes):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        return {
+            "success": True,
+            "menu_items": [{"name": "Soup", "price": "$5", "ingredients": []}],
+        }
+
+    with patch("app.services.menu_analysis.analyze_menu_bytes", fake_analyze):
+        result = asyncio.run(analyze_menu_pages([b"1", b"2", b"3", b"4", b"5"]))
+
+    assert result["success"] is True
+    assert len(result["menu_items"]) == 1
+    assert peak == 2
+
+
+def test_analyze_menu_pages_reports_failed_page():
+    """Test that a failed page fails the batch with its page number"""
+    results = [
+        {"success": True, "menu_items": []},
+        {"success": False, "error": "API Error", "menu_items": []},
+    ]
+
+    with patch(
+        "app.services.menu_analysis.analyze_menu_bytes",
+        new_callable=AsyncMock,
+        side_effect=results,
+    ):
+        result = asyncio.run(analyze_menu_pages([b"1", b"2"]))
+
+    assert result["success"] is False
+    assert result["error"] == "Page 2: API Error"
+    assert "unavailable" not in result
+
+
+def test_analyze_menu_pages_keeps_unavailable_flag():
+    """Test that an open circuit on any page marks the batch unavailable"""
+    results = [
+        {"success": True, "menu_items": []},
+        {
+            "success": False,
+            "error": "Model service unavailable, retry later",
+            "unavailable": True,
+            "menu_items": [],
+        },
+    ]
+
+    with patch(
+        "app.services.menu_analysis.analyze_menu_bytes",
+        new_callable=AsyncMock,
+        side_effect=results,
+    ):
+        result = asyncio.run(analyze_menu_pages([b"1", b"2"]))
+
+    assert result["success"] is False
+    assert result["unavailable"] is True
+
+
+def _stream_chunks(content, chunk_size=7):
+    async def chunks():
+        for start in range(0, len(content), chunk_size):
+            delta = MagicMock(content=content[start : start + chunk_size])
+            yield MagicMock(choices=[MagicMock(delta=delta)])
+
+    return chunks()
+
+
+def _collect(events):
+    async def collect():
+        return [event async for event in events]
+
+    return asyncio.run(collect())
+
+
+def test_stream_menu_bytes_yields_items_before_done():
+    """Test that streamed items arrive one by one, followed by the result"""
+    content = MOCK_SUCCESSFUL_RESPONSE.choices[0].message.content
+    with patch(
+        "app.services.model_client.client.chat.completions.create",
+        new_callable=AsyncMock,
+        return_value=_stream_chunks(content),
+    ) as mock_create:
+        events = _collect(stream_menu_bytes(b"test image data"))
+
+    assert mock_create.await_args.kwargs["stream"] is True
+    assert [event["type"] for event in events] == ["item", "item", "done"]
+    assert events[0]["item"]["name"] == "Margherita Pizza"
+    assert events[-1]["success"] is True
+    assert events[-1]["menu_items"] == [event["item"] for event in events[:2]]
+
+
+def test_stream_menu_bytes_skips_invalid_items():
+    """Test that malformed items are not streamed"""
+    content = MOCK_INVALID_STRUCTURE_RESPONSE.choices[0].message.content
+    with patch(
+        "app.services.model_client.client.chat.completions.create",
+        new_callable=AsyncMock,
+        return_value=_stream_chunks(content),
+    ):
+        events = _collect(stream_menu_bytes(b"test image data"))
+
+    assert events == [
+        {"type": "done", "success": True, "menu_items": [], "complete": True}
+    ]
+
+
+def test_stream_menu_bytes_reports_invalid_json():
+    """Test that an unparseable stream ends with a failed result"""
+    with patch(
+        "app.services.model_client.client.chat.completions.create",
+        new_callable=AsyncMock,
+        return_value=_stream_chunks("Invalid JSON response"),
+    ):
+        events = _collect(stream_menu_bytes(b"test image data"))
+
+    assert events[-1]["success"] is False
+    assert events[-1]["error"] == "Failed to parse menu items"
+
+
+def test_stream_menu_bytes_reports_open_circuit():
+    """Test that an open circuit ends the stream marked unavailable"""
+    with patch(
+        "app.services.menu_analysis.model_client.create_completion",
+        new_callable=AsyncMock,
+        side_effect=CircuitOpenError("Model service unavailable, retry later"),
+    ):
+        events = _collect(stream_menu_bytes(b"test image data"))
+
+    assert events == [
+        {
+            "type": "done",
+            "success": False,
+            "error": "Model service unavailable, retry later",
+            "unavailable": True,
+            "menu_items": [],
+        }
+    ]
+
+
+def test_truncated_adaptive_budget_retries_with_full_budget(monkeypatch):
+    """Test that a too-small adaptive max_tokens is retried with MAX_TOKENS"""
+    monkeypatch.setattr(settings, "TOKEN_USAGE_ENABLED", True)
+    content = MOCK_SUCCESSFUL_RESPONSE.choices[0].message.content
+    truncated = MagicMock(
+        choices=[MagicMock(message=MagicMock(content='{"menu_items": ['))],
+        usage=MagicMock(prompt_tokens=900, completion_tokens=512),
+    )
+    truncated.choices[0].finish_reason = "length"
+    complete = MagicMock(
+        choices=[MagicMock(message=MagicMock(content=content))],
+        usage=MagicMock(prompt_tokens=900, completion_tokens=120),
+    )
+    complete.choices[0].finish_reason = "stop"
+
+    with patch(
+        "app.services.menu_analysis.token_usage.suggest_max_tokens", return_value=512
+    ), patch("app.services.menu_analysis.token_usage.record") as mock_record, patch(
+        "app.services.model_client.client.chat.completions.create",
+        new_callable=AsyncMock,
+        side_effect=[truncated, complete],
+    ) as mock_create:
+        result = asyncio.run(analyze_menu_bytes(b"test image data"))
+
+    assert result["success"] is True
+    assert len(result["menu_items"]) == 2
+    budgets = [call.kwargs["max_tokens"] for call in mock_create.await_args_list]
+    assert budgets == [512, settings.MAX_TOKENS]
+    recorded = [call.kwargs for call in mock_record.call_args_list]
+    assert [r["truncated"] for r in recorded] == [True, False]
+    assert recorded[1]["item_count"] == 2
+
+
+def _layout(items, complete=True, confidence=95.0):
+    if not complete:
+        items = [{**item, "ingredients": []} for item in items]
+    return MenuLayout(
+        items=items,
+        text="\n".join(f"{item['name']} {item['price']}" for item in items),
+        confidence=confidence,
+        priced_lines=len(items),
+        lines=len(items),
+    )
+
+
+OCR_ITEMS = [
+    {"name": "Funghi", "price": "$14", "ingredients": ["mushrooms", "garlic"]},
+    {"name": "Tiramisu", "price": "$8", "ingredients": ["mascarpone", "cocoa"]},
+    {"name": "Soup", "price": "$6", "ingredients": ["tomato"]},
+]
+
+
+def test_ocr_local_mode_skips_model(monkeypatch):
+    """Test that a confident, complete OCR layout is returned without a model call"""
+    monkeypatch.setattr(settings, "MENU_OCR_MODE", "local")
+    with patch(
+        "app.services.menu_analysis.read_menu_layout",
+        return_value=_layout(OCR_ITEMS),
+    ), patch(
+        "app.services.model_client.client.chat.completions.create",
+        new_callable=AsyncMock,
+    ) as mock_create:
+        result = asyncio.run(analyze_menu_bytes(b"test image data"))
+
+    assert result == {"success": True, "menu_items": OCR_ITEMS, "complete": True}
+    mock_create.assert_not_awaited()
+
+
+def test_ocr_results_are_cached_apart_from_vision(monkeypatch, tmp_path):
+    """Test that a menu read by local OCR is not served when OCR is off"""
+    monkeypatch.setattr(settings, "ANALYSIS_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "NEAR_DUPLICATE_ENABLED", False)
+    monkeypatch.setattr(
+        "app.services.menu_analysis.analysis_cache",
+        AnalysisCache(str(tmp_path / "cache.sqlite3"), max_entries=8, ttl_seconds=60),
+    )
+    monkeypatch.setattr(settings, "MENU_OCR_MODE", "local")
+    with patch(
+        "app.services.menu_analysis.read_menu_layout",
+        return_value=_layout(OCR_ITEMS),
+    ):
+        asyncio.run(analyze_menu_bytes(b"test image data"))
+
+    monkeypatch.setattr(settings, "MENU_OCR_MODE", "off")
+    with patch(
+        "app.services.model_client.client.chat.completions.create",
+        new_callable=AsyncMock,
+        return_value=MOCK_SUCCESSFUL_RESPONSE,
+    ) as mock_create:
+        result = asyncio.run(analyze_menu_bytes(b"test image data"))
+
+    mock_create.assert_awaited_once()
+    assert [item["name"] for item in result["menu_items"]] == [
+        "Margherita Pizza",
+        "Pasta Carbonara",
+    ]
+
+
+def test_ocr_text_mode_sends_text_only(monkeypatch):
+    """Test that OCR text replaces the image in the completion"""
+    monkeypatch.setattr(settings, "MENU_OCR_MODE", "text")
+    with patch(
+        "app.services.menu_analysis.read_menu_layout",
+        return_value=_layout(OCR_ITEMS),
+    ), patch(
+        "app.services.model_client.client.chat.completions.create",
+        new_callable=AsyncMock,
+        return_value=MOCK_SUCCESSFUL_RESPONSE,
+    ) as mock_create, patch(
+        "app.services.menu_analysis.prepare_image"
+    ) as mock_prepare:
+        result = asyncio.run(analyze_menu_bytes(b"test image data"))
+
+    assert result["success"] is True
+    assert len(result["menu_items"]) == 2
+    mock_prepare.assert_not_called()
+    user_message = mock_create.await_args.kwargs["messages"][1]["content"]
+    assert isinstance(user_message, str)
+    assert "Funghi $14" in user_message
+
+
+def test_ocr_local_mode_sends_incomplete_layout_as_text(monkeypatch):
+    monkeypatch.setattr(settings, "MENU_OCR_MODE", "local")
+    with patch(
+        "app.services.menu_analysis.read_menu_layout",
+        return_value=_layout(OCR_ITEMS, complete=False),
+    ), patch(
+        "app.services.model_client.client.chat.completions.create",
+        new_callable=AsyncMock,
+        return_value=MOCK_SUCCESSFUL_RESPONSE,
+    ) as mock_create:
+        result = asyncio.run(analyze_menu_bytes(b"test image data"))
+
+    assert result["menu_items"][0]["name"] == "Margherita Pizza"
+    assert isinstance(mock_create.await_args.kwargs["messages"][1]["content"], str)
+
+
+@pytest.mark.parametrize(
+    "layout", [None, _layout(OCR_ITEMS, confidence=40.0)], ids=["no_ocr", "blurry"]
+)
+def test_ocr_falls_back_to_vision(monkeypatch, layout):
+    """Test that unavailable or low-confidence OCR falls back to the image"""
+    monkeypatch.setattr(settings, "MENU_OCR_MODE", "local")
+    with patch(
+        "app.services.menu_analysis.read_menu_layout", return_value=layout
+    ), patch(
+        "app.services.model_client.client.chat.completions.create",
+        new_callable=AsyncMock,
+        return_value=MOCK_SUCCESSFUL_RESPONSE,
+    ) as mock_create:
+        result = asyncio.run(analyze_menu_bytes(b"test image data"))
+
+    assert result["success"] is True
+    content = mock_create.await_args.kwargs["messages"][1]["content"]
+    assert content[1]["type"] == "image_url"
+
+
+def _menu_response(*names):
+    items = [{"name": name, "price": "$10", "ingredients": ["basil"]} for name in names]
+    return MagicMock(
+        choices=[
+            MagicMock(message=MagicMock(content=json.dumps({"menu_items": items})))
+        ],
+        usage=None,
+    )
+
+
+def test_tiled_analysis_merges_overlapping_tiles(monkeypatch):
+    """Test that tiles are analyzed concurrently and items read twice are merged"""
+    monkeypatch.setattr(settings, "MENU_TILING_ENABLED", True)
+    in_flight = 0
+    peak = 0
+
+    async def fake_create(**kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        url = kwargs["messages"][1]["content"][1]["image_url"]["url"]
+        if url.endswith(base64.b64encode(b"tile-1").decode()):
+            return _menu_response("Soup", "Salad")
+        return _menu_response("Salad", "Steak")
+
+    with patch(
+        "app.services.menu_analysis.split_menu_image",
+        return_value=[b"tile-1", b"tile-2"],
+    ), patch(
+        "app.services.model_client.client.chat.completions.create",
+        side_effect=fake_create,
+    ):
+        result = asyncio.run(analyze_menu_bytes(b"test image data"))
+
+    assert [item["name"] for item in result["menu_items"]] == [
+        "Soup",
+        "Salad",
+        "Steak",
+    ]
+    assert peak == 2
+
+
+def test_tiled_analysis_fails_when_a_tile_fails(monkeypatch):
+    monkeypatch.setattr(settings, "MENU_TILING_ENABLED", True)
+    with patch(
+        "app.services.menu_analysis.split_menu_image",
+        return_value=[b"tile-1", b"tile-2"],
+    ), patch(
+        "app.services.model_client.client.chat.completions.create",
+        new_callable=AsyncMock,
+        side_effect=[_menu_response("Soup"), MOCK_INVALID_JSON_RESPONSE],
+    ):
+        result = asyncio.run(analyze_menu_bytes(b"test image data"))
+
+    assert result["success"] is False
+    assert result["menu_items"] == []
+
+
+def test_truncated_response_requests_only_the_remainder():
+    """Test that items before a cut-off are kept and only the rest is requested"""
+    truncated = MagicMock(
+        choices=[
+            MagicMock(
+                message=MagicMock(
+                    content='{"menu_items": [{"name": "Soup", "price": "$10", '
+                    '"ingredients": ["basil"]}, {"name": "Sal'
+                )
+            )
+        ],
+        usage=None,
+    )
+    truncated.choices[0].finish_reason = "length"
+    remainder = _menu_response("Salad", "Steak")
+    remainder.choices[0].finish_reason = "stop"
+
+    with patch(
+        "app.services.model_client.client.chat.completions.create",
+        new_callable=AsyncMock,
+        side_effect=[truncated, remainder],
+    ) as mock_create:
+        result = asyncio.run(analyze_menu_bytes(b"test image data"))
+
+    assert result["success"] is True
+    assert [item["name"] for item in result["menu_items"]] == [
+        "Soup",
+        "Salad",
+        "Steak",
+    ]
+    follow_up = mock_create.await_args_list[1].kwargs
+    assert follow_up["max_tokens"] == settings.MAX_TOKENS
+    assert (
+        follow_up["messages"][:2] == mock_create.await_args_list[0].kwargs["messages"]
+    )
+    assert "- Soup" in follow_up["messages"][-1]["content"]
+
+
+def test_truncated_response_keeps_items_when_salvage_is_off(monkeypatch):
+    monkeypatch.setattr(settings, "MENU_SALVAGE_ENABLED", False)
+    truncated = _menu_response("Soup")
+    truncated.choices[0].message.content = (
+        truncated.choices[0].message.content[:-2] + ', {"name": "Sal'
+    )
+    truncated.choices[0].finish_reason = "length"
+
+    with patch(
+        "app.services.model_client.client.chat.completions.create",
+        new_callable=AsyncMock,
+        return_value=truncated,
+    ) as mock_create:
+        result = asyncio.run(analyze_menu_bytes(b"test image data"))
+
+    assert result["success"] is True
+    assert [item["name"] for item in result["menu_items"]] == ["Soup"]
+    assert result["complete"] is False
+    assert mock_create.await_count == 1
+
+
+def test_truncated_menu_is_not_cached(monkeypatch):
+    """Test that a menu cut off at max_tokens is returned but not cached"""
+    monkeypatch.setattr(settings, "MENU_SALVAGE_ENABLED", False)
+    truncated = _menu_response("Soup")
+    truncated.choices[0].message.content = (
+        truncated.choices[0].message.content[:-2] + ', {"name": "Sal'
+    )
+    truncated.choices[0].finish_reason = "length"
+    complete = _menu_response("Soup", "Salad")
+    complete.choices[0].finish_reason = "stop"
+
+    with patch(
+        "app.services.model_client.client.chat.completions.create",
+        new_callable=AsyncMock,
+        return_value=truncated,
+    ), patch("app.services.menu_analysis.store_cached_analysis") as mock_store:
+        result = asyncio.run(analyze_menu_bytes(b"test image data"))
+    assert result["complete"] is False
+    mock_store.assert_not_called()
+
+    with patch(
+        "app.services.model_client.client.chat.completions.create",
+        new_callable=AsyncMock,
+        return_value=complete,
+    ), patch("app.services.menu_analysis.store_cached_analysis") as mock_store:
+        result = asyncio.run(analyze_menu_bytes(b"test image data"))
+    assert result["complete"] is True
+    mock_store.assert_called_once()
+
+
+def test_stream_menu_bytes_keeps_items_of_truncated_stream():
+    content = MOCK_SUCCESSFUL_RESPONSE.choices[0].message.content
+    cut = content.index("Pasta Carbonara")
+    with patch(
+        "app.services.model_client.client.chat.completions.create",
+        new_callable=AsyncMock,
+        return_value=_stream_chunks(content[:cut]),
+    ):
+        events = _collect(stream_menu_bytes(b"test image data"))
+
+    assert events[-1]["success"] is True
+    assert [item["name"] for item in events[-1]["menu_items"]] == ["Margherita Pizza"]
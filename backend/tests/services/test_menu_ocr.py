@@ -0,0 +1,86 @@
+import io
+import pytesseract
+from unittest.mock import patch
+from PIL import Image
+from app.services.menu_ocr import OcrLine, parse_menu_lines, read_lines
+
+PRINTED_MENU = [
+    OcrLine("PIZZA", 96),
+    OcrLine("Margherita Pizza .... $12.50", 95),
+    OcrLine("Tomato sauce, mozzarella and basil", 93),
+    OcrLine("Funghi $14", 94),
+    OcrLine("Mushrooms, mozzarella, garlic", 92),
+    OcrLine("DESSERTS", 97),
+    OcrLine("Tiramisu 8,00", 91),
+    OcrLine("Mascarpone with espresso & cocoa", 90),
+]
+
+
+def test_parses_priced_lines_and_descriptions():
+    layout = parse_menu_lines(PRINTED_MENU)
+
+    assert layout.items == [
+        {
+            "name": "Margherita Pizza",
+            "price": "$12.50",
+            "ingredients": ["tomato sauce", "mozzarella", "basil"],
+        },
+        {
+            "name": "Funghi",
+            "price": "$14",
+            "ingredients": ["mushrooms", "mozzarella", "garlic"],
+        },
+        {
+            "name": "Tiramisu",
+            "price": "$8,00",
+            "ingredients": ["mascarpone", "espresso", "cocoa"],
+        },
+    ]
+    assert layout.confident
+    assert layout.complete
+    assert layout.text.splitlines()[1] == "Margherita Pizza .... $12.50"
+
+
+def test_headings_end_descriptions():
+    layout = parse_menu_lines(
+        [OcrLine("Soup $6", 95), OcrLine("MAINS", 95), OcrLine("Chef's choice", 95)]
+    )
+
+    assert layout.items[0]["ingredients"] == []
+    assert not layout.complete
+
+
+def test_low_confidence_or_few_prices_is_not_confident():
+    blurry = [line._replace(confidence=40) for line in PRINTED_MENU]
+    prose = [OcrLine("Welcome to our family restaurant", 95)] * 20 + PRINTED_MENU
+
+    assert not parse_menu_lines(blurry).confident
+    assert not parse_menu_lines(prose).confident
+    assert not parse_menu_lines([]).confident
+
+
+def test_read_lines_without_tesseract():
+    buffer = io.BytesIO()
+    Image.new("RGB", (40, 20), "white").save(buffer, "PNG")
+    with patch(
+        "app.services.menu_ocr.pytesseract.image_to_data",
+        side_effect=pytesseract.TesseractNotFoundError(),
+    ) as mock_ocr:
+        assert read_lines(buffer.getvalue()) is None
+    mock_ocr.assert_called_once()
+
+
+def test_read_lines_groups_words_by_line():
+    data = {
+        "text": ["", "Funghi", "$14", "Mushrooms,", "garlic"],
+        "conf": ["-1", "96", "90", "80", "70"],
+        "block_num": [1, 1, 1, 1, 1],
+        "par_num": [1, 1, 1, 1, 1],
+        "line_num": [0, 1, 1, 2, 2],
+    }
+    with patch("app.services.menu_ocr.Image.open"), patch(
+        "app.services.menu_ocr.ImageOps.exif_transpose"
+    ), patch("app.services.menu_ocr.pytesseract.image_to_data", return_value=data):
+        lines = read_lines(b"image")
+
+    assert lines == [OcrLine("Funghi $14", 93.0), OcrLine("Mushrooms, garlic", 75.0)]
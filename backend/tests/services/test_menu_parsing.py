@@ -0,0 +1,50 @@
+from app.services.menu_parsing import parse_menu_items
+
+PIZZA = {"name": "Margherita", "price": "$12", "ingredients": ["basil"]}
+PASTA = {"name": "Carbonara", "price": "$14", "ingredients": ["eggs", "pecorino"]}
+
+
+def test_parses_complete_response():
+    content = '{"menu_items": [%s, %s]}' % (
+        '{"name": "Margherita", "price": "$12", "ingredients": ["basil"], "x": 1}',
+        '{"name": "Carbonara", "price": "$14", "ingredients": ["eggs", "pecorino"]}',
+    )
+
+    parsed = parse_menu_items(content)
+
+    assert parsed.items == [PIZZA, PASTA]
+    assert parsed.complete
+
+
+def test_skips_malformed_items():
+    content = (
+        '{"menu_items": [{"name": "Margherita", "price": "$12", "ingredients": ["basil"]},'
+        ' {"name": "No Price", "ingredients": []},'
+        ' {"name": "Soup", "price": "$6", "ingredients": "tomato"}]}'
+    )
+
+    parsed = parse_menu_items(content)
+
+    assert parsed.items == [PIZZA]
+    assert parsed.complete
+
+
+def test_salvages_items_before_truncation():
+    content = (
+        '{"menu_items": [{"name": "Margherita", "price": "$12", "ingredients": ["basil"]},'
+        ' {"name": "Carbonara", "price": "$14", "ingredients": ["eggs", "pecorino"]},'
+        ' {"name": "Tirami'
+    )
+
+    parsed = parse_menu_items(content)
+
+    assert parsed.items == [PIZZA, PASTA]
+    assert not parsed.complete
+
+
+def test_unusable_responses():
+    assert parse_menu_items("Invalid JSON response") is None
+    assert parse_menu_items('{"menu_items": [{"name": "Tirami') is None
+    assert parse_menu_items(None) is None
+    assert parse_menu_items("{}").items == []
+    assert parse_menu_items('{"menu_items": "none"}').items == []
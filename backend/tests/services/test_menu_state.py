@@ -0,0 +1,53 @@
+import pytest
+from app.services.menu_state import (
+    MenuStateStore,
+    MemoryStateBackend,
+    SQLiteStateBackend,
+)
+
+STATE = {"menu_items": [{"name": "Soup"}], "recommendations": None}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStateBackend()
+    return SQLiteStateBackend(str(tmp_path / "state.sqlite3"))
+
+
+def test_backend_roundtrip_and_ttl(backend):
+    backend.set("a", STATE, ttl_seconds=60)
+    backend.set("b", STATE, ttl_seconds=-1)
+
+    assert backend.get("a") == STATE
+    assert backend.get("b") is None
+    assert backend.get("missing") is None
+
+    backend.delete("a")
+    assert backend.get("a") is None
+
+
+def test_workers_share_sqlite_state(tmp_path):
+    """Test that two stores over one SQLite file see each other's writes"""
+    db_path = str(tmp_path / "state.sqlite3")
+    worker_a = MenuStateStore(SQLiteStateBackend(db_path), 16, 60, 5)
+    worker_b = MenuStateStore(SQLiteStateBackend(db_path), 16, 60, 5)
+
+    worker_a.set("analysis-1", STATE)
+    assert worker_b.get("analysis-1") == STATE
+
+
+def test_local_lru_is_bounded_and_expires():
+    backend = MemoryStateBackend()
+    store = MenuStateStore(backend, max_entries=2, ttl_seconds=60, local_ttl_seconds=5)
+    for key in ("a", "b", "c"):
+        store.set(key, {**STATE, "key": key})
+    assert list(store._local) == ["b", "c"]
+
+    # Changes made by another worker are picked up once the local entry expires
+    backend.set("c", {**STATE, "key": "updated"}, ttl_seconds=60)
+    assert store.get("c")["key"] == "c"
+    store.local_ttl_seconds = -1
+    store.set("c", {**STATE, "key": "c"})
+    backend.set("c", {**STATE, "key": "updated"}, ttl_seconds=60)
+    assert store.get("c")["key"] == "updated"
@@ -0,0 +1,42 @@
+import json
+import pytest
+from app.services.menu_stream import MenuItemStreamParser
+
+DOCUMENT = json.dumps(
+    {
+        "restaurant": {"name": "Trattoria {menu_items}"},
+        "menu_items": [
+            {"name": 'Pizza "Diavola"', "price": "$15", "ingredients": ["salami"]},
+            {"name": "Soup [of the day]", "price": "$8", "ingredients": []},
+            {"name": "Tiramisu \\\\", "price": "$9", "ingredients": ["mascarpone"]},
+        ],
+    },
+    indent=2,
+)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 16, len(DOCUMENT)])
+def test_parser_yields_items_regardless_of_chunking(chunk_size):
+    parser = MenuItemStreamParser()
+    items = []
+    for start in range(0, len(DOCUMENT), chunk_size):
+        items.extend(parser.feed(DOCUMENT[start : start + chunk_size]))
+
+    assert items == json.loads(DOCUMENT)["menu_items"]
+    assert parser.text == DOCUMENT
+
+
+def test_parser_yields_each_item_once_it_closes():
+    parser = MenuItemStreamParser()
+
+    assert parser.feed('{"menu_items": [{"name": "Pizza", "price": "$1"') == []
+    assert parser.feed(', "ingredients": []}, {"na') == [
+        {"name": "Pizza", "price": "$1", "ingredients": []}
+    ]
+    assert parser.feed('me": "Pasta"}]}') == [{"name": "Pasta"}]
+
+
+def test_parser_ignores_other_arrays():
+    parser = MenuItemStreamParser()
+
+    assert parser.feed('{"specials": [{"name": "Soup"}], "menu_items": []}') == []
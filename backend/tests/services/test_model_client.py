@@ -0,0 +1,216 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import AsyncMock, MagicMock
+import openai
+import pytest
+from app.core.config import settings
+from app.services.model_client import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    ModelClient,
+    create_openai_client,
+)
+
+COMPLETION = {
+    "id": "chatcmpl-test",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4o-mini",
+    "choices": [
+        {
+            "index": 0,
+            "message": {"role": "assistant", "content": '{"menu_items": []}'},
+            "finish_reason": "stop",
+        }
+    ],
+}
+
+
+class FakeOpenAI(BaseHTTPRequestHandler):
+    """OpenAI-compatible chat completions endpoint answering a scripted status"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        server = self.server
+        server.requests.append(self.client_address)
+        status = server.statuses.pop(0) if server.statuses else 200
+        body = json.dumps(
+            COMPLETION if status == 200 else {"error": {"message": "upstream"}}
+        ).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAI)
+    server.requests = []
+    server.statuses = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(server, max_retries=3, failure_threshold=5):
+    host, port = server.server_address
+    return ModelClient(
+        create_openai_client(base_url=f"http://{host}:{port}/v1", api_key="test-key"),
+        CircuitBreaker(failure_threshold, reset_seconds=60),
+        max_retries=max_retries,
+        base_delay=0,
+        max_delay=0,
+    )
+
+
+def complete(model_client, calls=1):
+    async def run():
+        try:
+            return [
+                await model_client.create_completion(
+                    model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}]
+                )
+                for _ in range(calls)
+            ]
+        finally:
+            await model_client.close()
+
+    return asyncio.run(run())
+
+
+def test_retries_transient_errors_over_pooled_connection(fake_server):
+    fake_server.statuses = [500, 503]
+
+    responses = complete(make_client(fake_server), calls=2)
+
+    assert responses[0].choices[0].message.content == '{"menu_items": []}'
+    assert len(fake_server.requests) == 4
+    # Every request reused one keep-alive connection
+    assert len(set(fake_server.requests)) == 1
+
+
+def test_does_not_retry_client_errors(fake_server):
+    fake_server.statuses = [400]
+
+    with pytest.raises(openai.BadRequestError):
+        complete(make_client(fake_server))
+    assert len(fake_server.requests) == 1
+
+
+def test_circuit_opens_and_fails_fast(fake_server):
+    fake_server.statuses = [500] * 10
+    model_client = make_client(fake_server, max_retries=5, failure_threshold=3)
+
+    with pytest.raises(CircuitOpenError):
+        complete(model_client)
+    assert len(fake_server.requests) == 3
+    assert model_client.breaker.state == OPEN
+
+
+def test_circuit_half_open_trial():
+    now = [0.0]
+    breaker = CircuitBreaker(
+        failure_threshold=1, reset_seconds=10, clock=lambda: now[0]
+    )
+
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    now[0] = 10.0
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    # Only one trial call at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    now[0] = 20.0
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_cancelled_half_open_trial_frees_the_breaker():
+    now = [0.0]
+    breaker = CircuitBreaker(
+        failure_threshold=1, reset_seconds=10, clock=lambda: now[0]
+    )
+    started = asyncio.Event()
+
+    async def hang(**kwargs):
+        started.set()
+        await asyncio.sleep(60)
+
+    fake_client = MagicMock()
+    fake_client.chat.completions.create = hang
+    model_client = ModelClient(
+        fake_client, breaker, max_retries=0, base_delay=0, max_delay=0
+    )
+    breaker.record_failure()
+    now[0] = 10.0
+
+    async def run():
+        task = asyncio.create_task(
+            model_client.create_completion(
+                model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}]
+            )
+        )
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+
+    assert breaker.state == HALF_OPEN
+    # The next call gets to run the trial instead of failing fast forever
+    breaker.before_call()
+
+
+def test_open_circuit_does_not_wait_at_the_rate_limiter(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+    limiter = MagicMock()
+    limiter.acquire = AsyncMock()
+    fake_client = MagicMock()
+    fake_client.chat.completions.create = AsyncMock()
+    model_client = ModelClient(
+        fake_client, breaker, max_retries=0, base_delay=0, max_delay=0, limiter=limiter
+    )
+
+    def call():
+        return asyncio.run(
+            model_client.create_completion(
+                model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}]
+            )
+        )
+
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        call()
+    limiter.acquire.assert_not_awaited()
+
+    # The circuit opening during the wait is caught before the model call
+    breaker.record_success()
+    limiter.acquire.side_effect = lambda *args: breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        call()
+    limiter.acquire.assert_awaited_once()
+    fake_client.chat.completions.create.assert_not_awaited()
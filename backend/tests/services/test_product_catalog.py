@@ -0,0 +1,29 @@
+import pytest
+from app.data.ingredients import INGREDIENTS_DATA
+from app.services.catalog import Catalog
+from app.services.product_catalog import ProductRecords
+
+catalog = Catalog.from_mapping(INGREDIENTS_DATA)
+
+
+def test_records_follow_catalog_order():
+    records = ProductRecords(catalog)
+
+    assert len(records) == len(catalog)
+    category, item = catalog[3]
+    record = records[3]
+    assert record.position == 3
+    assert record.category == category
+    assert record.recommendation["name"] == item["name"]
+    assert records[-1].name == catalog.name(len(catalog) - 1)
+
+
+def test_records_are_built_once():
+    records = ProductRecords(catalog)
+
+    assert records[0] is records[0]
+
+
+def test_out_of_range_position():
+    with pytest.raises(IndexError):
+        ProductRecords(catalog)[len(catalog)]
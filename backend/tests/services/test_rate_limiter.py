@@ -0,0 +1,76 @@
+import asyncio
+from app.services.rate_limiter import (
+    BACKGROUND,
+    INTERACTIVE,
+    REQUESTS,
+    TOKENS,
+    BucketLimit,
+    MemoryBucketStore,
+    RateLimiter,
+    SQLiteBucketStore,
+    take,
+)
+
+LIMITS = {
+    REQUESTS: BucketLimit(capacity=2, per_second=1),
+    TOKENS: BucketLimit(capacity=100, per_second=50),
+}
+
+
+def test_take_refills_and_reports_delay():
+    levels = {}
+
+    assert take(levels, LIMITS, {REQUESTS: 1, TOKENS: 80}, now=0) == 0
+    # 20 tokens left; 60 more take 1.2s at 50/s
+    assert take(levels, LIMITS, {REQUESTS: 1, TOKENS: 80}, now=0) == 1.2
+    assert take(levels, LIMITS, {REQUESTS: 1, TOKENS: 80}, now=1.2) == 0
+
+
+def test_sqlite_store_shares_levels(tmp_path):
+    db_path = str(tmp_path / "rate_limit.sqlite3")
+    first = SQLiteBucketStore(db_path, LIMITS)
+    second = SQLiteBucketStore(db_path, LIMITS)
+
+    assert first.try_take({REQUESTS: 1, TOKENS: 10}, now=0) == 0
+    assert second.try_take({REQUESTS: 1, TOKENS: 10}, now=0) == 0
+    # Both processes drew from the same two-request bucket
+    assert first.try_take({REQUESTS: 1, TOKENS: 10}, now=0) == 1
+
+
+def test_interactive_calls_jump_ahead_of_background():
+    limiter = RateLimiter(
+        MemoryBucketStore(
+            {
+                REQUESTS: BucketLimit(capacity=1, per_second=50),
+                TOKENS: BucketLimit(capacity=1000, per_second=1000),
+            }
+        )
+    )
+    order = []
+
+    async def call(name, priority):
+        await limiter.acquire(1, priority, request_id=name)
+        order.append(name)
+
+    async def run():
+        # Spend the only request so everything below has to queue
+        await limiter.acquire(1)
+        tasks = [asyncio.create_task(call(f"job-{i}", BACKGROUND)) for i in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(call("upload", INTERACTIVE)))
+        await asyncio.sleep(0)
+
+        positions = {
+            name: limiter.position(name) for name in ("upload", "job-0", "job-2")
+        }
+        await asyncio.gather(*tasks)
+        return positions
+
+    positions = asyncio.run(run())
+
+    assert order == ["upload", "job-0", "job-1", "job-2"]
+    assert positions["upload"].position == 0
+    assert positions["job-0"].position == 1
+    assert positions["job-2"].position == 3
+    assert positions["job-2"].eta_seconds > positions["job-0"].eta_seconds
+    assert limiter.position("upload") is None
@@ -0,0 +1,25 @@
+from app.services.recommendation_cache import RecommendationCache, menu_fingerprint
+
+
+def test_fingerprint_ignores_key_order():
+    a = [{"name": "Soup", "price": "$5", "ingredients": ["leek"]}]
+    b = [{"ingredients": ["leek"], "price": "$5", "name": "Soup"}]
+    c = [{"name": "Soup", "price": "$6", "ingredients": ["leek"]}]
+
+    assert menu_fingerprint(a) == menu_fingerprint(b)
+    assert menu_fingerprint(a) != menu_fingerprint(c)
+
+
+def test_lru_eviction_and_invalidation():
+    cache = RecommendationCache(max_entries=2)
+    cache.set("a", [1])
+    cache.set("b", [2])
+    assert cache.get("a") == [1]
+    cache.set("c", [3])
+
+    assert cache.get("b") is None
+    assert cache.get("c") == [3]
+
+    cache.invalidate("c")
+    assert cache.get("c") is None
+    assert (cache.hits, cache.misses) == (2, 2)
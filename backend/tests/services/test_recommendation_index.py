@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+from app.data.ingredients import INGREDIENTS_DATA
+from app.services.catalog import Catalog
+from app.services.menu_analysis import get_ingredient_recommendations
+from app.services.recommendation_index import IngredientIndex, normalize
+
+index = IngredientIndex(Catalog.from_mapping(INGREDIENTS_DATA))
+
+
+def names(positions):
+    return [index.items[position][1]["name"] for position in positions]
+
+
+def test_normalize_folds_case_punctuation_and_plurals():
+    assert normalize("Heirloom Tomatoes") == normalize("heirloom tomato")
+    assert normalize("Wild Mushrooms") == "wild mushroom"
+    assert normalize("Parmigiano-Reggiano") == "parmigiano reggiano"
+    assert normalize("Cheeses") == "cheese"
+
+
+@pytest.mark.parametrize(
+    "ingredient, expected",
+    [
+        ("mozzarella", ["Premium Mozzarella"]),
+        ("olive oil", ["Extra Virgin Olive Oil"]),
+        ("tomato", ["Heirloom Tomatoes"]),
+        ("Paella", ["Saffron Threads"]),
+        ("cold pressed", ["Extra Virgin Olive Oil"]),
+        ("basil", []),
+    ],
+)
+def test_top_k_ranks_names_tags_and_uses_first(ingredient, expected):
+    assert names(position for position, _ in index.top_k([ingredient], 1)) == expected
+
+
+def test_top_k_scores_every_tag_and_use_match():
+    """Test that every item naming an ingredient in a tag or use is scored"""
+    ingredients = ["Pizza", "risotto", "Baking", "Italian", "Specialty"]
+    expected = {
+        position
+        for position, (_, item) in enumerate(index.items)
+        if any(
+            ingredient.lower()
+            in [phrase.lower() for phrase in item["tags"] + item["common_uses"]]
+            for ingredient in ingredients
+        )
+    }
+    assert expected
+    scored = {position for position, _ in index.top_k(ingredients, len(index))}
+    assert expected <= scored
+
+
+def test_recommendations_are_ranked_by_score():
+    result = get_ingredient_recommendations(
+        [
+            {
+                "name": "Margherita",
+                "price": "$12",
+                "ingredients": ["mozzarella", "basil"],
+            },
+            {
+                "name": "Caprese",
+                "price": "$10",
+                "ingredients": ["mozzarella", "tomato"],
+            },
+        ]
+    )
+    recommendations = result["recommendations"]
+    scores = [rec["score"] for rec in recommendations]
+
+    assert recommendations[0]["name"] == "Premium Mozzarella"
+    assert recommendations[1]["name"] == "Heirloom Tomatoes"
+    assert scores == sorted(scores, reverse=True)
+    assert len(recommendations) == 5
+
+
+def test_top_k_matches_dense_scoring():
+    """Test the sparse scores against a dense matrix built from the postings"""
+    term_count = len(index._indptr) - 1
+    dense = np.zeros((len(index), term_count))
+    for term in range(term_count):
+        span = slice(index._indptr[term], index._indptr[term + 1])
+        dense[index._positions[span], term] = index._weights[span]
+
+    ingredients = ["Risotto", "wild mushrooms", "parmesan", "butter", "Risotto"]
+    query = index.query_vector(ingredients)
+    vector = np.array([query.get(term, 0.0) for term in range(term_count)])
+    expected = dense @ vector
+
+    # Every item vector has unit length
+    np.testing.assert_allclose(np.linalg.norm(dense, axis=1), 1.0)
+
+    np.testing.assert_allclose(index.scores(ingredients), expected)
+    ranked = index.top_k(ingredients, 3)
+    assert [position for position, _ in ranked] == list(
+        np.argsort(-expected, kind="stable")[:3]
+    )
+    assert all(0 < score <= 1 for _, score in ranked)
+
+
+def test_top_k_without_matches():
+    assert index.top_k(["basil"], 5) == []
+    assert index.top_k([], 5) == []
+
+
+def test_default_recommendations_fill_short_lists():
+    result = get_ingredient_recommendations([])
+    assert [rec["name"] for rec in result["recommendations"]] == [
+        "Premium Mozzarella",
+        "Wagyu Beef",
+        "Heirloom Tomatoes",
+        "Extra Virgin Olive Oil",
+        "Saffron Threads",
+    ]
+    assert result["recommendations"][1]["category"] == "Premium Meats"
+    assert result["recommendations"][1]["score"] == 0.0
+    assert result["recommendations"][1]["description"].startswith(
+        "Premium Wagyu Beef available in variants: "
+    )
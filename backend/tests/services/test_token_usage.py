@@ -0,0 +1,59 @@
+import pytest
+from app.core.config import settings
+from app.services.token_usage import TokenUsageStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ADAPTIVE_MAX_TOKENS_MIN_SAMPLES", 5)
+    monkeypatch.setattr(settings, "ADAPTIVE_MAX_TOKENS_MIN", 256)
+    monkeypatch.setattr(settings, "ADAPTIVE_MAX_TOKENS_MARGIN", 1.5)
+    return TokenUsageStore(str(tmp_path / "usage.sqlite3"), history_size=50)
+
+
+def record(store, completion_tokens, image_pixels=1_000_000, truncated=False):
+    store.record(
+        model="gpt-4o-mini",
+        prompt_tokens=1000,
+        completion_tokens=completion_tokens,
+        max_tokens=10000,
+        latency_ms=200.0,
+        image_pixels=image_pixels,
+        item_count=10,
+        truncated=truncated,
+    )
+
+
+def test_stats_aggregate_calls(store):
+    record(store, 400)
+    record(store, 600, truncated=True)
+
+    stats = store.stats()
+
+    assert stats["calls"] == 2
+    assert stats["prompt_tokens"] == 2000
+    assert stats["completion_tokens"] == 1000
+    assert stats["total_tokens"] == 3000
+    assert stats["reserved_completion_tokens"] == 20000
+    assert stats["avg_latency_ms"] == 200.0
+    assert stats["truncated"] == 1
+
+
+def test_suggest_max_tokens_needs_history(store):
+    for _ in range(4):
+        record(store, 400)
+
+    assert store.suggest_max_tokens("gpt-4o-mini", 1_000_000) is None
+
+
+def test_suggest_max_tokens_scales_with_image_size(store):
+    for _ in range(10):
+        record(store, 800)
+    # Truncated calls under-report what the menu needed
+    record(store, 50, truncated=True)
+
+    assert store.suggest_max_tokens("gpt-4o-mini", 1_000_000) == 1200
+    assert store.suggest_max_tokens("gpt-4o-mini", 500_000) == 600
+    assert store.suggest_max_tokens("gpt-4o-mini", 10_000) == 256
+    assert store.suggest_max_tokens("gpt-4o-mini", 100_000_000) == settings.MAX_TOKENS
+    assert store.suggest_max_tokens("other-model", 1_000_000) is None
@@ -80,14 +80,15 @@ export default function Home() {
   const handleUploadComplete = (data) => {
     if (data.menu_items) {
       setMenuItems(data.menu_items)
-      fetchRecommendations()
+      fetchRecommendations(data.analysis_id)
     }
     setShowResults(true)
   }
 
-  const fetchRecommendations = async () => {
+  const fetchRecommendations = async (analysisId) => {
     try {
-      const response = await fetch("http://localhost:8000/api/v1/recommendations/products")
+      const query = analysisId ? `?analysis_id=${encodeURIComponent(analysisId)}` : ""
+      const response = await fetch(`http://localhost:8000/api/v1/recommendations/products${query}`)
       if (!response.ok) {
         throw new Error("Failed to fetch recommendations")
       }